@@ -0,0 +1,81 @@
+"""
+Conditional GET support for read-mostly endpoints.
+
+Each view names the models its response is built from. The ``ChangeMarker``
+row of each model holds a version that is bumped after every committed
+write, together with the time of that write. The ETag is a hash of those
+versions, the request URL and the negotiated format, and ``Last-Modified``
+is the latest write time, so both are known after one small query and a
+matching ``If-None-Match`` / ``If-Modified-Since`` is answered with a 304
+before the queryset is evaluated or the serializer runs.
+
+Markers are bumped after commit, in autocommit, so writers never hold a
+lock on the shared marker row for the length of their transaction.
+"""
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from accounts.models import ChangeMarker
+
+
+def touch(labels, now=None):
+    """Record a committed write to each model in ``labels``."""
+    now = now or timezone.now()
+    updated = ChangeMarker.objects.filter(label__in=labels).update(version=F('version') + 1, changed_at=now)
+    if updated < len(labels):
+        ChangeMarker.objects.bulk_create(
+            [ChangeMarker(label=label, version=1, changed_at=now) for label in labels],
+            ignore_conflicts=True,
+        )
+
+
+def validators(request, view_name, labels):
+    """Return the ``(etag, last_modified)`` of a response built from ``labels``."""
+    markers = {
+        label: (version, changed_at)
+        for label, version, changed_at in ChangeMarker.objects.filter(label__in=labels).values_list(
+            'label', 'version', 'changed_at'
+        )
+    }
+    versions = ':'.join(f'{label}={markers.get(label, (0, None))[0]}' for label in labels)
+    renderer = getattr(request, 'accepted_renderer', None)
+    digest = hashlib.sha256('\n'.join([
+        view_name, request.get_full_path(), getattr(renderer, 'format', ''), versions,
+    ]).encode()).hexdigest()
+    last_modified = None
+    if markers and len(markers) == len(labels):
+        last_modified = int(max(changed_at for _, changed_at in markers.values()).timestamp())
+    return f'"{digest[:32]}"', last_modified
+
+
+class ConditionalGetMixin:
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` GETs without rendering.
+
+    ``etag_models`` lists the ``app_label.Model`` names whose writes change
+    the response. ``cache_max_age`` is how long, in seconds, clients and
+    proxies may reuse a response before revalidating it.
+    """
+    etag_models = ()
+    cache_max_age = 0
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = validators(request, type(self).__name__, self.etag_models)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Anonymous responses are the same for everyone; proxies may share them.
+            visibility = 'private' if request.user.is_authenticated else 'public'
+            patch_cache_control(
+                response, **{visibility: True}, max_age=self.cache_max_age, must_revalidate=True
+            )
+            patch_vary_headers(response, ['Authorization'])
+        return response
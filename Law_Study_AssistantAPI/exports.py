@@ -0,0 +1,109 @@
+"""
+Streaming CSV / NDJSON exports for admin audits.
+
+An export is a list of column names and an iterable of row tuples in
+the same order, normally ``queryset.values_list(*lookups)``
+read with a chunked ``.iterator()``. Rows are encoded and written out a
+chunk at a time through ``StreamingHttpResponse``, so memory use does not
+depend on the size of the export. Filters come from
+``Law_Study_AssistantAPI.filters``.
+
+Views pick the format with ``?format=csv`` (the default) or
+``?format=ndjson``; both renderers are registered so DRF content
+negotiation accepts them and can render error responses.
+"""
+import csv
+import json
+from datetime import date, datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import renderers
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def header(self, columns):
+        return csv.writer(_Echo()).writerow(columns)
+
+    def rows(self, rows):
+        writer = csv.writer(_Echo())
+        return ''.join(writer.writerow([_csv_value(value) for value in row]) for row in rows)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses are rendered; exports stream their rows.
+        data = data if isinstance(data, dict) else {'detail': data}
+        return (self.header(data.keys()) + self.rows([[str(value) for value in data.values()]])).encode()
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def header(self, columns):
+        self.columns = list(columns)
+        return ''
+
+    def rows(self, rows):
+        return ''.join(
+            json.dumps(dict(zip(self.columns, row)), cls=DjangoJSONEncoder) + '\n' for row in rows
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data, cls=DjangoJSONEncoder) + '\n').encode()
+
+
+EXPORT_RENDERERS = [CSVRenderer, NDJSONRenderer]
+
+
+def chunked(queryset, lookups, chunk_size=EXPORT_CHUNK_SIZE):
+    """Row tuples of ``queryset`` for ``lookups``, read from the database in chunks."""
+    return queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _encode(renderer, columns, rows, chunk_size):
+    yield renderer.header(columns)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield renderer.rows(chunk)
+            chunk = []
+    if chunk:
+        yield renderer.rows(chunk)
+
+
+def stream_export(request, name, columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream ``rows`` as ``name``.csv or ``name``.ndjson, as negotiated for ``request``."""
+    renderer = type(request.accepted_renderer)()
+    response = StreamingHttpResponse(
+        _encode(renderer, columns, rows, chunk_size),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}',
+    )
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{stamp}.{renderer.format}"'
+    # Let proxies pass chunks through instead of buffering the whole export.
+    response['X-Accel-Buffering'] = 'no'
+    return response
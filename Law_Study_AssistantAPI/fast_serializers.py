@@ -0,0 +1,147 @@
+"""
+Read-only fast path for list serializers.
+
+``compile_serializer()`` turns a ``ModelSerializer`` class into a
+``values()`` projection and a row-to-dict function built once per class:
+every readable field becomes a ``(name, lookup, convert)`` step, dotted
+sources such as ``category.name`` become ``category__name`` lookups, and
+``convert`` is the field's own ``to_representation`` (or nothing for
+primary-key relations, whose ids come straight from the row). Lists are
+then served without instantiating models or serializers, and the output is
+the same, key for key and byte for byte, as ``Serializer(many=True).data``.
+Date-time fields look the current time zone up once per list instead of
+once per value, which is most of what they cost.
+
+Fields that are model properties rather than columns are computed in SQL:
+the serializer's ``Meta.read_expressions`` maps their names to query
+expressions, which are annotated onto the projected queryset. Nested
+serializers and method fields are not supported.
+"""
+import copy
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import relations, serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+
+_SKIP = object()
+_compiled = {}
+
+
+def _nullable_prefixes(model, attrs):
+    """Lookups of the nullable relations a dotted source passes through."""
+    prefixes = []
+    for depth, attr in enumerate(attrs[:-1], 1):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        if field.null:
+            prefixes.append('__'.join(attrs[:depth]))
+        model = field.related_model
+    return prefixes
+
+
+def _missing(field):
+    # What Field.get_attribute() does when a relation on the source path is None.
+    if field.default is not empty:
+        return field.get_default()
+    if field.allow_null:
+        return None
+    return _SKIP
+
+
+def _converter(field):
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        return field.pk_field.to_representation if field.pk_field else None
+    if type(field) is serializers.CharField:
+        return str
+    if type(field) is serializers.IntegerField:
+        return int
+    return field.to_representation
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class):
+        meta = serializer_class.Meta
+        self.expressions = dict(getattr(meta, 'read_expressions', {}))
+        self.steps, lookups = [], []
+        for field in serializer_class().fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                                  relations.ManyRelatedField, relations.HyperlinkedRelatedField)) \
+                    or field.source == '*':
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{field.field_name} cannot be served from values()'
+                )
+            name = field.field_name
+            lookup = name if name in self.expressions else '__'.join(field.source_attrs)
+            guards = [] if name in self.expressions else _nullable_prefixes(meta.model, field.source_attrs)
+            self.steps.append((name, lookup, field, guards, _missing(field) if guards else None))
+            lookups.extend([lookup, *guards])
+        self.lookups = list(dict.fromkeys(lookups))
+
+    def project(self, queryset):
+        """``queryset`` as ``values()`` rows with every lookup the fields need, plus pk and sort keys."""
+        query = queryset.query
+        ordering = query.order_by or (query.default_ordering and queryset.model._meta.ordering) or ()
+        sort_keys = [term.lstrip('-') for term in ordering if isinstance(term, str) and term != '?']
+        return queryset.annotate(**self.expressions).values(*dict.fromkeys([*self.lookups, 'pk', *sort_keys]))
+
+    def bind(self):
+        """The steps with their converters, for the current time zone."""
+        current = timezone.get_current_timezone() if settings.USE_TZ else None
+        steps = []
+        for name, lookup, field, guards, missing in self.steps:
+            if isinstance(field, serializers.DateTimeField) and not hasattr(field, 'timezone'):
+                # DateTimeField looks the time zone up on every value unless it has its own.
+                field = copy.copy(field)
+                field.timezone = current
+            steps.append((name, lookup, _converter(field), guards, missing))
+        return steps
+
+    def represent(self, row, steps=None):
+        data = {}
+        for name, lookup, convert, guards, missing in steps or self.bind():
+            if guards and any(row[guard] is None for guard in guards):
+                if missing is not _SKIP:
+                    data[name] = missing
+                continue
+            value = row[lookup]
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+    def represent_many(self, rows):
+        represent, steps = self.represent, self.bind()
+        return [represent(row, steps) for row in rows]
+
+
+def compile_serializer(serializer_class):
+    """The ``CompiledSerializer`` of ``serializer_class``, built on first use."""
+    compiled = _compiled.get(serializer_class)
+    if compiled is None:
+        compiled = _compiled[serializer_class] = CompiledSerializer(serializer_class)
+    return compiled
+
+
+class FastListMixin:
+    """
+    Serve ``list()`` through the compiled serializer.
+
+    Place after any mixin that wraps ``list()`` (such as ``CachedListMixin``)
+    and before the generic view. Writes and detail views still go through
+    the regular serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        rows = compiled.project(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.represent_many(page))
+        return Response(compiled.represent_many(rows))
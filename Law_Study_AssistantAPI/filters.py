@@ -0,0 +1,53 @@
+"""
+Query-string filters shared by history listings and exports.
+
+``?since=`` (inclusive) and ``?until=`` (exclusive) take an ISO 8601 date or
+date-time and ``?type=`` one of a fixed set of values; anything else is a
+400 with the offending parameter named.
+"""
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def _bound(request, param, date_only):
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    day = parse_date(value) if moment is None else moment.date()
+    if day is None:
+        raise ValidationError({param: 'Use an ISO 8601 date or date-time.'})
+    if date_only:
+        return day
+    if moment is None:
+        moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def history_filters(request, date_field, type_field=None, types=(), date_only=False):
+    """
+    Lookups for ``?since=`` (inclusive), ``?until=`` (exclusive) and ``?type=``.
+
+    ``types`` are the accepted ``?type=`` values; ``type_field`` is either a
+    field name, filtered with ``?type=`` directly, or a dict mapping each type
+    to its own lookups.
+    """
+    lookups = {}
+    since = _bound(request, 'since', date_only)
+    until = _bound(request, 'until', date_only)
+    if since is not None:
+        lookups[f'{date_field}__gte'] = since
+    if until is not None:
+        lookups[f'{date_field}__lt'] = until
+    kind = request.query_params.get('type')
+    if kind:
+        if kind not in types:
+            raise ValidationError({'type': f'Expected one of: {", ".join(types)}.'})
+        if isinstance(type_field, dict):
+            lookups.update(type_field[kind])
+        else:
+            lookups[type_field] = kind
+    return lookups
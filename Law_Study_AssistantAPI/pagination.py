@@ -0,0 +1,268 @@
+"""
+Keyset (cursor) pagination used by every list endpoint.
+
+Pages are addressed by an opaque cursor holding the ``(sort_key, id)`` of
+the row at the page boundary instead of a page number, so neither a
+``COUNT(*)`` nor an ``OFFSET`` is needed and deep pages cost the same as
+the first one. The sort key is whatever ordering the view or its filter
+backends already applied to the queryset; the primary key is appended as a
+tiebreaker so the ordering is total and stable while rows are inserted.
+
+Several querysets with the same ordering and disjoint primary keys, such as
+a hot table and its archive, can be paged as one list with
+``paginate_querysets()``: the same cursor filters each of them and their
+pages are merged.
+
+Rows may be model instances or ``values()`` dicts; a dict row must carry
+``pk`` and the sort key.
+"""
+import base64
+import heapq
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _pk(row):
+    return row['pk'] if isinstance(row, dict) else row.pk
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a stable ``(sort_key, id)`` ordering.
+
+    ``?page_size=`` is capped at ``max_page_size``. ``?estimate_total=true``
+    adds an ``estimated_total`` taken from the query planner where the
+    backend offers one, otherwise from a count capped at ``estimate_cap``.
+    """
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    estimate_query_param = 'estimate_total'
+    estimate_cap = 10000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request)
+
+    def paginate_querysets(self, querysets, request):
+        """Paginate the merged rows of ``querysets``, ordered like the first one."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.sort_key, self.descending, self.nullable = self.get_sort_key(querysets[0])
+        self.estimated_total = None
+        if request.query_params.get(self.estimate_query_param, '').lower() == 'true':
+            self.estimated_total = sum(self.estimate_total(queryset) for queryset in querysets)
+
+        position, reverse = self.decode_cursor(request)
+        descending = self.descending != reverse
+        pages = []
+        for queryset in querysets:
+            if position is not None:
+                try:
+                    queryset = queryset.filter(self.after(descending, *position))
+                except (ValueError, ValidationError):
+                    # A well-formed cursor whose value does not fit the sort key, e.g. a date that is not one.
+                    raise NotFound(self.invalid_cursor_message)
+            pages.append(list(queryset.order_by(*self.ordering(descending))[:self.page_size + 1]))
+        if len(pages) == 1:
+            rows = pages[0]
+        else:
+            rows = list(heapq.merge(*pages, key=self.merge_key, reverse=descending))[:self.page_size + 1]
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_sort_key(self, queryset):
+        """Return ``(field, descending, nullable)`` for the leading ordering term."""
+        query = queryset.query
+        ordering = query.order_by or (query.default_ordering and queryset.model._meta.ordering) or ()
+        ordering = [term for term in ordering if isinstance(term, str)]
+        if not ordering:
+            return None, False, False
+        term = ordering[0]
+        field_name = term.lstrip('-')
+        if field_name in ('pk', 'id'):
+            return None, term.startswith('-'), False
+        if field_name in query.annotations:
+            nullable = False
+        else:
+            try:
+                nullable = queryset.model._meta.get_field(field_name).null
+            except FieldDoesNotExist:
+                nullable = True
+        return field_name, term.startswith('-'), nullable
+
+    def ordering(self, descending):
+        pk = '-pk' if descending else 'pk'
+        if self.sort_key is None:
+            return [pk]
+        if not self.nullable:
+            return ['-' + self.sort_key if descending else self.sort_key, pk]
+        # NULL sorts as the smallest value on every backend.
+        key = F(self.sort_key)
+        return [key.desc(nulls_last=True) if descending else key.asc(nulls_first=True), pk]
+
+    def after(self, descending, value, pk):
+        """Rows strictly after ``(value, pk)`` in the given direction."""
+        beyond = 'lt' if descending else 'gt'
+        tie = Q(**{f'pk__{beyond}': pk})
+        if self.sort_key is None:
+            return tie
+        key = self.sort_key
+        if value is None:
+            tie &= Q(**{f'{key}__isnull': True})
+            return tie if descending else tie | Q(**{f'{key}__isnull': False})
+        condition = Q(**{f'{key}__{beyond}': value}) | (Q(**{key: value}) & tie)
+        if self.nullable and descending:
+            condition |= Q(**{f'{key}__isnull': True})
+        return condition
+
+    def sort_value(self, row):
+        if self.sort_key is None:
+            return None
+        if isinstance(row, dict):
+            return row[self.sort_key]
+        value = row
+        for part in self.sort_key.split('__'):
+            value = getattr(value, part, None)
+        return value
+
+    def merge_key(self, row):
+        # Matches ordering(): NULL first, then the value, then the primary key.
+        value = self.sort_value(row)
+        return value is not None, value, _pk(row)
+
+    def position(self, row):
+        return [_encode_value(self.sort_value(row)), _pk(row)]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value, pk = data['v'], data['id']
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursors come from clients, so only accept what encode_cursor() writes: a scalar and an integer id.
+        if not (value is None or isinstance(value, (bool, int, float, str))) or \
+                not isinstance(pk, int) or isinstance(pk, bool):
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk), bool(data.get('r'))
+
+    def encode_cursor(self, row, reverse):
+        value, pk = self.position(row)
+        data = {'v': value, 'id': pk}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first, reverse=True)
+
+    def estimate_total(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        return queryset.order_by()[:self.estimate_cap].count()
+
+    def get_paginated_response(self, data):
+        body = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.estimated_total is not None:
+            body['estimated_total'] = self.estimated_total
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'estimated_total': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Opaque pagination cursor', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': f'Results per page (max {self.max_page_size})', 'schema': {'type': 'integer'}},
+            {'name': self.estimate_query_param, 'required': False, 'in': 'query',
+             'description': 'Include an estimated total row count', 'schema': {'type': 'boolean'}},
+        ]
+
+
+def paginated_response(request, queryset, serializer_class, *more_querysets, fast=False):
+    """
+    Paginate and serialize ``queryset`` for a function-based list view.
+
+    Any ``more_querysets`` (for example the archived rows of the same
+    history) are merged into the same pages. ``fast=True`` reads the rows
+    with ``values()`` and serializes them with the compiled serializer
+    (see ``fast_serializers``).
+    """
+    paginator = KeysetPagination()
+    querysets = [queryset, *more_querysets]
+    if fast:
+        from .fast_serializers import compile_serializer
+        compiled = compile_serializer(serializer_class)
+        page = paginator.paginate_querysets([compiled.project(qs) for qs in querysets], request)
+        return paginator.get_paginated_response(compiled.represent_many(page))
+    page = paginator.paginate_querysets(querysets, request)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
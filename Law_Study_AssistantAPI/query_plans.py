@@ -0,0 +1,62 @@
+"""
+Query plan checks for tests.
+
+``QueryPlanAssertions.assertNoFullScans()`` captures every query a block of
+code runs, asks the database to EXPLAIN it, and fails if any table is read
+by a full sequential scan instead of through an index. SQLite plans come
+from ``EXPLAIN QUERY PLAN``; on PostgreSQL, sequential scans are disabled
+for the check so that a seq scan in the plan means no usable index exists,
+rather than that the planner preferred one for a tiny test table.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+# "SCAN library_book" is a full scan; "SCAN library_book USING INDEX ..." is not.
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?P<table>\w+)(?: AS \w+)?$')
+
+
+def explain(sql):
+    """Return the plan for ``sql`` as a list of lines."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}')
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Tables read by a full scan in ``plan``."""
+    tables = set(connection.introspection.table_names())
+    if connection.vendor == 'sqlite':
+        matches = (SQLITE_FULL_SCAN.match(line.strip()) for line in plan)
+        return [match['table'] for match in matches if match and match['table'] in tables]
+    matches = (re.search(r'Seq Scan on (\w+)', line) for line in plan)
+    return [match[1] for match in matches if match and match[1] in tables]
+
+
+class QueryPlanAssertions:
+    """Mixin for ``TestCase`` classes that check the plans of the queries a view runs."""
+
+    @contextmanager
+    def assertNoFullScans(self):
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        problems = []
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(EXPLAINABLE):
+                continue
+            plan = explain(sql)
+            scanned = full_scans(plan)
+            if scanned:
+                problems.append(f'{", ".join(scanned)} scanned by:\n  {sql}\n  ' + '\n  '.join(plan))
+        if problems:
+            self.fail('Full table scans:\n' + '\n'.join(problems))
@@ -0,0 +1,153 @@
+"""
+Shared cache for public list responses.
+
+Responses are stored in the ``responses`` cache alias, which every worker
+process shares (a file-based cache locally, any shared backend in
+production). Each cache key embeds the current version of every model the
+response is built from, e.g. ``library.Book``. Writes to those models bump
+the version, so stale entries are simply never read again and expire on
+their own; nothing ever scans or deletes keys.
+
+A version is bumped by writing a fresh random token rather than by
+incrementing, because ``incr`` is not atomic across processes on file or
+database caches and two concurrent bumps must never produce the same
+value. Bumps happen immediately and again once the surrounding transaction
+commits, so a response cached from pre-commit data in between is also
+discarded. The commit-time bump also advances the models' ``ChangeMarker``
+rows used for conditional GETs (see ``conditional``). Inside a request,
+``CoalesceBumpsMiddleware`` holds the commit-time work back until the view
+returns and then does it once per model, so a checkout that bumps
+``library.Book`` several times writes its marker row once. A failed marker
+write is logged rather than raised, since the request has already committed.
+"""
+import hashlib
+import logging
+import secrets
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, transaction
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'responses'
+VERSION_PREFIX = 'model-version:'
+HITS_KEY = 'response-cache:hits'
+MISSES_KEY = 'response-cache:misses'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _set_versions(labels):
+    _cache().set_many({VERSION_PREFIX + label: secrets.token_hex(8) for label in labels}, timeout=None)
+
+
+_deferred = threading.local()
+
+
+def bump(*labels):
+    """Invalidate every cached response built from the models in ``labels``."""
+    _set_versions(labels)
+    transaction.on_commit(lambda: _committed(labels))
+
+
+def _committed(labels):
+    held = getattr(_deferred, 'labels', None)
+    if held is not None:
+        held.update(labels)
+        return
+    _set_versions(labels)
+    from .conditional import touch
+    try:
+        # A savepoint keeps a failed marker write from breaking an enclosing transaction.
+        with transaction.atomic():
+            touch(labels)
+    except DatabaseError:
+        logger.exception('Could not advance change markers for %s', ', '.join(labels))
+
+
+class CoalesceBumpsMiddleware:
+    """Do the commit-time work of a request's bumps once per model, after the view returns."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if getattr(_deferred, 'labels', None) is not None:
+            return self.get_response(request)
+        _deferred.labels = set()
+        try:
+            return self.get_response(request)
+        finally:
+            labels, _deferred.labels = _deferred.labels, None
+            if labels:
+                _committed(sorted(labels))
+
+
+def versions(labels):
+    """Current version token of each label, creating missing ones."""
+    cache = _cache()
+    keys = [VERSION_PREFIX + label for label in labels]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        cache.add(key, secrets.token_hex(8), timeout=None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return [found.get(key, '') for key in keys]
+
+
+def _count(key):
+    cache = _cache()
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def stats():
+    """Hit and miss counts since the counters were last reset."""
+    counts = _cache().get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / lookups, 4) if lookups else None}
+
+
+def response_key(request, view_name, labels, per_user):
+    # The absolute URI, because paginated bodies carry absolute next/previous links.
+    path = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+    user = request.user.pk if per_user and request.user.is_authenticated else '-'
+    return f'response:{view_name}:{":".join(versions(labels))}:{user}:{path}'
+
+
+class CachedListMixin:
+    """
+    Serve ``list()`` from the shared response cache.
+
+    ``cache_models`` lists the ``app_label.Model`` names whose writes
+    invalidate the response. Views whose output depends on the caller set
+    ``cache_per_user = True`` so each user gets their own entry.
+    """
+    cache_models = ()
+    cache_per_user = False
+    cache_timeout = None
+
+    def list(self, request, *args, **kwargs):
+        key = response_key(request, type(self).__name__, self.cache_models, self.cache_per_user)
+        cache = _cache()
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            return Response(data, headers={'X-Cache': 'HIT'})
+        _count(MISSES_KEY)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.cache_timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,26 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from django.conf import settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner that disables the shared response cache.
+
+    Version tokens live in the cache, not the database, so they are not
+    rolled back between tests and a cached response could outlive the rows
+    it was built from. Tests of the cache itself opt back in with
+    ``override_settings``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_override = override_settings(CACHES={
+            **settings.CACHES,
+            'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        })
+        self._cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Markers are created up front so concurrent first writes never race to insert them.
+LABELS = [
+    'books.Answer', 'books.Quiz', 'books.Subject', 'books.Topic',
+    'cases.Case', 'library.Book', 'library.Category',
+]
+
+
+def create_markers(apps, schema_editor):
+    ChangeMarker = apps.get_model('accounts', 'ChangeMarker')
+    ChangeMarker.objects.bulk_create([ChangeMarker(label=label) for label in LABELS], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeMarker',
+            fields=[
+                ('label', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_markers, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from .validators import validate_phone_number, validate_safe_text
 
 class User(AbstractUser):
@@ -24,3 +25,18 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
+
+
+class ChangeMarker(models.Model):
+    """
+    Version and time of the last committed write to one model's table.
+
+    Read by conditional GETs to build ETag and Last-Modified headers without
+    rendering the response; bumped by ``response_cache.bump()``.
+    """
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
@@ -7,6 +7,7 @@ urlpatterns = [
     path("login/", views.LoginView.as_view(), name="login"),
     # Admin user management
     path("admin/users/", views.list_users, name="admin-users"),
+    path("admin/users/export/", views.export_users, name="export-users"),
     path("admin/users/<int:user_id>/role/", views.update_user_role, name="update-user-role"),
     # JWT Authentication (uncomment after installing djangorestframework-simplejwt)
     # path("jwt/login/", views.CustomTokenObtainPairView.as_view(), name="jwt_login"),
@@ -3,14 +3,18 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from django.utils.html import escape
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 from .models import User
 from .serializers import UserSerializer, RegisterSerializer
 from .permissions import IsAdminUser
+from Law_Study_AssistantAPI.exports import EXPORT_RENDERERS, chunked, stream_export
+from Law_Study_AssistantAPI.filters import history_filters
+from Law_Study_AssistantAPI.pagination import paginated_response
 from rest_framework import status
 
 # Register
@@ -68,9 +72,20 @@ class UserProfileView(APIView):
 @permission_classes([IsAdminUser])
 def list_users(request):
     """Admin endpoint to list all users"""
-    users = User.objects.all()
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, User.objects.order_by('id'), UserSerializer)
+
+USER_EXPORT_FIELDS = UserSerializer.Meta.fields
+
+@extend_schema(responses=OpenApiTypes.STR)
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
+@permission_classes([IsAdminUser])
+def export_users(request):
+    """Admin export of all users as CSV or NDJSON; filters: ?since=, ?until= (membership date), ?type= (role)"""
+    roles = [value for value, _ in User.ROLE_CHOICES]
+    filters = history_filters(request, 'membership_date', 'role', roles, date_only=True)
+    rows = chunked(User.objects.filter(**filters).order_by('id'), USER_EXPORT_FIELDS)
+    return stream_export(request, 'users', USER_EXPORT_FIELDS, rows)
 
 from rest_framework import serializers
 
@@ -0,0 +1,48 @@
+"""
+Archival of quiz attempt history.
+
+See ``Law_Study_AssistantAPI.archive`` for how rows are moved.
+"""
+from django.db.models import Count, Max, Sum
+
+from Law_Study_AssistantAPI.archive import ARCHIVE_CHUNK_SIZE, archive_before, fold_into_rollups
+from .models import QuizAttempt, QuizAttemptArchive, QuizAttemptRollup
+
+
+def _fold(rollup, attempt):
+    rollup.attempts += 1
+    rollup.total_score += attempt.score
+    rollup.best_score = max(rollup.best_score, attempt.score)
+    rollup.last_attempted_at = max(rollup.last_attempted_at or attempt.attempted_at, attempt.attempted_at)
+
+
+def _archive_chunk(attempts):
+    QuizAttemptArchive.objects.bulk_create([
+        QuizAttemptArchive(
+            id=attempt.pk, user_id=attempt.user_id, topic_id=attempt.topic_id,
+            score=attempt.score, attempted_at=attempt.attempted_at, responses=attempt.responses,
+        )
+        for attempt in attempts
+    ])
+    fold_into_rollups(QuizAttemptRollup, ["user_id", "topic_id"], attempts, _fold,
+                      ["attempts", "total_score", "best_score", "last_attempted_at"])
+
+
+def archive_quiz_attempts(cutoff, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """Move quiz attempts made before ``cutoff`` to the archive; return how many moved."""
+    return archive_before(QuizAttempt.objects.all(), "attempted_at", cutoff, _archive_chunk, chunk_size)
+
+
+def quiz_attempt_totals(user):
+    """Attempt count, total and best score for ``user``, archived attempts included."""
+    hot = QuizAttempt.objects.filter(user=user).aggregate(
+        attempts=Count("pk"), total_score=Sum("score"), best_score=Max("score")
+    )
+    archived = QuizAttemptRollup.objects.filter(user=user).aggregate(
+        attempts=Sum("attempts"), total_score=Sum("total_score"), best_score=Max("best_score")
+    )
+    return {
+        "attempts": (hot["attempts"] or 0) + (archived["attempts"] or 0),
+        "total_score": (hot["total_score"] or 0) + (archived["total_score"] or 0),
+        "best_score": max(hot["best_score"] or 0, archived["best_score"] or 0),
+    }
@@ -0,0 +1,84 @@
+"""
+Quiz grading against cached answer keys.
+
+A topic's answer key is ``{quiz_id: frozenset(correct answer ids)}``, read
+with one query together with each question's answer choices and kept in the
+shared ``responses`` cache. Its cache key embeds the current versions of
+``books.Quiz`` and ``books.Answer``, which ``ChangeTracked`` bumps on every
+save and delete, so an edited key is simply never read again (see
+``Law_Study_AssistantAPI.response_cache``). Grading a submission is then a
+dictionary walk with no queries.
+
+The graded responses are stored on the attempt as a packed little-endian
+array of ``(quiz id, answer id)`` pairs, 16 bytes per answered question.
+"""
+import struct
+
+from django.core.cache import caches
+
+from Law_Study_AssistantAPI import response_cache
+from .models import Quiz
+
+ANSWER_KEY_MODELS = ("books.Quiz", "books.Answer")
+ANSWER_KEY_TIMEOUT = 24 * 60 * 60
+
+
+def _key(topic_id):
+    return f'quiz-answer-key:{topic_id}:{":".join(response_cache.versions(ANSWER_KEY_MODELS))}'
+
+
+def load_answer_key(topic_id):
+    """
+    Read ``topic_id``'s answer key and answer choices from the database.
+
+    Returns ``(correct, choices)``, both ``{quiz_id: frozenset(answer ids)}``;
+    a question without a correct answer maps to an empty set in ``correct``.
+    """
+    correct, choices = {}, {}
+    rows = Quiz.objects.filter(topic_id=topic_id).values_list("pk", "answers__pk", "answers__is_correct")
+    for quiz_id, answer_id, is_correct in rows:
+        correct.setdefault(quiz_id, set())
+        choices.setdefault(quiz_id, set())
+        if answer_id is not None:
+            choices[quiz_id].add(answer_id)
+        if is_correct:
+            correct[quiz_id].add(answer_id)
+    return (
+        {quiz_id: frozenset(answer_ids) for quiz_id, answer_ids in correct.items()},
+        {quiz_id: frozenset(answer_ids) for quiz_id, answer_ids in choices.items()},
+    )
+
+
+def answer_key(topic_id):
+    """``load_answer_key(topic_id)``, from the cache when no quiz or answer has changed since it was stored."""
+    cache = caches[response_cache.CACHE_ALIAS]
+    key = _key(topic_id)
+    answers = cache.get(key)
+    if answers is None:
+        answers = load_answer_key(topic_id)
+        cache.set(key, answers, ANSWER_KEY_TIMEOUT)
+    return answers
+
+
+def responses_of(choices, submitted):
+    """``(quiz_id, answer_id)`` for each question whose ``submitted[str(quiz_id)]`` is one of its answers."""
+    responses = []
+    for quiz_id, answer_ids in choices.items():
+        answer_id = submitted.get(str(quiz_id))
+        if answer_id in answer_ids:
+            responses.append((quiz_id, answer_id))
+    return responses
+
+
+def grade(correct, responses):
+    """Count the ``(quiz_id, answer_id)`` responses that are correct under the answer key ``correct``."""
+    return sum(answer_id in correct[quiz_id] for quiz_id, answer_id in responses)
+
+
+def pack_responses(responses):
+    return struct.pack(f"<{2 * len(responses)}q", *(n for pair in responses for n in pair))
+
+
+def unpack_responses(data):
+    values = struct.unpack(f"<{len(data) // 8}q", bytes(data))
+    return list(zip(values[::2], values[1::2]))
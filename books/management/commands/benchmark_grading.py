@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from Law_Study_AssistantAPI import response_cache
+from books.grading import ANSWER_KEY_MODELS, answer_key, grade, load_answer_key, responses_of
+from books.models import Answer, Quiz, Subject, Topic
+
+
+class Command(BaseCommand):
+    help = 'Time grading a quiz submission per-question against the cached answer key (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, nargs='+', default=[10, 100, 1000],
+                            help='Questions per topic to benchmark')
+        parser.add_argument('--choices', type=int, default=4, help='Answers per question')
+        parser.add_argument('--repeat', type=int, default=20, help='Submissions timed per row')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"questions":>10}{"per-question ms":>17}{"queries":>9}{"cold key ms":>13}{"cached ms":>11}{"queries":>9}'
+            f'  ({connection.vendor})'
+        )
+        for questions in options['questions']:
+            with transaction.atomic():
+                topic, submitted = self._populate(questions, options['choices'])
+                legacy, legacy_queries = self._time(lambda: self._legacy_grade(topic.pk, submitted), options['repeat'])
+                cold, _ = self._time(lambda: self._grade(load_answer_key(topic.pk), submitted), options['repeat'])
+                answer_key(topic.pk)
+                cached, cached_queries = self._time(lambda: self._grade(answer_key(topic.pk), submitted),
+                                                    options['repeat'])
+                self.stdout.write(
+                    f'{questions:>10}{legacy:>17.2f}{legacy_queries:>9}{cold:>13.2f}{cached:>11.2f}{cached_queries:>9}'
+                )
+                transaction.set_rollback(True)
+
+    def _time(self, submit, repeat):
+        """Mean milliseconds per call of ``submit`` and the queries one call makes."""
+        with CaptureQueriesContext(connection) as queries:
+            submit()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            submit()
+        return (time.perf_counter() - start) * 1000 / repeat, len(queries)
+
+    def _grade(self, key, submitted):
+        correct, choices = key
+        return grade(correct, responses_of(choices, submitted))
+
+    def _legacy_grade(self, topic_id, submitted):
+        score = 0
+        for quiz in Quiz.objects.filter(topic_id=topic_id):
+            correct_answers = quiz.answers.filter(is_correct=True).values_list('id', flat=True)
+            user_answer = submitted.get(str(quiz.id))
+            if user_answer and int(user_answer) in correct_answers:
+                score += 1
+        return score
+
+    def _populate(self, questions, choices):
+        """A topic of ``questions`` quizzes and a submission answering every other one correctly."""
+        subject = Subject.objects.create(title='Grading Bench')
+        topic = Topic.objects.create(subject=subject, title=f'Grading Bench {questions}')
+        quizzes = Quiz.objects.bulk_create([Quiz(topic=topic, question=f'Question {i}') for i in range(questions)])
+        answers = Answer.objects.bulk_create([
+            Answer(quiz=quiz, text=f'Choice {c}', is_correct=c == 0) for quiz in quizzes for c in range(choices)
+        ])
+        # bulk_create skips ChangeTracked.save(); retire keys cached for a rolled-back topic with this id.
+        response_cache.bump(*ANSWER_KEY_MODELS)
+        submitted = {str(quiz.pk): answers[i * choices + i % 2].pk for i, quiz in enumerate(quizzes)}
+        return topic, submitted
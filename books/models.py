@@ -1,9 +1,35 @@
 from django.db import models
 from django.conf import settings
+from Law_Study_AssistantAPI import response_cache
 
 User = settings.AUTH_USER_MODEL
 
-class Subject(models.Model):
+
+class ChangeTracked(models.Model):
+    """
+    Bumps the cache versions and change markers of the model on every write.
+
+    ``cascades_to`` names the models whose rows a delete removes through
+    ``on_delete=CASCADE``, since those deletes bypass their own ``delete()``.
+    """
+    cascades_to = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        response_cache.bump(self._meta.label)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        response_cache.bump(self._meta.label, *self.cascades_to)
+        return result
+
+
+class Subject(ChangeTracked):
+    cascades_to = ("books.Topic", "books.Quiz", "books.Answer", "cases.Case")
+
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
 
@@ -11,7 +37,8 @@ class Subject(models.Model):
         return self.title
 
 
-class Topic(models.Model):
+class Topic(ChangeTracked):
+    cascades_to = ("books.Quiz", "books.Answer", "cases.Case")
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name="topics")
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
@@ -31,7 +58,8 @@ class Note(models.Model):
         return f"Note by {self.user.username} on {self.topic.title}"
 
 
-class Quiz(models.Model):
+class Quiz(ChangeTracked):
+    cascades_to = ("books.Answer",)
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name="quizzes")
     question = models.TextField()
 
@@ -39,7 +67,7 @@ class Quiz(models.Model):
         return f"Quiz: {self.question[:30]}..."
 
 
-class Answer(models.Model):
+class Answer(ChangeTracked):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="answers")
     text = models.CharField(max_length=255)
     is_correct = models.BooleanField(default=False)
@@ -53,6 +81,64 @@ class QuizAttempt(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name="attempts")
     score = models.IntegerField()
     attempted_at = models.DateTimeField(auto_now_add=True)
+    # (quiz id, answer id) of each answered question, packed by ``grading.pack_responses``
+    responses = models.BinaryField(default=b"")
 
     def __str__(self):
         return f"{self.user.username} - {self.topic.title} ({self.score})"
+
+
+class QuizAttemptArchive(models.Model):
+    """Quiz attempt moved out of the hot table, keeping its original primary key."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_quiz_attempts")
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name="archived_attempts")
+    score = models.IntegerField()
+    attempted_at = models.DateTimeField()
+    responses = models.BinaryField(default=b"")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "attempted_at"], name="quiz_attempt_archive_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.topic_id} ({self.score}, archived)"
+
+
+class QuizAttemptRollup(models.Model):
+    """Per-user, per-topic totals for archived quiz attempts."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="quiz_attempt_rollups")
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name="attempt_rollups")
+    attempts = models.PositiveIntegerField(default=0)
+    total_score = models.IntegerField(default=0)
+    best_score = models.IntegerField(default=0)
+    last_attempted_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "topic"], name="unique_quiz_attempt_rollup")
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.topic_id}: {self.attempts} attempts"
+
+
+class QuizStats(models.Model):
+    """Running per-question counts over every graded attempt of its topic."""
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    attempts = models.PositiveIntegerField(default=0)
+    answered = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.quiz_id}: {self.correct}/{self.attempts} correct"
+
+
+class AnswerStats(models.Model):
+    """How many graded attempts chose this answer."""
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    chosen = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.answer_id}: chosen {self.chosen} times"
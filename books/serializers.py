@@ -35,6 +35,29 @@ class QuizSerializer(serializers.ModelSerializer):
 
 
 class QuizAttemptSerializer(serializers.ModelSerializer):
+    # Chosen answer id per quiz id, graded on submit and not stored
+    answers = serializers.DictField(child=serializers.IntegerField(), write_only=True, required=False)
+
     class Meta:
         model = QuizAttempt
-        fields = ["id", "user", "topic", "score", "attempted_at"]
+        fields = ["id", "user", "topic", "score", "attempted_at", "answers"]
+        read_only_fields = ["user", "score", "attempted_at"]
+
+
+class AnswerStatsSerializer(serializers.ModelSerializer):
+    chosen = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Answer
+        fields = ["id", "text", "is_correct", "chosen"]
+
+
+class QuizStatsSerializer(serializers.ModelSerializer):
+    attempts = serializers.IntegerField(read_only=True)
+    answered = serializers.IntegerField(read_only=True)
+    correct = serializers.IntegerField(read_only=True)
+    answers = AnswerStatsSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Quiz
+        fields = ["id", "question", "attempts", "answered", "correct", "answers"]
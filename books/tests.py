@@ -1,10 +1,15 @@
-from django.test import TestCase
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from accounts.models import User
-from .models import Subject, Topic, Note, Quiz, Answer
+from .archive import archive_quiz_attempts
+from .grading import answer_key, unpack_responses
+from .models import Subject, Topic, Note, Quiz, Answer, QuizAttempt, QuizAttemptArchive
 
 class BookModelsTest(TestCase):
     def setUp(self):
@@ -60,13 +65,13 @@ class BooksAPITest(APITestCase):
         url = '/books/subjects/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
         
     def test_topic_list(self):
         url = f'/books/subjects/{self.subject.id}/topics/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
         
     def test_note_creation(self):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
@@ -77,3 +82,157 @@ class BooksAPITest(APITestCase):
             print(f"Note creation failed: {response.status_code}, {response.data}")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Note.objects.filter(user=self.user).exists())
+
+
+class QuizAttemptArchiveTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='student')
+        subject = Subject.objects.create(title='Criminal Law')
+        self.topic = Topic.objects.create(subject=subject, title='Mens Rea')
+        now = timezone.now()
+        for days_ago, score in enumerate([3, 5, 2, 4]):
+            attempt = QuizAttempt.objects.create(user=self.user, topic=self.topic, score=score)
+            QuizAttempt.objects.filter(pk=attempt.pk).update(attempted_at=now - timedelta(days=days_ago * 100))
+        self.client.force_authenticate(user=self.user)
+
+    def test_history_totals_survive_archival(self):
+        self.assertEqual(archive_quiz_attempts(timezone.now() - timedelta(days=150)), 2)
+        self.assertEqual(QuizAttempt.objects.count(), 2)
+        self.assertEqual(QuizAttemptArchive.objects.count(), 2)
+
+        response = self.client.get('/books/quiz/attempts/')
+        self.assertEqual([row['score'] for row in response.data['results']], [3, 5])
+        self.assertEqual(response.data['totals'], {'attempts': 4, 'total_score': 14, 'best_score': 5})
+
+        response = self.client.get('/books/quiz/attempts/?include_archived=true')
+        self.assertEqual([row['score'] for row in response.data['results']], [3, 5, 2, 4])
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.subject = Subject.objects.create(title='Equity')
+        self.topic = Topic.objects.create(subject=self.subject, title='Trusts')
+        quiz = Quiz.objects.create(topic=self.topic, question='What is a trust?')
+        self.answer = Answer.objects.create(quiz=quiz, text='An obligation', is_correct=True)
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        response = self.client.get('/books/subjects/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('public', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/books/subjects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_write_changes_etag(self):
+        url = f'/books/topics/{self.topic.id}/quiz/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.answer.text = 'A fiduciary obligation'
+            self.answer.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['answers'][0]['text'], 'A fiduciary obligation')
+
+    def test_cascaded_delete_changes_etag(self):
+        other = Topic.objects.create(subject=self.subject, title='Estoppel')
+        etag = self.client.get(f'/books/topics/{other.id}/quiz/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.delete()
+        response = self.client.get(f'/books/topics/{other.id}/quiz/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'books-grading-test'},
+})
+class QuizGradingTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='examinee')
+        subject = Subject.objects.create(title='Contract Law')
+        self.topic = Topic.objects.create(subject=subject, title='Offer and Acceptance')
+        self.correct = {}
+        self.wrong = {}
+        for i in range(3):
+            quiz = Quiz.objects.create(topic=self.topic, question=f'Question {i}')
+            self.correct[quiz.id] = Answer.objects.create(quiz=quiz, text='Right', is_correct=True)
+            self.wrong[quiz.id] = Answer.objects.create(quiz=quiz, text='Wrong')
+        self.client.force_authenticate(user=self.user)
+
+    def submit(self, answers):
+        return self.client.post('/books/quiz/attempt/', {'topic': self.topic.id, 'answers': answers}, format='json')
+
+    def test_submission_is_graded_and_saved(self):
+        first, second, third = self.correct
+        response = self.submit({
+            str(first): self.correct[first].id, str(second): self.wrong[second].id, str(third): self.correct[first].id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['score'], 1)
+        self.assertEqual(response.data['user'], self.user.id)
+        self.assertEqual(QuizAttempt.objects.get().score, 1)
+
+    def test_submit_queries_do_not_grow_with_questions(self):
+        self.submit({})
+        # Topic lookup, attempt insert and the counter writes, inside a savepoint.
+        with self.assertNumQueries(8):
+            self.submit({str(quiz_id): answer.id for quiz_id, answer in self.correct.items()})
+        for i in range(30):
+            quiz = Quiz.objects.create(topic=self.topic, question=f'Extra {i}')
+            Answer.objects.create(quiz=quiz, text='Right', is_correct=True)
+        self.assertEqual(len(answer_key(self.topic.id)[0]), 33)
+        with self.assertNumQueries(8):
+            response = self.submit({str(quiz_id): answer.id for quiz_id, answer in self.correct.items()})
+        self.assertEqual(response.data['score'], 3)
+
+    def test_answer_change_invalidates_cached_key(self):
+        quiz_id, answer = next(iter(self.correct.items()))
+        self.assertEqual(self.submit({str(quiz_id): answer.id}).data['score'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.is_correct = False
+            answer.save()
+            self.wrong[quiz_id].is_correct = True
+            self.wrong[quiz_id].save()
+        self.assertEqual(self.submit({str(quiz_id): answer.id}).data['score'], 0)
+        self.assertEqual(self.submit({str(quiz_id): self.wrong[quiz_id].id}).data['score'], 1)
+
+    def test_invalid_answers_are_rejected(self):
+        response = self.submit({'1': 'not an id'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_responses_are_stored_and_counted(self):
+        first, second, third = self.correct
+        other = Answer.objects.create(quiz=Quiz.objects.create(topic=self.topic, question='Elsewhere'), text='X')
+        self.submit({str(first): self.correct[first].id, str(second): self.wrong[second].id,
+                     str(third): other.id})
+        self.submit({str(first): self.wrong[first].id})
+        attempt = QuizAttempt.objects.order_by('pk').first()
+        # An answer from another question counts as unanswered.
+        self.assertEqual(unpack_responses(attempt.responses),
+                         [(first, self.correct[first].id), (second, self.wrong[second].id)])
+
+        staff = User.objects.create(username='lecturer', role='admin')
+        self.client.force_authenticate(user=self.user)
+        url = f'/books/topics/{self.topic.id}/quiz/stats/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=staff)
+        with self.assertNumQueries(2):
+            rows = self.client.get(url).data['results']
+        self.assertEqual(
+            [(row['id'], row['attempts'], row['answered'], row['correct']) for row in rows],
+            [(first, 2, 2, 1), (second, 2, 1, 0), (third, 2, 0, 0), (other.quiz_id, 2, 0, 0)],
+        )
+        self.assertEqual([(answer['id'], answer['chosen']) for answer in rows[0]['answers']],
+                         [(self.correct[first].id, 1), (self.wrong[first].id, 1)])
+
+    def test_archived_attempts_keep_their_responses(self):
+        quiz_id, answer = next(iter(self.correct.items()))
+        self.submit({str(quiz_id): answer.id})
+        archive_quiz_attempts(timezone.now() + timedelta(seconds=1))
+        self.assertEqual(unpack_responses(QuizAttemptArchive.objects.get().responses), [(quiz_id, answer.id)])
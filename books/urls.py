@@ -17,6 +17,7 @@ urlpatterns = [
 
     # Quizzes
     path("topics/<int:pk>/quiz/", views.TopicQuizView.as_view(), name="topic-quiz"),
+    path("topics/<int:pk>/quiz/stats/", views.TopicQuizStatsView.as_view(), name="topic-quiz-stats"),
     path("quiz/attempt/", views.QuizAttemptView.as_view(), name="quiz-attempt"),
     path("quiz/attempts/", views.QuizHistoryView.as_view(), name="quiz-history"),
 ]
@@ -1,17 +1,24 @@
+from django.db import transaction
 from rest_framework import generics, permissions
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
-from .models import Subject, Topic, Note, Quiz, QuizAttempt
+from .archive import quiz_attempt_totals
+from .grading import answer_key, grade, pack_responses, responses_of
+from .quiz_stats import record, topic_stats
+from .models import Subject, Topic, Note, Quiz, QuizAttempt, QuizAttemptArchive
 from .serializers import (
     SubjectSerializer, TopicSerializer,
-    NoteSerializer, QuizSerializer, QuizAttemptSerializer
+    NoteSerializer, QuizSerializer, QuizAttemptSerializer, QuizStatsSerializer
 )
-from accounts.permissions import IsAdminOrReadOnly
+from accounts.permissions import IsAdminOrReadOnly, IsLecturerOrAdmin
+from Law_Study_AssistantAPI.archive import include_archived
+from Law_Study_AssistantAPI.conditional import ConditionalGetMixin
 import os
 
 # ----- SUBJECTS -----
-class SubjectListCreateView(generics.ListCreateAPIView):
+class SubjectListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
+    etag_models = ["books.Subject"]
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
@@ -27,7 +34,8 @@ class SubjectDetailView(generics.RetrieveAPIView):
 
 
 # ----- TOPICS -----
-class TopicListCreateView(generics.ListCreateAPIView):
+class TopicListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
+    etag_models = ["books.Topic"]
     serializer_class = TopicSerializer
 
     def get_queryset(self):
@@ -62,7 +70,7 @@ class NoteListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Note.objects.filter(user=self.request.user)
+        return Note.objects.filter(user=self.request.user).order_by('-created_at')
 
 
 class NoteDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -91,7 +99,8 @@ class NoteCreateView(generics.CreateAPIView):
 
 
 # ----- QUIZZES -----
-class TopicQuizView(generics.ListAPIView):
+class TopicQuizView(ConditionalGetMixin, generics.ListAPIView):
+    etag_models = ["books.Quiz", "books.Answer"]
     serializer_class = QuizSerializer
 
     def get_queryset(self):
@@ -104,20 +113,22 @@ class QuizAttemptView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        topic_id = self.request.data.get("topic")
-        answers = self.request.data.get("answers", {})
-        
-        quizzes = Quiz.objects.filter(topic_id=topic_id)
-        score = 0
-        
-        for quiz in quizzes:
-            correct_answers = quiz.answers.filter(is_correct=True).values_list('id', flat=True)
-            user_answer = answers.get(str(quiz.id))
-            
-            if user_answer and int(user_answer) in correct_answers:
-                score += 1
-                
-        serializer.save(user=self.request.user, topic_id=topic_id, score=score)
+        submitted = serializer.validated_data.pop("answers", {})
+        correct, choices = answer_key(serializer.validated_data["topic"].pk)
+        responses = responses_of(choices, submitted)
+        with transaction.atomic():
+            serializer.save(user=self.request.user, score=grade(correct, responses),
+                            responses=pack_responses(responses))
+            record(correct, responses)
+
+
+class TopicQuizStatsView(generics.ListAPIView):
+    """Per-question attempt, answer and correct counts, and how often each answer was chosen."""
+    serializer_class = QuizStatsSerializer
+    permission_classes = [IsLecturerOrAdmin]
+
+    def get_queryset(self):
+        return topic_stats(self.kwargs["pk"])
 
 
 class QuizHistoryView(generics.ListAPIView):
@@ -125,4 +136,14 @@ class QuizHistoryView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user)
+        return QuizAttempt.objects.filter(user=self.request.user).order_by('-attempted_at')
+
+    def list(self, request, *args, **kwargs):
+        # ?include_archived=true pages through archived attempts as well
+        querysets = [self.get_queryset()]
+        if include_archived(request):
+            querysets.append(QuizAttemptArchive.objects.filter(user=request.user).order_by('-attempted_at'))
+        page = self.paginator.paginate_querysets(querysets, request)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['totals'] = quiz_attempt_totals(request.user)
+        return response
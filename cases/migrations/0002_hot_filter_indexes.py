@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_history_archive'),
+        ('cases', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['topic', 'title'], name='case_topic_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['title'], name='case_title_idx'),
+        ),
+    ]
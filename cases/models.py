@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 from books.models import Topic
+from Law_Study_AssistantAPI import response_cache
 
 class Case(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name="cases")
@@ -13,10 +14,24 @@ class Case(models.Model):
     total_copies = models.PositiveIntegerField(validators=[MinValueValidator(1)], default=1)
     available_copies = models.PositiveIntegerField(validators=[MinValueValidator(0)], default=1)
     
+    class Meta:
+        indexes = [
+            # Cases of a topic, listed by title
+            models.Index(fields=['topic', 'title'], name='case_topic_title_idx'),
+            # All cases, listed by title
+            models.Index(fields=['title'], name='case_title_idx'),
+        ]
+    
     def save(self, *args, **kwargs):
         if not self.pk:  # New case
             self.available_copies = self.total_copies
         super().save(*args, **kwargs)
+        response_cache.bump(Case._meta.label)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        response_cache.bump(Case._meta.label)
+        return result
     
     @property
     def is_available(self):
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from django.utils.html import escape
 from .models import Case
 
@@ -10,6 +11,10 @@ class CaseSerializer(serializers.ModelSerializer):
         fields = ["id", "topic", "title", "suit_number", "number_of_pages", 
                  "summary", "citation", "year", "total_copies", "available_copies", "is_available"]
         read_only_fields = ['available_copies']
+        # Model properties computed in SQL for the values() fast path
+        read_expressions = {
+            'is_available': ExpressionWrapper(Q(available_copies__gt=0), output_field=BooleanField()),
+        }
     
     def validate(self, attrs):
         # Sanitize text fields
@@ -0,0 +1,14 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from books.models import Subject, Topic
+from Law_Study_AssistantAPI.query_plans import QueryPlanAssertions
+
+
+class CaseQueryPlanTest(QueryPlanAssertions, TestCase):
+    def test_case_lists_use_indexes(self):
+        topic = Topic.objects.create(subject=Subject.objects.create(title='Contract Law'), title='Offer')
+        client = APIClient()
+        with self.assertNoFullScans():
+            for url in ['/cases/', f'/cases/topics/{topic.id}/cases/', f'/cases/topics/{topic.id}/cases/?available_only=true']:
+                self.assertEqual(client.get(url).status_code, 200, url)
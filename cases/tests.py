@@ -55,7 +55,7 @@ class CasesAPITest(APITestCase):
         url = f'/cases/topics/{self.topic.id}/cases/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
         
     def test_case_detail(self):
         url = reverse('case-detail', kwargs={'pk': self.case.id})
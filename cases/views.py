@@ -4,9 +4,13 @@ from django.utils.html import escape
 from .models import Case
 from .serializers import CaseSerializer
 from accounts.permissions import IsAdminOrReadOnly
+from Law_Study_AssistantAPI.conditional import ConditionalGetMixin
+from Law_Study_AssistantAPI.fast_serializers import FastListMixin
+from Law_Study_AssistantAPI.response_cache import CachedListMixin
 
 # List & Create cases for a topic
-class CaseListCreateView(generics.ListCreateAPIView):
+class CaseListCreateView(CachedListMixin, FastListMixin, generics.ListCreateAPIView):
+    cache_models = ['cases.Case']
     serializer_class = CaseSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'suit_number']
@@ -34,7 +38,8 @@ class CaseListCreateView(generics.ListCreateAPIView):
         serializer.save(topic_id=topic_id)
 
 # List all cases with filtering
-class CaseListView(generics.ListAPIView):
+class CaseListView(ConditionalGetMixin, CachedListMixin, FastListMixin, generics.ListAPIView):
+    cache_models = etag_models = ['cases.Case']
     queryset = Case.objects.all()
     serializer_class = CaseSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
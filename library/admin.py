@@ -1,11 +1,16 @@
 from django.contrib import admin
-from .models import Book, BookCheckout, Category, Reservation
+from .models import Book, BookCheckout, Category, CategoryInventory, OutboxMessage, Reservation
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'description']
     search_fields = ['name']
 
+@admin.register(CategoryInventory)
+class CategoryInventoryAdmin(admin.ModelAdmin):
+    list_display = ['category', 'title_count', 'total_copies', 'available_copies']
+    search_fields = ['category__name']
+
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ['title', 'author', 'isbn', 'category', 'total_copies', 'available_copies', 'location']
@@ -22,6 +27,13 @@ class BookCheckoutAdmin(admin.ModelAdmin):
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
-    list_display = ['user', 'book', 'reservation_date', 'is_active', 'notified']
+    list_display = ['user', 'book', 'reservation_date', 'is_active', 'notified', 'queue_position', 'expires_at']
     list_filter = ['is_active', 'notified', 'reservation_date']
-    search_fields = ['user__username', 'book__title']
\ No newline at end of file
+    search_fields = ['user__username', 'book__title']
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['user', 'kind', 'subject', 'created_at', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['kind', 'sent_at']
+    search_fields = ['user__username', 'subject']
+    readonly_fields = ['created_at']
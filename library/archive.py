@@ -0,0 +1,39 @@
+"""
+Archival of library transaction history.
+
+See ``Law_Study_AssistantAPI.archive`` for how rows are moved.
+"""
+from django.db.models import Count, Sum
+
+from Law_Study_AssistantAPI.archive import ARCHIVE_CHUNK_SIZE, archive_before, fold_into_rollups
+from .models import Transaction, TransactionArchive, TransactionRollup
+
+
+def _fold(rollup, transaction):
+    date = transaction.transaction_date
+    rollup.count += 1
+    rollup.first_at = min(rollup.first_at or date, date)
+    rollup.last_at = max(rollup.last_at or date, date)
+
+
+def _archive_chunk(transactions):
+    TransactionArchive.objects.bulk_create([
+        TransactionArchive.from_transaction(transaction) for transaction in transactions
+    ])
+    fold_into_rollups(TransactionRollup, ['user_id', 'transaction_type'], transactions, _fold,
+                      ['count', 'first_at', 'last_at'])
+
+
+def archive_transactions(cutoff, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """Move transactions made before ``cutoff`` to the archive; return how many moved."""
+    return archive_before(Transaction.objects.all(), 'transaction_date', cutoff, _archive_chunk, chunk_size)
+
+
+def transaction_totals(user):
+    """Transaction counts by type for ``user``, archived ones included."""
+    totals = {transaction_type: 0 for transaction_type, _ in Transaction.TRANSACTION_TYPES}
+    hot = Transaction.objects.filter(user=user).order_by().values('transaction_type').annotate(n=Count('pk'))
+    archived = TransactionRollup.objects.filter(user=user).values('transaction_type').annotate(n=Sum('count'))
+    for row in [*hot, *archived]:
+        totals[row['transaction_type']] = totals.get(row['transaction_type'], 0) + row['n']
+    return totals
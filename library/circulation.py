@@ -0,0 +1,301 @@
+"""
+Checkout, return and reservation operations shared by the circulation views.
+
+Copy counts are changed with a single conditional UPDATE
+(``available_copies = available_copies - 1 WHERE available_copies > 0``)
+rather than read, check and ``save()`` in Python, so concurrent requests for
+the last copy of a title can neither over-lend it nor lose an update, and no
+row lock is held while Python code runs. Duplicate checkouts are rejected by
+the ``unique_active_checkout`` constraint instead of a separate query.
+
+Returned copies go through ``holds.release_copies()`` so they are set aside
+for the next reservation on that book before reaching the shelf. Fines
+charged on return are posted to the fine ledger, and members whose posted
+balance is above ``FINE_BLOCK_THRESHOLD`` cannot borrow.
+"""
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+
+from . import forecast, holds, inventory, ledger, trending
+from Law_Study_AssistantAPI import response_cache
+from .fines import FINE_PER_DAY
+from .models import LOAN_PERIOD, Book, BookCheckout, Reservation, Transaction
+
+MAX_BATCH_SIZE = 100
+
+
+class CirculationError(Exception):
+    """A checkout or return the caller is not allowed to make."""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def check_fines(user):
+    """Refuse to lend to ``user`` while their posted fines are above the threshold."""
+    balance, _ = ledger.balance_of(user.pk)
+    if ledger.is_blocked(balance):
+        raise CirculationError(
+            f'Outstanding fines of ${balance:.2f} are above the ${settings.FINE_BLOCK_THRESHOLD:.2f} limit; '
+            'settle them before borrowing',
+            status.HTTP_403_FORBIDDEN,
+        )
+
+
+def _has_open_checkout(user, book_ids):
+    """Whether ``user`` holds an open checkout of any of ``book_ids``, i.e. a unique_active_checkout clash."""
+    return BookCheckout.objects.filter(user=user, book_id__in=book_ids, is_returned=False).exists()
+
+
+def checkout(user, book_id):
+    """Lend one copy of ``book_id`` to ``user`` and return the new checkout."""
+    check_fines(user)
+    try:
+        with transaction.atomic():
+            # A copy held for the user's reservation is already off the shelf.
+            held = holds.holds_for(user, [book_id])
+            from_hold = held.get(book_id, (None, False))[1]
+            claimed = from_hold or Book.objects.filter(
+                pk=book_id, available_copies__gt=0
+            ).update(available_copies=F('available_copies') - 1)
+            if not claimed:
+                if not Book.objects.filter(pk=book_id).exists():
+                    raise Http404('No Book matches the given query.')
+                raise CirculationError('No copies available')
+
+            book = Book.objects.get(pk=book_id)
+            if not from_hold:
+                inventory.adjust_available([book.category_id], -1)
+                response_cache.bump(Book._meta.label)
+            checkout = BookCheckout.objects.create(user=user, book=book)
+            trending.record([book.id], 'checkouts')
+            forecast.invalidate([book.id])
+            Transaction.objects.create(
+                user=user,
+                book=book,
+                book_title=book.title,
+                transaction_type='checkout',
+                notes=f'Book checked out: {book.title}'
+            )
+            holds.leave_queues(held)
+    except IntegrityError:
+        # Only unique_active_checkout is the caller's mistake; the claimed copy is rolled back with it.
+        if not _has_open_checkout(user, [book_id]):
+            raise
+        raise CirculationError('You already have this book checked out')
+    return checkout
+
+
+def return_checkout(user, checkout_id):
+    """Mark ``checkout_id`` returned, charging any overdue fine, and free its copy."""
+    checkout = get_object_or_404(BookCheckout.objects.select_related('book'), pk=checkout_id)
+    if checkout.user_id != user.pk:
+        raise CirculationError('You can only return your own books', status.HTTP_403_FORBIDDEN)
+    if checkout.is_returned:
+        raise CirculationError('Book already returned')
+
+    checkout.return_date = timezone.now()
+
+    with transaction.atomic():
+        # Read the fine under lock so a concurrent fine sweep's accrual is not posted again.
+        charged = BookCheckout.objects.select_for_update().filter(pk=checkout.pk, is_returned=False).values_list(
+            'fine_amount', flat=True
+        ).first()
+        if charged is None:
+            raise CirculationError('Book already returned')
+        checkout.fine_amount = checkout.days_overdue * FINE_PER_DAY if checkout.is_overdue else charged
+        BookCheckout.objects.filter(pk=checkout.pk).update(
+            is_returned=True, return_date=checkout.return_date, fine_amount=checkout.fine_amount
+        )
+        checkout.is_returned = True
+        ledger.accrue([(checkout.pk, user.pk, charged, checkout.fine_amount)], checkout.return_date)
+
+        Transaction.objects.create(
+            user=user,
+            book=checkout.book,
+            book_title=checkout.book.title,
+            transaction_type='return',
+            notes=f'Book returned: {checkout.book.title}'
+        )
+        holds.release_copies([checkout.book_id], checkout.return_date)
+    return checkout
+
+
+def reserve(user, book_id):
+    """Put ``user`` in the hold queue for ``book_id``, which must have no copy on the shelf."""
+    book = get_object_or_404(Book, pk=book_id)
+    if book.available_copies > 0:
+        raise CirculationError('Book is currently available for checkout')
+    with transaction.atomic():
+        # Holding the book's queue lock makes the duplicate check race-free.
+        Book.objects.select_for_update().only('pk').get(pk=book.pk)
+        if Reservation.objects.filter(user=user, book=book, is_active=True).exists():
+            raise CirculationError('You already have a reservation for this book')
+        reservation = holds.enqueue(user, book)
+        Transaction.objects.create(
+            user=user,
+            book=book,
+            book_title=book.title,
+            transaction_type='reservation',
+            notes=f'Book reserved: {book.title}'
+        )
+    return reservation
+
+
+def _claim_copies(book_ids):
+    """Take one copy of each book that still has one; return the ids claimed."""
+    if not book_ids:
+        return set()
+    connection = connections[router.db_for_write(Book)]
+    # SQLite gained UPDATE ... RETURNING together with INSERT ... RETURNING.
+    if not connection.features.can_return_columns_from_insert:
+        return {
+            book_id for book_id in book_ids
+            if Book.objects.filter(pk=book_id, available_copies__gt=0).update(
+                available_copies=F('available_copies') - 1
+            )
+        }
+    qn = connection.ops.quote_name
+    column = qn('available_copies')
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {qn(Book._meta.db_table)} SET {column} = {column} - 1 '
+            f'WHERE {qn("id")} IN ({placeholders}) AND {column} > 0 RETURNING {qn("id")}',
+            list(book_ids),
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def checkout_many(user, book_ids):
+    """
+    Lend one copy of each book in ``book_ids`` to ``user`` in one transaction.
+
+    Returns one ``{'book_id', 'checkout' | 'error'}`` result per requested id,
+    in request order. Books that cannot be lent are reported individually
+    and do not stop the rest of the batch.
+    """
+    check_fines(user)
+    results = [{'book_id': book_id} for book_id in book_ids]
+    books = Book.objects.in_bulk(set(book_ids))
+    held = set(BookCheckout.objects.filter(
+        user=user, book_id__in=books, is_returned=False
+    ).values_list('book_id', flat=True))
+
+    wanted, seen = [], set()
+    for result in results:
+        book_id = result['book_id']
+        if book_id in seen:
+            result['error'] = 'Duplicate book in request'
+        elif book_id not in books:
+            result['error'] = 'Book not found'
+        elif book_id in held:
+            result['error'] = 'You already have this book checked out'
+        else:
+            wanted.append(book_id)
+        seen.add(book_id)
+
+    try:
+        with transaction.atomic():
+            held = holds.holds_for(user, wanted)
+            reserved = {book_id for book_id, (_, ready) in held.items() if ready}
+            shelved = _claim_copies([book_id for book_id in wanted if book_id not in reserved])
+            if shelved:
+                inventory.adjust_available([books[book_id].category_id for book_id in shelved], -1)
+                response_cache.bump(Book._meta.label)
+            claimed = reserved | shelved
+            holds.leave_queues({book_id: hold for book_id, hold in held.items() if book_id in claimed})
+            due_date = timezone.now() + LOAN_PERIOD
+            checkouts = BookCheckout.objects.bulk_create([
+                BookCheckout(user=user, book=books[book_id], due_date=due_date)
+                for book_id in wanted if book_id in claimed
+            ])
+            trending.record([checkout.book_id for checkout in checkouts], 'checkouts')
+            forecast.invalidate(claimed)
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=user,
+                    book=checkout.book,
+                    book_title=checkout.book.title,
+                    transaction_type='checkout',
+                    notes=f'Book checked out: {checkout.book.title}'
+                )
+                for checkout in checkouts
+            ])
+    except IntegrityError:
+        # A concurrent single checkout won the unique_active_checkout race; anything else is a real error.
+        if not _has_open_checkout(user, wanted):
+            raise
+        raise CirculationError('Checkouts changed while processing the batch, please retry',
+                               status.HTTP_409_CONFLICT)
+
+    by_book = {checkout.book_id: checkout for checkout in checkouts}
+    for result in results:
+        if 'error' in result:
+            continue
+        if result['book_id'] in by_book:
+            result['checkout'] = by_book.pop(result['book_id'])
+        else:
+            result['error'] = 'No copies available'
+    return results
+
+
+def return_many(user, checkout_ids):
+    """
+    Return every checkout in ``checkout_ids`` for ``user`` in one transaction.
+
+    Returns one ``{'checkout_id', 'checkout' | 'error'}`` result per
+    requested id, in request order.
+    """
+    results = [{'checkout_id': checkout_id} for checkout_id in checkout_ids]
+    now = timezone.now()
+
+    with transaction.atomic():
+        checkouts = BookCheckout.objects.select_for_update(of=('self',)).select_related('book').in_bulk(
+            set(checkout_ids)
+        )
+        returning, changes, seen = [], [], set()
+        for result in results:
+            checkout = checkouts.get(result['checkout_id'])
+            if result['checkout_id'] in seen:
+                result['error'] = 'Duplicate checkout in request'
+            elif checkout is None:
+                result['error'] = 'Checkout not found'
+            elif checkout.user_id != user.pk:
+                result['error'] = 'You can only return your own books'
+            elif checkout.is_returned:
+                result['error'] = 'Book already returned'
+            else:
+                if checkout.is_overdue:
+                    changes.append((checkout.pk, user.pk, checkout.fine_amount,
+                                    checkout.days_overdue * FINE_PER_DAY))
+                    checkout.fine_amount = changes[-1][3]
+                checkout.user = user
+                checkout.is_returned = True
+                checkout.return_date = now
+                returning.append(checkout)
+                result['checkout'] = checkout
+            seen.add(result['checkout_id'])
+
+        if returning:
+            BookCheckout.objects.bulk_update(returning, ['is_returned', 'return_date', 'fine_amount'])
+            ledger.accrue(changes, now)
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=user,
+                    book=checkout.book,
+                    book_title=checkout.book.title,
+                    transaction_type='return',
+                    notes=f'Book returned: {checkout.book.title}'
+                )
+                for checkout in returning
+            ])
+            holds.release_copies([checkout.book_id for checkout in returning], now)
+    return results
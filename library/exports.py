@@ -0,0 +1,53 @@
+"""Columns and row sources of the admin circulation exports."""
+from django.utils import timezone
+
+from Law_Study_AssistantAPI.exports import chunked
+from .models import BookCheckout, Transaction, TransactionArchive
+
+TRANSACTION_COLUMNS = [
+    'id', 'user', 'user_username', 'book', 'book_title', 'transaction_type', 'transaction_date', 'notes',
+]
+TRANSACTION_LOOKUPS = [
+    'id', 'user_id', 'user__username', 'book_id', 'book_title', 'transaction_type', 'transaction_date', 'notes',
+]
+TRANSACTION_TYPES = [value for value, _ in Transaction.TRANSACTION_TYPES]
+
+CHECKOUT_COLUMNS = [
+    'id', 'user', 'user_username', 'book', 'book_title',
+    'checkout_date', 'due_date', 'return_date', 'is_returned', 'fine_amount',
+]
+CHECKOUT_LOOKUPS = [
+    'id', 'user_id', 'user__username', 'book_id', 'book__title',
+    'checkout_date', 'due_date', 'return_date', 'is_returned', 'fine_amount',
+]
+CHECKOUT_TYPES = ['open', 'returned', 'overdue']
+
+
+def checkout_type_lookups(now=None):
+    now = now or timezone.now()
+    return {
+        'open': {'is_returned': False},
+        'returned': {'is_returned': True},
+        'overdue': {'is_returned': False, 'due_date__lt': now},
+    }
+
+
+def _archived_transaction_rows(filters):
+    # Archived notes that only repeat the book title are rebuilt from the template.
+    lookups = TRANSACTION_LOOKUPS[:-1] + ['custom_notes']
+    archived = TransactionArchive.objects.filter(**filters).order_by('pk')
+    for row in chunked(archived, lookups):
+        template = TransactionArchive.NOTE_TEMPLATES.get(row[5])
+        notes = row[-1] if row[-1] or template is None else template.format(title=row[4])
+        yield row[:-1] + (notes,)
+
+
+def transaction_rows(filters, include_archived=False):
+    """Transactions matching ``filters``, archived (older) ones first when included."""
+    if include_archived:
+        yield from _archived_transaction_rows(filters)
+    yield from chunked(Transaction.objects.filter(**filters).order_by('pk'), TRANSACTION_LOOKUPS)
+
+
+def checkout_rows(filters):
+    return chunked(BookCheckout.objects.filter(**filters).order_by('pk'), CHECKOUT_LOOKUPS)
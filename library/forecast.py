@@ -0,0 +1,111 @@
+"""
+Expected availability of books with no copy on the shelf.
+
+For each such book, ``BookForecast.expected_at`` estimates when a copy
+would come free for a patron who reserves it now. Each open loan is
+expected back at its due date shifted by the library's mean return
+offset: the average of ``return_date - due_date`` over the past year's
+returns, negative when early returns outweigh late ones. A copy held for
+pickup is expected back one loan period from now. The queue is then
+played forward: each waiter ahead takes the earliest copy back and keeps
+it for a loan period plus the offset. The copy left over for the next
+waiter gives the forecast.
+
+Forecasts are stored per book, so list endpoints read them through a join
+with no extra queries. A book's forecast is recomputed after each commit
+that lends, returns or reserves it (``invalidate()``), and
+``refresh_forecasts`` recomputes all of them. The return offset is kept
+in the local cache for a day.
+"""
+import heapq
+from datetime import timedelta
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from Law_Study_AssistantAPI import response_cache
+from .models import LOAN_PERIOD, Book, BookCheckout, BookForecast, Reservation
+
+FORECAST_HISTORY = timedelta(days=365)
+RETURN_OFFSET_KEY = 'library:forecast:return-offset'
+RETURN_OFFSET_TIMEOUT = 24 * 60 * 60
+_ID_CHUNK = 500
+
+
+def return_offset(now=None):
+    """Mean ``return_date - due_date`` of the past year's returns (zero without history)."""
+    offset = cache.get(RETURN_OFFSET_KEY)
+    if offset is None:
+        now = now or timezone.now()
+        offset = BookCheckout.objects.filter(
+            is_returned=True, return_date__gte=now - FORECAST_HISTORY
+        ).aggregate(offset=Avg(ExpressionWrapper(F('return_date') - F('due_date'), output_field=DurationField())))[
+            'offset'
+        ] or timedelta(0)
+        cache.set(RETURN_OFFSET_KEY, offset, RETURN_OFFSET_TIMEOUT)
+    return offset
+
+
+def expected_free_at(returns, waiting, keep):
+    """When a copy is free after ``waiting`` patrons each take the earliest of ``returns`` for ``keep``."""
+    if not returns:
+        return None
+    heap = list(returns)
+    heapq.heapify(heap)
+    for _ in range(waiting):
+        heapq.heapreplace(heap, heap[0] + keep)
+    return heap[0]
+
+
+def refresh(book_ids, now=None):
+    """Recompute and store the forecasts of ``book_ids``."""
+    now = now or timezone.now()
+    book_ids = sorted(set(book_ids))
+    for start in range(0, len(book_ids), _ID_CHUNK):
+        _refresh_chunk(book_ids[start:start + _ID_CHUNK], now)
+    if book_ids:
+        response_cache.bump(Book._meta.label)
+
+
+def _refresh_chunk(book_ids, now):
+    unavailable = list(Book.objects.filter(pk__in=book_ids, available_copies=0).values_list('pk', flat=True))
+    returns = {book_id: [] for book_id in unavailable}
+    waiting = dict.fromkeys(unavailable, 0)
+    keep = None
+    if unavailable:
+        offset = return_offset(now)
+        keep = max(LOAN_PERIOD + offset, timedelta(days=1))
+        loans = BookCheckout.objects.filter(book_id__in=unavailable, is_returned=False)
+        for book_id, due_date in loans.values_list('book_id', 'due_date'):
+            returns[book_id].append(max(due_date + offset, now))
+        queues = Reservation.objects.filter(book_id__in=unavailable, is_active=True).order_by().values(
+            'book_id'
+        ).annotate(held=Count('pk', filter=Q(notified=True)), queued=Count('pk', filter=Q(notified=False)))
+        for row in queues:
+            returns[row['book_id']].extend([now + keep] * row['held'])
+            waiting[row['book_id']] = row['queued']
+    BookForecast.objects.bulk_create([
+        BookForecast(
+            book_id=book_id,
+            expected_at=expected_free_at(returns[book_id], waiting[book_id], keep) if book_id in returns else None,
+            computed_at=now,
+        )
+        for book_id in book_ids
+    ], update_conflicts=True, unique_fields=['book'], update_fields=['expected_at', 'computed_at'])
+
+
+def invalidate(book_ids):
+    """Recompute the forecasts of ``book_ids`` once the current transaction commits."""
+    book_ids = set(book_ids)
+    if book_ids:
+        transaction.on_commit(partial(refresh, book_ids))
+
+
+def refresh_all(now=None):
+    """Recompute every book's forecast; return how many books are expected back rather than on the shelf."""
+    now = now or timezone.now()
+    refresh(Book.objects.values_list('pk', flat=True), now)
+    return BookForecast.objects.filter(expected_at__isnull=False).count()
@@ -0,0 +1,167 @@
+"""
+FIFO hold queue for books with no copies on the shelf.
+
+Each active ``Reservation`` stores its ``queue_position`` (1 is next in
+line), so looking a position up is a single column read. Positions are
+renumbered only for the books whose queue changed, walking the
+``(book, is_active, reservation_date)`` index.
+
+A returned copy goes to the next waiter for that book instead of back on the
+shelf: the reservation is marked ``notified`` and given ``expires_at`` as a
+pickup deadline. The holder's next checkout of the book takes the set-aside
+copy. Copies that do reach the shelf are counted in the category inventory.
+Holds not picked up in time are expired in bulk by ``expire_holds()``, and
+their copies pass to the next waiter.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from Law_Study_AssistantAPI import response_cache
+from . import forecast, inventory, trending
+from .models import Book, Reservation
+
+HOLD_PICKUP_PERIOD = timedelta(days=3)
+
+
+def _renumber(book_ids):
+    """Recompute ``queue_position`` for the active reservations of ``book_ids``."""
+    queue = Reservation.objects.filter(book_id__in=set(book_ids), is_active=True).order_by(
+        'book_id', 'reservation_date', 'pk'
+    ).only('pk', 'book_id', 'queue_position')
+    changed, position, book_id = [], 0, None
+    for reservation in queue:
+        position = position + 1 if reservation.book_id == book_id else 1
+        book_id = reservation.book_id
+        if reservation.queue_position != position:
+            reservation.queue_position = position
+            changed.append(reservation)
+    if changed:
+        Reservation.objects.bulk_update(changed, ['queue_position'])
+
+
+def enqueue(user, book):
+    """Add ``user`` to the back of the hold queue for ``book``."""
+    with transaction.atomic():
+        # Serialise joins to the same queue so positions stay unique.
+        Book.objects.select_for_update().only('pk').get(pk=book.pk)
+        waiting = Reservation.objects.filter(book=book, is_active=True).count()
+        trending.record([book.pk], 'reservations')
+        forecast.invalidate([book.pk])
+        return Reservation.objects.create(user=user, book=book, queue_position=waiting + 1)
+
+
+def release_copies(book_ids, now=None):
+    """
+    Hand freed copies to the next waiters, shelving any that nobody wants.
+
+    ``book_ids`` has one entry per freed copy. A book's shelf never goes
+    above its ``total_copies``, and the category inventory is moved by the
+    copies actually shelved. Returns the reservations that were promoted to
+    a ready hold.
+    """
+    if not book_ids:
+        return []
+    now = now or timezone.now()
+    copies = Counter(book_ids)
+    forecast.invalidate(copies)
+    next_up = Reservation.objects.filter(
+        book_id__in=copies, is_active=True, notified=False
+    ).annotate(
+        place=Window(RowNumber(), partition_by=[F('book_id')], order_by=[F('reservation_date').asc(), F('pk').asc()])
+    ).filter(place__lte=max(copies.values())).select_related('user', 'book')
+
+    promoted = [reservation for reservation in next_up if reservation.place <= copies[reservation.book_id]]
+    if promoted:
+        expires_at = now + HOLD_PICKUP_PERIOD
+        Reservation.objects.filter(pk__in=[r.pk for r in promoted]).update(notified=True, expires_at=expires_at)
+        for reservation in promoted:
+            reservation.notified, reservation.expires_at = True, expires_at
+            copies[reservation.book_id] -= 1
+
+    shelving = [book_id for book_id, count in copies.items() if count]
+    if shelving:
+        # Read the shelves under lock so the inventory moves by exactly what each shelf gains.
+        rows = Book.objects.select_for_update().filter(pk__in=shelving).values_list(
+            'pk', 'available_copies', 'total_copies', 'category_id'
+        )
+        shelved, categories = defaultdict(list), []
+        for book_id, available, total, category_id in rows:
+            count = min(copies[book_id], max(total - available, 0))
+            if count:
+                shelved[count].append(book_id)
+                categories.extend([category_id] * count)
+        for count, ids in shelved.items():
+            Book.objects.filter(pk__in=ids).update(available_copies=F('available_copies') + count)
+        inventory.adjust_available(categories, 1)
+        response_cache.bump(Book._meta.label)
+
+    if promoted:
+        try:
+            from .notifications import notify_book_availability
+            notify_book_availability(promoted)
+        except ImportError:
+            pass
+    return promoted
+
+
+def holds_for(user, book_ids):
+    """
+    ``{book_id: (reservation_id, ready)}`` for ``user``'s active reservations.
+
+    ``ready`` means a copy is already set aside for the user, so checking
+    the book out must not take another one off the shelf.
+    """
+    return {
+        book_id: (pk, notified)
+        for pk, book_id, notified in Reservation.objects.filter(
+            user=user, book_id__in=book_ids, is_active=True
+        ).values_list('pk', 'book_id', 'notified')
+    }
+
+
+def leave_queues(held):
+    """Close the reservations in ``held`` (from ``holds_for()``) once their books are lent."""
+    if not held:
+        return
+    Reservation.objects.filter(pk__in=[pk for pk, _ in held.values()]).update(is_active=False, queue_position=None)
+    _renumber(held)
+
+
+def cancel(reservation):
+    """Withdraw ``reservation``, passing on any copy held for it."""
+    with transaction.atomic():
+        cancelled = Reservation.objects.filter(pk=reservation.pk, is_active=True).update(
+            is_active=False, queue_position=None
+        )
+        reservation.is_active, reservation.queue_position = False, None
+        if not cancelled:
+            return
+        _renumber([reservation.book_id])
+        forecast.invalidate([reservation.book_id])
+        if reservation.notified:
+            release_copies([reservation.book_id])
+
+
+def expire_holds(now=None):
+    """
+    Expire ready holds past their pickup deadline and pass their copies on.
+
+    Reads only rows in the hold-expiry partial index. Returns the number of
+    holds expired and the reservations promoted in their place.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        expired = list(Reservation.objects.select_for_update().filter(
+            is_active=True, notified=True, expires_at__lte=now
+        ).values_list('pk', 'book_id'))
+        if not expired:
+            return 0, []
+        Reservation.objects.filter(pk__in=[pk for pk, _ in expired]).update(is_active=False, queue_position=None)
+        book_ids = [book_id for _, book_id in expired]
+        _renumber(book_ids)
+        return len(expired), release_copies(book_ids, now)
@@ -0,0 +1,229 @@
+"""
+Bulk import of library holdings.
+
+Records are read lazily from CSV or from line-delimited MARC-in-JSON and
+written in batches: each batch resolves its categories with one lookup and
+one ``bulk_create``, locks the books it already has, and upserts every book
+with a single ``bulk_create(update_conflicts=True)`` keyed on ``isbn``.
+Copy counts of existing books move by the change in ``total_copies`` so
+loans in progress are kept. Added copies go through the hold queue like
+returned ones, so members waiting for the book are served before the shelf,
+and the category inventory, forecasts and response cache are updated per
+batch as circulation does.
+"""
+import csv
+import json
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from Law_Study_AssistantAPI import response_cache
+from . import forecast, holds, inventory
+from .models import Book, Category, CategoryInventory
+
+IMPORT_BATCH_SIZE = 1000
+UPDATE_FIELDS = [
+    'title', 'author', 'published_date', 'publisher', 'category',
+    'total_copies', 'available_copies', 'description', 'location',
+]
+
+# MARC tag and subfield of each book field (ISBN, main entry, title,
+# publication, subject, summary, holdings). Each 852 holdings field is one copy.
+MARC_FIELDS = {
+    'isbn': ('020', 'a'),
+    'author': ('100', 'a'),
+    'title': ('245', 'a'),
+    'publisher': ('260', 'b'),
+    'published_date': ('260', 'c'),
+    'category': ('650', 'a'),
+    'description': ('520', 'a'),
+    'location': ('852', 'h'),
+}
+MARC_HOLDINGS_TAG = '852'
+
+
+class RecordError(ValueError):
+    """An input record that cannot be imported; the import skips it."""
+
+
+def read_csv(lines):
+    """Records of a CSV file whose header names the ``Book`` fields (``category`` by name)."""
+    yield from csv.DictReader(lines)
+
+
+def _marc_subfield(record, tag, code):
+    for field in record.get('fields', []):
+        value = field.get(tag)
+        if isinstance(value, str):
+            return value
+        for subfield in (value or {}).get('subfields', []):
+            if code in subfield:
+                return subfield[code]
+    return None
+
+
+def read_marc_json(lines):
+    """Records of line-delimited MARC-in-JSON, one ``{"leader": ..., "fields": [...]}`` per line."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield {'error': f'line {number}: not valid JSON'}
+            continue
+        fields = {name: _marc_subfield(record, tag, code) for name, (tag, code) in MARC_FIELDS.items()}
+        fields['total_copies'] = sum(MARC_HOLDINGS_TAG in field for field in record.get('fields', [])) or 1
+        yield fields
+
+
+def normalize_isbn(value):
+    """``"978-0-19-876543-2 (pbk.)"`` -> ``"9780198765432"``."""
+    token = (str(value or '').split() or [''])[0]
+    return ''.join(ch for ch in token if ch.isdigit() or ch in 'xX').upper()
+
+
+def _clean(value):
+    # MARC subfields carry ISBD punctuation, e.g. "Contract law /" or "Sweet & Maxwell,".
+    return ' '.join(str(value or '').split()).rstrip(' /:;,.')
+
+
+def _published(value):
+    value = _clean(value)
+    parsed = parse_date(value) if len(value) == 10 else None
+    if parsed:
+        return parsed
+    digits = ''.join(ch for ch in value if ch.isdigit())[:4]
+    if len(digits) == 4:
+        return date(int(digits), 1, 1)
+    raise RecordError(f'unreadable publication date {value!r}')
+
+
+def parse_record(record):
+    """Turn one input record into ``Book`` field values and a category name."""
+    if 'error' in record:
+        raise RecordError(record['error'])
+    isbn = normalize_isbn(record.get('isbn'))
+    if not 10 <= len(isbn) <= 13:
+        raise RecordError(f'invalid ISBN {record.get("isbn")!r}')
+    title, author = _clean(record.get('title')), _clean(record.get('author'))
+    if not title or not author:
+        raise RecordError(f'{isbn}: title and author are required')
+    try:
+        copies = int(record.get('total_copies') or 1)
+    except ValueError:
+        raise RecordError(f'{isbn}: invalid total_copies {record.get("total_copies")!r}')
+    if copies < 1:
+        raise RecordError(f'{isbn}: total_copies must be at least 1')
+    return {
+        'isbn': isbn,
+        'title': title[:255],
+        'author': author[:255],
+        'published_date': _published(record.get('published_date')),
+        'publisher': _clean(record.get('publisher'))[:255],
+        'description': str(record.get('description') or '').strip(),
+        'location': _clean(record.get('location'))[:100],
+        'total_copies': copies,
+    }, _clean(record.get('category'))[:100]
+
+
+class BookImporter:
+    """
+    Upsert parsed records in batches; ``stats`` counts what happened.
+
+    ISBNs already seen in this run are kept in a set so repeated records are
+    skipped without a query.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = Counter()
+        self.errors = []
+        self.seen = set()
+        self.category_ids = {}
+
+    def run(self, records, progress=None):
+        batch = []
+        for record in records:
+            self.stats['read'] += 1
+            try:
+                fields, category = parse_record(record)
+            except RecordError as exc:
+                self.stats['invalid'] += 1
+                self.errors.append(str(exc))
+                continue
+            if fields['isbn'] in self.seen:
+                self.stats['duplicates'] += 1
+                continue
+            self.seen.add(fields['isbn'])
+            batch.append((fields, category))
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+                if progress:
+                    progress(self.stats)
+        if batch:
+            self.write(batch)
+            if progress:
+                progress(self.stats)
+        return self.stats
+
+    def resolve_categories(self, names):
+        missing = {name for name in names if name and name not in self.category_ids}
+        if not missing:
+            return
+        self.category_ids.update(Category.objects.filter(name__in=missing).values_list('name', 'pk'))
+        new = [name for name in missing if name not in self.category_ids]
+        if new:
+            Category.objects.bulk_create([Category(name=name) for name in new], ignore_conflicts=True)
+            created = dict(Category.objects.filter(name__in=new).values_list('name', 'pk'))
+            CategoryInventory.objects.bulk_create(
+                [CategoryInventory(category_id=pk) for pk in created.values()], ignore_conflicts=True
+            )
+            self.category_ids.update(created)
+            self.stats['categories'] += len(created)
+            response_cache.bump(Category._meta.label)
+
+    def write(self, batch):
+        with transaction.atomic():
+            self.resolve_categories({category for _, category in batch})
+            existing = {
+                row['isbn']: row
+                for row in Book.objects.select_for_update().filter(
+                    isbn__in=[fields['isbn'] for fields, _ in batch]
+                ).values('pk', 'isbn', 'category_id', 'total_copies', 'available_copies')
+            }
+            books, deltas, added_copies = [], defaultdict(lambda: [0, 0, 0]), []
+            for fields, category in batch:
+                book = Book(category_id=self.category_ids.get(category), **fields)
+                old = existing.get(book.isbn)
+                if old is None:
+                    book.available_copies = book.total_copies
+                else:
+                    if not category:
+                        book.category_id = old['category_id']
+                    # Copies on loan stay on loan. Removed copies leave the shelf; added ones are
+                    # released through the hold queue once the row is written.
+                    growth = book.total_copies - old['total_copies']
+                    book.available_copies = max(0, old['available_copies'] + min(growth, 0))
+                    added_copies.extend([old['pk']] * max(growth, 0))
+                    removed = deltas[old['category_id']]
+                    removed[0] -= 1
+                    removed[1] -= old['total_copies']
+                    removed[2] -= old['available_copies']
+                added = deltas[book.category_id]
+                added[0] += 1
+                added[1] += book.total_copies
+                added[2] += book.available_copies
+                books.append(book)
+            Book.objects.bulk_create(
+                books, update_conflicts=True, unique_fields=['isbn'], update_fields=UPDATE_FIELDS
+            )
+            inventory.adjust(deltas)
+            holds.release_copies(added_copies)
+            forecast.invalidate(row['pk'] for row in existing.values())
+            response_cache.bump(Book._meta.label)
+        self.stats['updated'] += len(existing)
+        self.stats['created'] += len(batch) - len(existing)
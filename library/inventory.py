@@ -0,0 +1,88 @@
+"""
+Per-category inventory rollup.
+
+``CategoryInventory`` holds the number of titles, total copies and copies on
+the shelf for each category, so category listings read one row per
+category instead of aggregating ``Book``. Every code path that changes copy
+counts applies the same change to the rollup with an ``F()`` increment in
+its own transaction: circulation through ``adjust_available()``, and book
+edits through ``Book.save()`` / ``Book.delete()``. Bulk writes that bypass
+those (queryset updates, imports, manual SQL) are reconciled by the
+``rebuild_category_inventory`` command.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Sum
+
+from Law_Study_AssistantAPI import response_cache
+from .models import Book, Category, CategoryInventory
+
+
+def adjust(deltas):
+    """Apply ``{category_id: (titles, total_copies, available_copies)}`` changes."""
+    grouped = defaultdict(list)
+    for category_id, delta in deltas.items():
+        if category_id is not None and any(delta):
+            grouped[tuple(delta)].append(category_id)
+    for (titles, total, available), category_ids in grouped.items():
+        CategoryInventory.objects.filter(category_id__in=category_ids).update(
+            title_count=F('title_count') + titles,
+            total_copies=F('total_copies') + total,
+            available_copies=F('available_copies') + available,
+        )
+    if grouped:
+        response_cache.bump(Category._meta.label)
+
+
+def adjust_available(category_ids, change):
+    """Move ``change`` shelf copies for each entry of ``category_ids`` (one per copy)."""
+    adjust({
+        category_id: (0, 0, count * change)
+        for category_id, count in Counter(category_ids).items()
+    })
+
+
+def book_saved(book, previous):
+    """Account for ``book`` after a save; ``previous`` holds its old counts, or None if new."""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    if previous is not None:
+        old = deltas[previous['category_id']]
+        old[0] -= 1
+        old[1] -= previous['total_copies']
+        old[2] -= previous['available_copies']
+    new = deltas[book.category_id]
+    new[0] += 1
+    new[1] += book.total_copies
+    new[2] += book.available_copies
+    adjust(deltas)
+
+
+def book_deleted(book):
+    previous = Book.objects.filter(pk=book.pk).values('category_id', 'total_copies', 'available_copies').first()
+    if previous is not None:
+        adjust({previous['category_id']: (-1, -previous['total_copies'], -previous['available_copies'])})
+
+
+def rebuild():
+    """Recompute every category's rollup from ``Book``; return how many rows were wrong."""
+    actual = {
+        row['category']: row
+        for row in Book.objects.filter(category__isnull=False).order_by().values('category').annotate(
+            titles=Count('pk'), copies=Sum('total_copies'), on_shelf=Sum('available_copies')
+        )
+    }
+    stored = CategoryInventory.objects.in_bulk()
+    fields = ['title_count', 'total_copies', 'available_copies']
+    changed, created = [], []
+    for category_id in Category.objects.values_list('pk', flat=True).iterator():
+        row = actual.get(category_id, {})
+        inventory = stored.get(category_id) or CategoryInventory(category_id=category_id)
+        values = [row.get('titles', 0), row.get('copies', 0), row.get('on_shelf', 0)]
+        if category_id in stored and values == [getattr(inventory, field) for field in fields]:
+            continue
+        for field, value in zip(fields, values):
+            setattr(inventory, field, value)
+        (changed if category_id in stored else created).append(inventory)
+    CategoryInventory.objects.bulk_create(created)
+    CategoryInventory.objects.bulk_update(changed, fields)
+    return len(changed) + len(created)
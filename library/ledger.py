@@ -0,0 +1,91 @@
+"""
+Fine ledger and per-member balances.
+
+Every change to what a member owes is an append-only ``FineLedgerEntry``:
+an accrual when a checkout's fine grows (the nightly fine sweep, a late
+return), and a payment or waiver when staff settle some of it.
+``FineBalance`` holds each member's running total. The transaction that
+appends entries also moves the balance by their sum, using an ``F()``
+increment, so the balance always equals the member's entries. Reading it
+is one primary-key lookup.
+
+``BookCheckout.fine_amount`` stays the per-loan figure. The ledger is
+credited with each change to it, never with the full amount again.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FineBalance, FineLedgerEntry
+
+ZERO = Decimal('0.00')
+_ID_CHUNK = 500
+
+
+class LedgerError(Exception):
+    """A payment or waiver that cannot be recorded."""
+
+
+def post(entries, now=None):
+    """Append ``entries`` (unsaved, with signed amounts) and move their members' balances."""
+    entries = [entry for entry in entries if entry.amount]
+    if not entries:
+        return []
+    now = now or timezone.now()
+    totals = defaultdict(Decimal)
+    for entry in entries:
+        totals[entry.user_id] += Decimal(entry.amount)
+    with transaction.atomic():
+        created = FineLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+        FineBalance.objects.bulk_create(
+            [FineBalance(user_id=user_id) for user_id in totals], ignore_conflicts=True, batch_size=1000
+        )
+        # Nightly accruals are mostly a few whole dollars, so members group into few UPDATEs.
+        grouped = defaultdict(list)
+        for user_id, total in totals.items():
+            grouped[total].append(user_id)
+        for total, user_ids in grouped.items():
+            for start in range(0, len(user_ids), _ID_CHUNK):
+                FineBalance.objects.filter(pk__in=user_ids[start:start + _ID_CHUNK]).update(
+                    balance=F('balance') + total, updated_at=now
+                )
+    return created
+
+
+def accrue(changes, now=None):
+    """Post an accrual for each ``(checkout_id, user_id, old_fine, new_fine)`` whose fine changed."""
+    now = now or timezone.now()
+    return post([
+        FineLedgerEntry(user_id=user_id, checkout_id=checkout_id, kind='accrual',
+                        amount=Decimal(new) - Decimal(old), created_at=now)
+        for checkout_id, user_id, old, new in changes
+    ], now)
+
+
+def settle(user_id, kind, amount, note='', recorded_by=None):
+    """Record a payment or waiver of ``amount`` against ``user_id``'s balance."""
+    if kind not in ('payment', 'waiver'):
+        raise LedgerError(f'Cannot settle with a {kind} entry')
+    if amount <= 0:
+        raise LedgerError('Amount must be positive')
+    with transaction.atomic():
+        owed = FineBalance.objects.select_for_update().filter(pk=user_id).values_list('balance', flat=True).first()
+        if amount > (owed or ZERO):
+            raise LedgerError(f'Amount exceeds the outstanding balance of ${owed or ZERO:.2f}')
+        entry, = post([FineLedgerEntry(user_id=user_id, kind=kind, amount=-amount, note=note,
+                                       recorded_by=recorded_by)])
+    return entry
+
+
+def balance_of(user_id):
+    """``(balance, updated_at)`` of ``user_id``; zero and ``None`` if nothing was ever posted."""
+    row = FineBalance.objects.filter(pk=user_id).values_list('balance', 'updated_at').first()
+    return row or (ZERO, None)
+
+
+def is_blocked(balance):
+    return balance > settings.FINE_BLOCK_THRESHOLD
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from books.archive import archive_quiz_attempts
+from Law_Study_AssistantAPI.archive import ARCHIVE_CHUNK_SIZE
+from library.archive import archive_transactions
+
+
+class Command(BaseCommand):
+    help = 'Move old transactions and quiz attempts to archive tables, keeping per-user totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help='Archive rows older than this many days')
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE,
+                            help='Rows moved per transaction')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        transactions = archive_transactions(cutoff, options['chunk_size'])
+        attempts = archive_quiz_attempts(cutoff, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {transactions} transactions and {attempts} quiz attempts from before {cutoff:%Y-%m-%d}'
+        ))
@@ -0,0 +1,65 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from library.fines import sweep_overdue_fines
+from library.models import Book, BookCheckout
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Time the set-based fine sweep against the per-row calculate_fine() loop (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000],
+                            help='Overdue checkout counts to benchmark')
+        parser.add_argument('--legacy-limit', type=int, default=20000,
+                            help='Skip the per-row loop above this many rows')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"rows":>10}{"per-row s":>12}{"sweep s":>10}{"re-sweep s":>12}  ({connection.vendor})')
+        for rows in options['rows']:
+            with transaction.atomic():
+                self._populate(rows)
+                legacy = 'skipped'
+                if rows <= options['legacy_limit']:
+                    start = time.perf_counter()
+                    for checkout in BookCheckout.objects.filter(is_returned=False, due_date__lt=timezone.now()):
+                        checkout.calculate_fine()
+                    legacy = f'{time.perf_counter() - start:.2f}'
+                    BookCheckout.objects.update(fine_amount=0)
+
+                start = time.perf_counter()
+                updated = sweep_overdue_fines()
+                sweep = time.perf_counter() - start
+                # Second sweep on the same day finds nothing to change.
+                start = time.perf_counter()
+                sweep_overdue_fines()
+                resweep = time.perf_counter() - start
+                self.stdout.write(f'{rows:>10}{legacy:>12}{sweep:>10.2f}{resweep:>12.2f}  ({updated} fines updated)')
+                transaction.set_rollback(True)
+
+    def _populate(self, rows):
+        """Spread ``rows`` overdue loans over a square grid of users and books."""
+        side = int(rows ** 0.5) + 1
+        users = User.objects.bulk_create([User(username=f'fine-bench-{i}') for i in range(side)])
+        books = Book.objects.bulk_create([
+            Book(title=f'Fine Bench {i}', author='Bench', isbn=f'{9780000000000 + i}',
+                 published_date=date(2020, 1, 1), total_copies=side, available_copies=0)
+            for i in range(side)
+        ])
+        now = timezone.now()
+        batch = []
+        for i in range(rows):
+            batch.append(BookCheckout(
+                user=users[i // side], book=books[i % side],
+                due_date=now - timedelta(days=1 + i % 60, hours=i % 24),
+            ))
+            if len(batch) == 10000:
+                BookCheckout.objects.bulk_create(batch)
+                batch = []
+        BookCheckout.objects.bulk_create(batch)
@@ -0,0 +1,80 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from library.models import Book
+from library.search import search_books
+
+SURNAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Mensah', 'Owusu', 'Boateng',
+            'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Wilson', 'Anderson', 'Taylor', 'Thomas']
+FIRST_NAMES = ['John', 'Jane', 'Kwame', 'Ama', 'Robert', 'Sarah', 'Michael', 'Elena', 'David', 'Kofi']
+SUBJECTS = ['Contract', 'Tort', 'Criminal', 'Constitutional', 'Administrative', 'International',
+            'Corporate', 'Property', 'Evidence', 'Equity', 'Family', 'Tax', 'Labour', 'Maritime']
+FORMS = ['Law', 'Principles', 'Cases and Materials', 'Handbook', 'Casebook', 'Commentary', 'Analysis']
+
+
+class Command(BaseCommand):
+    help = 'Compare indexed catalog search with the LIKE-based SearchFilter (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100000, help='Synthetic books to insert')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument('--queries', nargs='+',
+                            default=['Mensah', 'Contract Law', 'Constitutional Commentary', 'Jhonson', 'Mensha'])
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._populate(options['books'])
+            self.stdout.write(f'{Book.objects.count()} books on {connection.vendor}\n')
+            self.stdout.write(f'{"query":<28}{"LIKE ms":>10}{"hits":>8}{"index ms":>10}{"hits":>8}')
+            for query in options['queries']:
+                like_ms, like_hits = self._time(self._like_search(query), options['repeat'])
+                indexed = search_books(Book.objects.all(), query)
+                if indexed is None:
+                    self.stdout.write(f'{query:<28}{like_ms:>10.1f}{like_hits:>8}{"n/a":>10}')
+                    continue
+                index_ms, index_hits = self._time(indexed.order_by('-search_rank', 'id'), options['repeat'])
+                self.stdout.write(
+                    f'{query:<28}{like_ms:>10.1f}{like_hits:>8}{index_ms:>10.1f}{index_hits:>8}'
+                )
+            transaction.set_rollback(True)
+
+    def _populate(self, count):
+        rng = random.Random(42)
+        batch = []
+        for i in range(count):
+            batch.append(Book(
+                title=f'{rng.choice(SUBJECTS)} {rng.choice(FORMS)} Vol. {i}',
+                author=f'{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}',
+                isbn=f'{9790000000000 + i}',
+                published_date=date(2000 + i % 24, 1 + i % 12, 1),
+                total_copies=1,
+                available_copies=1,
+            ))
+            if len(batch) == 5000:
+                Book.objects.bulk_create(batch)
+                batch = []
+        Book.objects.bulk_create(batch)
+
+    def _like_search(self, query):
+        # Same WHERE clause DRF's SearchFilter builds for search_fields.
+        queryset = Book.objects.all()
+        for term in query.split():
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(author__icontains=term) | Q(isbn__icontains=term)
+            )
+        return queryset.order_by('-added_date')
+
+    def _time(self, queryset, repeat):
+        """Best-of-N time for what a list request costs: a count plus the first page."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = queryset.count()
+            list(queryset[:10])
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, hits
@@ -0,0 +1,89 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from books.models import Subject, Topic
+from cases.models import Case
+from cases.serializers import CaseSerializer
+from Law_Study_AssistantAPI.fast_serializers import compile_serializer
+from library.models import Book, BookCheckout, Category, Transaction
+from library.serializers import BookCheckoutSerializer, BookSerializer, TransactionSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Time ModelSerializer against the compiled values() serializer per row, '
+            'checking the JSON is identical (rolled back afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Rows per serializer')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is kept)')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with transaction.atomic():
+            self._populate(rows)
+            now = timezone.now()
+            cases = [
+                ('BookSerializer', BookSerializer, Book.objects.select_related('category').order_by('pk')),
+                ('BookCheckoutSerializer', BookCheckoutSerializer,
+                 BookCheckout.objects.select_related('book', 'user').with_overdue_state(now).order_by('pk')),
+                ('TransactionSerializer', TransactionSerializer,
+                 Transaction.objects.select_related('user').order_by('pk')),
+                ('CaseSerializer', CaseSerializer, Case.objects.order_by('pk')),
+            ]
+            self.stdout.write(f'{rows} rows per serializer on {connection.vendor}, best of {repeat}\n')
+            self.stdout.write(f'{"serializer":<24}{"model us/row":>14}{"fast us/row":>13}{"speedup":>9}  identical')
+            for name, serializer_class, queryset in cases:
+                compiled = compile_serializer(serializer_class)
+                model_us, expected = self._time(
+                    lambda: JSONRenderer().render(serializer_class(list(queryset), many=True).data), repeat, rows
+                )
+                fast_us, actual = self._time(
+                    lambda: JSONRenderer().render(compiled.represent_many(compiled.project(queryset))), repeat, rows
+                )
+                self.stdout.write(
+                    f'{name:<24}{model_us:>14.1f}{fast_us:>13.1f}{model_us / fast_us:>8.1f}x  {actual == expected}'
+                )
+            transaction.set_rollback(True)
+
+    def _time(self, render, repeat, rows):
+        """Best-of-N microseconds per row for querying, serializing and rendering ``rows`` rows."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = render()
+            elapsed = (time.perf_counter() - start) * 1e6 / rows
+            best = elapsed if best is None else min(best, elapsed)
+        return best, body
+
+    def _populate(self, rows):
+        user = User.objects.create(username='serializer-bench')
+        category = Category.objects.create(name='Serializer Bench')
+        books = Book.objects.bulk_create([
+            Book(title=f'Serializer Bench {i}', author='Bench', isbn=f'{9770000000000 + i}',
+                 published_date=date(2020, 1, 1), total_copies=2, available_copies=1,
+                 category=category if i % 3 else None, description='A benchmark book.')
+            for i in range(rows)
+        ])
+        now = timezone.now()
+        BookCheckout.objects.bulk_create([
+            BookCheckout(user=user, book=book, due_date=now + timedelta(days=7 - i % 14))
+            for i, book in enumerate(books)
+        ])
+        Transaction.objects.bulk_create([
+            Transaction(user=user, book=book, book_title=book.title, transaction_type='checkout',
+                        notes=f'Book checked out: {book.title}')
+            for book in books
+        ])
+        topic = Topic.objects.create(subject=Subject.objects.create(title='Serializer Bench'), title='Bench')
+        Case.objects.bulk_create([
+            Case(topic=topic, title=f'Bench v Bench {i}', suit_number=f'BENCH-{i}', number_of_pages=10,
+                 summary='A benchmark case.', year=2000 + i % 24)
+            for i in range(rows)
+        ])
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from library.recommendations import RECOMMENDATION_BATCH_SIZE, RECOMMENDATION_TOP_K, rebuild, refresh
+
+
+class Command(BaseCommand):
+    help = ('Update related-book recommendations from checkouts made since the last run '
+            '(or from all checkouts with --full)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Discard the co-borrowing counts and rebuild them from every checkout')
+        parser.add_argument('--batch-size', type=int, default=RECOMMENDATION_BATCH_SIZE,
+                            help='Checkouts read per transaction')
+        parser.add_argument('--top-k', type=int, default=RECOMMENDATION_TOP_K,
+                            help='Related books kept per book (applies to all books only with --full)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(stats):
+            self.stdout.write(f"{stats['checkouts']} checkouts read, {stats['ranked']} books re-ranked")
+
+        build = rebuild if options['full'] else refresh
+        stats = build(options['batch_size'], options['top_k'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {stats['checkouts']} new checkouts and re-ranked {stats['ranked']} books "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from library.trending import TRENDING_DAILY_DAYS, compact, rebuild
+
+
+class Command(BaseCommand):
+    help = (f'Merge trending buckets older than {TRENDING_DAILY_DAYS} days into monthly ones '
+            'and drop those past the longest window (run nightly)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recount every bucket from the transaction log first')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            written = rebuild()
+            self.stdout.write(f'Recounted {written} daily buckets from the transaction log')
+        merged, dropped = compact()
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged away {merged} daily buckets and dropped {dropped} expired ones'
+        ))
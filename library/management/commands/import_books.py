@@ -0,0 +1,59 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from library.importer import IMPORT_BATCH_SIZE, BookImporter, read_csv, read_marc_json
+
+READERS = {'csv': read_csv, 'marc-json': read_marc_json}
+
+
+class Command(BaseCommand):
+    help = ('Import or update books from a CSV file or line-delimited MARC-in-JSON, '
+            'matching existing books by ISBN')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for standard input")
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Input format (default: csv for .csv files, marc-json otherwise)')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help='Books upserted per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Run the whole import in a transaction and roll it back')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'marc-json')
+        importer = BookImporter(options['batch_size'])
+        started = time.monotonic()
+
+        def progress(stats):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"{stats['read']} read, {stats['created']} created, {stats['updated']} updated, "
+                f"{stats['duplicates'] + stats['invalid']} skipped ({stats['read'] / elapsed:.0f} records/s)"
+            )
+
+        try:
+            source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+        with source:
+            if options['dry_run']:
+                with transaction.atomic():
+                    stats = importer.run(READERS[fmt](source), progress)
+                    transaction.set_rollback(True)
+            else:
+                stats = importer.run(READERS[fmt](source), progress)
+
+        for error in importer.errors[:20]:
+            self.stderr.write(f'Skipped: {error}')
+        if len(importer.errors) > 20:
+            self.stderr.write(f'... and {len(importer.errors) - 20} more invalid records')
+        prefix = 'Dry run: would have imported' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {stats['created'] + stats['updated']} books ({stats['created']} new, "
+            f"{stats['updated']} updated, {stats['categories']} new categories); "
+            f"skipped {stats['duplicates']} duplicate and {stats['invalid']} invalid records "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
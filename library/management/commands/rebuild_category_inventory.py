@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from library.inventory import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-category inventory rollup from the book table and fix any drift'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            corrected = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Corrected {corrected} category inventory rows'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from library.forecast import refresh_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute the expected-availability forecast of every book (run nightly as loans age)'
+
+    def handle(self, *args, **options):
+        expected = refresh_all()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed forecasts; {expected} books are expected back'))
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from library.scheduler import SCHEDULER_BATCH_SIZE, SCHEDULER_HORIZON, DueDateScheduler
+
+
+class Command(BaseCommand):
+    help = ('Run the due-date scheduler: queue due-soon reminders and overdue notices as loans reach '
+            'their deadlines (delivered by send_notifications --watch)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=60, metavar='SECONDS',
+                            help='Longest sleep between checks for new checkouts')
+        parser.add_argument('--horizon', type=float, default=SCHEDULER_HORIZON.total_seconds() / 3600,
+                            metavar='HOURS', help='How far ahead deadlines are held in memory')
+        parser.add_argument('--batch-size', type=int, default=SCHEDULER_BATCH_SIZE,
+                            help='Notices queued per transaction')
+        parser.add_argument('--once', action='store_true',
+                            help='Fire whatever is due now and exit (for cron)')
+
+    def handle(self, *args, **options):
+        scheduler = DueDateScheduler(timedelta(hours=options['horizon']), options['batch_size'])
+        while True:
+            close_old_connections()
+            fired = scheduler.run_once()
+            if any(fired.values()) or options['once']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Queued {fired['due_soon']} due-soon reminders and {fired['overdue']} overdue notices"
+                ))
+            if options['once']:
+                return
+            deadline = scheduler.next_deadline()
+            wait = options['poll'] if deadline is None else (deadline - timezone.now()).total_seconds()
+            time.sleep(min(max(wait, 0), options['poll']))
@@ -1,15 +1,28 @@
+import time
+
 from django.core.management.base import BaseCommand
-from library.notifications import check_overdue_books, notify_book_availability
+from library import outbox
+from library.holds import expire_holds
 
 class Command(BaseCommand):
-    help = 'Send notifications for overdue books and book availability'
+    help = 'Expire uncollected holds and deliver the notification outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.DRAIN_BATCH_SIZE,
+                            help='Messages delivered per batch over one mail connection')
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep running as a worker, expiring holds and draining the outbox every SECONDS')
 
     def handle(self, *args, **options):
-        overdue_count = check_overdue_books()
-        available_count = notify_book_availability()
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Sent {overdue_count} overdue notifications and {available_count} availability notifications'
-            )
-        )
\ No newline at end of file
+        # Overdue notices are queued by run_scheduler (or the admin endpoint), never by the drain loop.
+        while True:
+            expired_count, promoted = expire_holds()
+            if expired_count:
+                self.stdout.write(f'Expired {expired_count} uncollected holds, '
+                                  f'queued {len(promoted)} availability notifications')
+            sent = outbox.drain_all(options['batch_size'])
+            if sent or not options['watch']:
+                self.stdout.write(self.style.SUCCESS(f'Delivered {sent} queued notifications'))
+            if not options['watch']:
+                return
+            time.sleep(options['watch'])
@@ -0,0 +1,85 @@
+import threading
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from library.circulation import CirculationError, checkout, return_checkout
+from library.models import Book, BookCheckout
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Hammer the last copy of a book from many threads and report over-lending and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--seconds', type=float, default=10.0)
+        parser.add_argument('--copies', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] == ':memory:':
+            raise CommandError('Threads cannot share an in-memory SQLite database')
+
+        copies = options['copies']
+        book = Book.objects.create(
+            title='Stress Test Copy', author='Stress Test', isbn='9799999999999',
+            published_date=date.today(), total_copies=copies
+        )
+        users = [User.objects.create(username=f'stress-checkout-{i}') for i in range(options['threads'])]
+        counters = {'lent': 0, 'refused': 0, 'retried': 0, 'over_lent': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def count(key):
+            with lock:
+                counters[key] += 1
+
+        def borrower(user):
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        loan = checkout(user, book.id)
+                    except CirculationError:
+                        count('refused')
+                        continue
+                    except OperationalError:
+                        count('retried')
+                        continue
+                    count('lent')
+                    if BookCheckout.objects.filter(book=book, is_returned=False).count() > copies:
+                        count('over_lent')
+                    while True:
+                        try:
+                            return_checkout(user, loan.id)
+                            break
+                        except OperationalError:
+                            count('retried')
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            workers = [threading.Thread(target=borrower, args=(user,)) for user in users]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+
+            book.refresh_from_db()
+            self.stdout.write(f'{options["threads"]} threads, {copies} cop{"y" if copies == 1 else "ies"}, '
+                              f'{elapsed:.1f}s on {connection.vendor}')
+            self.stdout.write(f'  checkouts:      {counters["lent"]} ({counters["lent"] / elapsed:.1f}/s)')
+            self.stdout.write(f'  refused:        {counters["refused"]}')
+            self.stdout.write(f'  lock retries:   {counters["retried"]}')
+            self.stdout.write(f'  over-lent seen: {counters["over_lent"]}')
+            self.stdout.write(f'  copies left:    {book.available_copies}/{book.total_copies}')
+            if counters['over_lent'] or book.available_copies != copies:
+                raise CommandError('Copy count drifted under contention')
+            self.stdout.write(self.style.SUCCESS('No over-lending detected'))
+        finally:
+            book.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
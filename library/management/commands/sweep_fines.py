@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from library.fines import SWEEP_CHUNK_SIZE, sweep_overdue_fines
+
+
+class Command(BaseCommand):
+    help = 'Recompute fines for all overdue checkouts with set-based updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=SWEEP_CHUNK_SIZE,
+                            help='Overdue checkouts updated per transaction')
+
+    def handle(self, *args, **options):
+        updated = sweep_overdue_fines(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated fines on {updated} overdue checkouts'))
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:42
+
+import django.db.models.deletion
+import library.models
+from django.db import migrations, models
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE library_book_fts USING fts5(
+        title, author, isbn,
+        content='library_book', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER library_book_fts_insert AFTER INSERT ON library_book BEGIN
+        INSERT INTO library_book_fts(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER library_book_fts_delete AFTER DELETE ON library_book BEGIN
+        INSERT INTO library_book_fts(library_book_fts, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER library_book_fts_update AFTER UPDATE OF title, author, isbn ON library_book BEGIN
+        INSERT INTO library_book_fts(library_book_fts, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+        INSERT INTO library_book_fts(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END
+    """,
+    "INSERT INTO library_book_fts(library_book_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS library_book_fts_update",
+    "DROP TRIGGER IF EXISTS library_book_fts_delete",
+    "DROP TRIGGER IF EXISTS library_book_fts_insert",
+    "DROP TABLE IF EXISTS library_book_fts",
+]
+
+# Must stay identical to library.search.book_search_vector() so the planner
+# can match the indexed expression.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS library_book_search_gin ON library_book USING gin ((
+        setweight(to_tsvector('simple'::regconfig, COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, COALESCE(isbn, '')), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, COALESCE(author, '')), 'B')
+    ))
+    """,
+    "CREATE INDEX IF NOT EXISTS library_book_title_trgm ON library_book USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS library_book_author_trgm ON library_book USING gin (author gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS library_book_author_trgm",
+    "DROP INDEX IF EXISTS library_book_title_trgm",
+    "DROP INDEX IF EXISTS library_book_search_gin",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchEntry',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='library.book')),
+                ('document', library.models.FullTextField(db_column='library_book_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'library_book_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
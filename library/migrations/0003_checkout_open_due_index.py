@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_book_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookcheckout',
+            index=models.Index(condition=models.Q(('is_returned', False)), fields=['due_date'], name='checkout_open_due_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_checkout_open_due_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Pickup deadline once a copy is held for this reservation', null=True),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='queue_position',
+            field=models.PositiveIntegerField(blank=True, help_text='1 is next in line; empty once the hold leaves the queue', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['book', 'is_active', 'reservation_date'], name='reservation_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('is_active', True), ('notified', True)), fields=['expires_at'], name='reservation_hold_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_history_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-added_date'], name='book_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('available_copies__gt', 0)), fields=['-added_date'], name='book_available_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcheckout',
+            index=models.Index(fields=['user', 'is_returned'], name='checkout_user_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-transaction_date'], name='transaction_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_inventory(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    Category = apps.get_model('library', 'Category')
+    CategoryInventory = apps.get_model('library', 'CategoryInventory')
+    totals = {
+        row['category']: row
+        for row in Book.objects.filter(category__isnull=False).order_by().values('category').annotate(
+            titles=Count('pk'), copies=Sum('total_copies'), on_shelf=Sum('available_copies')
+        )
+    }
+    CategoryInventory.objects.bulk_create([
+        CategoryInventory(
+            category_id=category_id,
+            title_count=totals.get(category_id, {}).get('titles', 0),
+            total_copies=totals.get(category_id, {}).get('copies', 0),
+            available_copies=totals.get(category_id, {}).get('on_shelf', 0),
+        )
+        for category_id in Category.objects.values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryInventory',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory', serialize=False, to='library.category')),
+                ('title_count', models.PositiveIntegerField(default=0)),
+                ('total_copies', models.PositiveIntegerField(default=0)),
+                ('available_copies', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Category inventories',
+            },
+        ),
+        migrations.RunPython(build_inventory, migrations.RunPython.noop),
+    ]
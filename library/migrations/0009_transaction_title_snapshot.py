@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BACKFILL_CHUNK_SIZE = 10000
+
+
+def copy_book_titles(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    title = Subquery(Book.objects.filter(pk=OuterRef('book_id')).values('title')[:1])
+    for model_name in ['Transaction', 'TransactionArchive']:
+        model = apps.get_model('library', model_name)
+        last_pk = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        for start in range(0, last_pk, BACKFILL_CHUNK_SIZE):
+            model.objects.filter(pk__gt=start, pk__lte=start + BACKFILL_CHUNK_SIZE).update(book_title=title)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_category_inventory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='book_title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='transactionarchive',
+            name='book_title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(copy_book_titles, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-transaction_date', 'transaction_type'], name='transaction_user_date_type_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='transaction_user_date_idx',
+        ),
+    ]
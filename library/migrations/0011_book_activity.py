@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:27
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+KINDS = {'checkout': 'checkouts', 'reservation': 'reservations'}
+
+
+def count_history(apps, schema_editor):
+    # Daily buckets for the last year; compact_trending merges the older ones.
+    BookActivity = apps.get_model('library', 'BookActivity')
+    since = timezone.localdate() - timedelta(days=365)
+    counts = defaultdict(Counter)
+    for name in ('Transaction', 'TransactionArchive'):
+        rows = apps.get_model('library', name).objects.filter(
+            transaction_type__in=KINDS, transaction_date__date__gte=since
+        ).order_by().values('book_id', 'transaction_type', day=TruncDate('transaction_date')).annotate(n=Count('pk'))
+        for row in rows:
+            counts[row['book_id'], row['day']][KINDS[row['transaction_type']]] += row['n']
+    BookActivity.objects.bulk_create([
+        BookActivity(book_id=book_id, day=day, **totals) for (book_id, day), totals in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_book_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+                ('reservations', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='library.book')),
+            ],
+            options={
+                'verbose_name_plural': 'Book activity',
+                'indexes': [models.Index(fields=['day', 'book', 'checkouts', 'reservations'], name='book_activity_window_idx')],
+                'constraints': [models.UniqueConstraint(fields=('book', 'day'), name='unique_book_activity_day')],
+            },
+        ),
+        migrations.RunPython(count_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:29
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def mark_past_due(apps, schema_editor):
+    # Loans already overdue were handled by send_notifications; the scheduler starts from now.
+    BookCheckout = apps.get_model('library', 'BookCheckout')
+    BookCheckout.objects.filter(is_returned=False, due_date__lt=timezone.now()).update(
+        reminder_sent_at=F('due_date'), overdue_notified_at=F('due_date')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0011_book_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookcheckout',
+            name='overdue_notified_at',
+            field=models.DateTimeField(blank=True, help_text='Overdue notice queued by the scheduler', null=True),
+        ),
+        migrations.AddField(
+            model_name='bookcheckout',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, help_text='Due-soon reminder queued by the scheduler', null=True),
+        ),
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='kind',
+            field=models.CharField(choices=[('hold_ready', 'Hold ready for pickup'), ('due_soon', 'Due date reminder'), ('overdue', 'Overdue reminder')], max_length=20),
+        ),
+        migrations.RunPython(mark_past_due, migrations.RunPython.noop),
+    ]
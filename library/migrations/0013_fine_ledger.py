@@ -0,0 +1,64 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def open_ledger(apps, schema_editor):
+    # Fines charged so far become one opening accrual per checkout.
+    BookCheckout = apps.get_model('library', 'BookCheckout')
+    FineLedgerEntry = apps.get_model('library', 'FineLedgerEntry')
+    FineBalance = apps.get_model('library', 'FineBalance')
+    now = timezone.now()
+    fined = BookCheckout.objects.filter(fine_amount__gt=0).order_by('pk')
+    FineLedgerEntry.objects.bulk_create([
+        FineLedgerEntry(user_id=user_id, checkout_id=pk, kind='accrual', amount=amount,
+                        created_at=returned or now, note='Opening balance')
+        for pk, user_id, amount, returned in fined.values_list('pk', 'user_id', 'fine_amount', 'return_date').iterator()
+    ], batch_size=1000)
+    FineBalance.objects.bulk_create([
+        FineBalance(user_id=row['user_id'], balance=row['total'], updated_at=now)
+        for row in fined.order_by().values('user_id').annotate(total=Sum('fine_amount'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_change_markers'),
+        ('library', '0012_checkout_schedule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FineBalance',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fine_balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FineLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('accrual', 'Fine accrued'), ('payment', 'Payment'), ('waiver', 'Waiver')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Signed change to the balance', max_digits=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('checkout', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fine_entries', to='library.bookcheckout')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fine_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Fine ledger entries',
+                'indexes': [models.Index(fields=['user', '-created_at'], name='fine_entry_user_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
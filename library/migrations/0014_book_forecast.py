@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_fine_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookForecast',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='library.book')),
+                ('expected_at', models.DateTimeField(blank=True, help_text='Empty while a copy is on the shelf', null=True)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
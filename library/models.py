@@ -1,12 +1,31 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Concat
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+from Law_Study_AssistantAPI import response_cache
+
 from datetime import timedelta
 
 User = settings.AUTH_USER_MODEL
 
+LOAN_PERIOD = timedelta(days=14)
+
+class annotatable_property:
+    """
+    Read-only computed attribute that yields to a queryset annotation of the
+    same name, so rows loaded with ``annotate(name=...)`` use the database value.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return self.func(instance)
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
@@ -14,9 +33,38 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = "Categories"
     
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        super().save(*args, **kwargs)
+        if creating:
+            CategoryInventory.objects.get_or_create(category=self)
+        # Book listings show the category name.
+        response_cache.bump(Category._meta.label, Book._meta.label)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        response_cache.bump(Category._meta.label, Book._meta.label)
+        return result
+    
     def __str__(self):
         return self.name
 
+class CategoryInventory(models.Model):
+    """
+    Running totals of the books in a category, kept up to date by
+    ``library.inventory`` and rebuilt by ``rebuild_category_inventory``.
+    """
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='inventory')
+    title_count = models.PositiveIntegerField(default=0)
+    total_copies = models.PositiveIntegerField(default=0)
+    available_copies = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Category inventories"
+    
+    def __str__(self):
+        return f"{self.category_id}: {self.available_copies}/{self.total_copies} copies of {self.title_count} titles"
+
 class Book(models.Model):
     title = models.CharField(max_length=255)
     author = models.CharField(max_length=255)
@@ -30,10 +78,39 @@ class Book(models.Model):
     location = models.CharField(max_length=100, blank=True, help_text="Shelf location")
     added_date = models.DateTimeField(default=timezone.now)
     
+    class Meta:
+        indexes = [
+            # Catalogue listing, newest first
+            models.Index(fields=['-added_date'], name='book_added_idx'),
+            # ?available_only=true listing: only books with a copy on the shelf
+            models.Index(
+                fields=['-added_date'],
+                condition=models.Q(available_copies__gt=0),
+                name='book_available_added_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
+        from .inventory import book_saved
         if not self.pk:  # New book
             self.available_copies = self.total_copies
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Book.objects.filter(pk=self.pk).values(
+                    'category_id', 'total_copies', 'available_copies'
+                ).first()
+            super().save(*args, **kwargs)
+            book_saved(self, previous)
+            response_cache.bump(Book._meta.label)
+    
+    def delete(self, *args, **kwargs):
+        from .inventory import book_deleted
+        with transaction.atomic():
+            book_deleted(self)
+            result = super().delete(*args, **kwargs)
+            response_cache.bump(Book._meta.label)
+            return result
     
     @property
     def is_available(self):
@@ -42,6 +119,60 @@ class Book(models.Model):
     def __str__(self):
         return f"{self.title} by {self.author}"
 
+class FullTextField(models.TextField):
+    """Hidden column of an FTS5 table; supports the ``match`` lookup."""
+
+
+@FullTextField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+class BookSearchEntry(models.Model):
+    """Row of the SQLite FTS5 catalog index maintained by triggers (see library.search)"""
+    book = models.OneToOneField(
+        Book, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', related_name='search_entry'
+    )
+    document = FullTextField(db_column='library_book_fts')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'library_book_fts'
+
+class BookCheckoutQuerySet(models.QuerySet):
+    def with_overdue_state(self, now=None):
+        """
+        Annotate ``is_overdue``, ``days_overdue`` and ``current_fine`` computed
+        in the database against a single ``now``, so a whole list is
+        consistent and reading it never writes.
+        """
+        from .fines import days_overdue_expression, fine_expression
+        now = now or timezone.now()
+        overdue = models.Q(is_returned=False, due_date__lt=now)
+        return self.annotate(
+            is_overdue=models.Case(
+                models.When(overdue, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+            days_overdue=models.Case(
+                models.When(overdue, then=days_overdue_expression(now)),
+                default=models.Value(0),
+                output_field=models.IntegerField(),
+            ),
+            current_fine=models.Case(
+                models.When(overdue, then=fine_expression(now)),
+                default=models.F('fine_amount'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+
 class BookCheckout(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkouts')
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='checkouts')
@@ -50,6 +181,10 @@ class BookCheckout(models.Model):
     return_date = models.DateTimeField(null=True, blank=True)
     is_returned = models.BooleanField(default=False)
     fine_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, help_text="Due-soon reminder queued by the scheduler")
+    overdue_notified_at = models.DateTimeField(null=True, blank=True, help_text="Overdue notice queued by the scheduler")
+    
+    objects = BookCheckoutQuerySet.as_manager()
     
     class Meta:
         constraints = [
@@ -59,30 +194,53 @@ class BookCheckout(models.Model):
                 name='unique_active_checkout'
             )
         ]
+        indexes = [
+            # A member's loans, optionally only the open ones
+            models.Index(fields=['user', 'is_returned'], name='checkout_user_returned_idx'),
+            # Overdue scans: is_returned=False AND due_date < now
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(is_returned=False),
+                name='checkout_open_due_idx'
+            ),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.pk:  # New checkout
-            self.due_date = timezone.now() + timedelta(days=14)  # 2 weeks loan period
-        # Auto-calculate fine for overdue books
-        if self.is_overdue and not self.is_returned:
-            self.fine_amount = self.days_overdue * 1.00
+            self.due_date = timezone.now() + LOAN_PERIOD  # 2 weeks loan period
         super().save(*args, **kwargs)
     
-    @property
+    @annotatable_property
     def is_overdue(self):
         return not self.is_returned and timezone.now() > self.due_date
     
-    @property
+    @annotatable_property
     def days_overdue(self):
         if self.is_overdue:
             return (timezone.now() - self.due_date).days
         return 0
     
+    @annotatable_property
+    def current_fine(self):
+        """Fine owed as of now; the stored fine_amount lags until the next sweep or return"""
+        if self.is_overdue:
+            return self.days_overdue * 1.00
+        return self.fine_amount
+    
     def calculate_fine(self):
-        """Calculate fine for overdue books ($1 per day)"""
+        """Calculate fine for overdue books ($1 per day), posting the increase to the fine ledger"""
+        from .fines import FINE_PER_DAY
+        from .ledger import accrue
         if self.is_overdue:
-            self.fine_amount = self.days_overdue * 1.00
-            self.save()
+            with transaction.atomic():
+                # The fine already charged is read under lock, as the fine sweep may have just raised it.
+                charged = BookCheckout.objects.select_for_update().filter(
+                    pk=self.pk, is_returned=False
+                ).values_list('fine_amount', flat=True).first()
+                if charged is not None:
+                    self.fine_amount = self.days_overdue * FINE_PER_DAY
+                    BookCheckout.objects.filter(pk=self.pk).update(fine_amount=self.fine_amount)
+                    accrue([(self.pk, self.user_id, charged, self.fine_amount)])
         return self.fine_amount
     
     def __str__(self):
@@ -95,6 +253,8 @@ class Reservation(models.Model):
     reservation_date = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     notified = models.BooleanField(default=False)
+    queue_position = models.PositiveIntegerField(null=True, blank=True, help_text="1 is next in line; empty once the hold leaves the queue")
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Pickup deadline once a copy is held for this reservation")
     
     class Meta:
         constraints = [
@@ -104,6 +264,16 @@ class Reservation(models.Model):
                 name='unique_active_reservation'
             )
         ]
+        indexes = [
+            # FIFO hold queue per book
+            models.Index(fields=['book', 'is_active', 'reservation_date'], name='reservation_queue_idx'),
+            # Expiry sweep over holds waiting for pickup
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(is_active=True, notified=True),
+                name='reservation_hold_expiry_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} reserved {self.book.title}"
@@ -119,12 +289,238 @@ class Transaction(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions')
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='transactions')
+    # Title at the time of the transaction, so history is listed without joining Book
+    book_title = models.CharField(max_length=255, blank=True)
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     transaction_date = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True)
     
     class Meta:
         ordering = ['-transaction_date']
+        indexes = [
+            # A member's history, newest first, optionally of one type
+            models.Index(
+                fields=['user', '-transaction_date', 'transaction_type'], name='transaction_user_date_type_idx'
+            ),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if not self.book_title:
+            self.book_title = self.book.title
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.transaction_type} - {self.book.title}"
+
+class TransactionArchive(models.Model):
+    """
+    Transaction moved out of the hot table by the archive_history command.
+    
+    Keeps the original primary key. Notes that only repeat the book title are
+    not stored and are rebuilt from ``NOTE_TEMPLATES`` on read.
+    """
+    NOTE_TEMPLATES = {
+        'checkout': 'Book checked out: {title}',
+        'return': 'Book returned: {title}',
+        'reservation': 'Book reserved: {title}',
+    }
+    
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_transactions')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='archived_transactions')
+    book_title = models.CharField(max_length=255, blank=True)
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    transaction_date = models.DateTimeField()
+    custom_notes = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['-transaction_date']
+        indexes = [
+            models.Index(fields=['user', 'transaction_date'], name='transaction_archive_user_idx'),
+        ]
+    
+    @classmethod
+    def from_transaction(cls, transaction):
+        template = cls.NOTE_TEMPLATES.get(transaction.transaction_type)
+        standard = template is not None and transaction.notes == template.format(title=transaction.book_title)
+        return cls(
+            id=transaction.pk,
+            user_id=transaction.user_id,
+            book_id=transaction.book_id,
+            book_title=transaction.book_title,
+            transaction_type=transaction.transaction_type,
+            transaction_date=transaction.transaction_date,
+            custom_notes='' if standard else transaction.notes,
+        )
+    
+    @classmethod
+    def notes_expression(cls):
+        """The ``notes`` property as a query expression, for ``values()`` reads."""
+        whens = []
+        for transaction_type, template in cls.NOTE_TEMPLATES.items():
+            prefix, suffix = template.split('{title}')
+            whens.append(models.When(
+                custom_notes='', transaction_type=transaction_type,
+                then=Concat(models.Value(prefix), 'book_title', models.Value(suffix)),
+            ))
+        return models.Case(*whens, default='custom_notes', output_field=models.TextField())
+    
+    @property
+    def notes(self):
+        template = self.NOTE_TEMPLATES.get(self.transaction_type)
+        if self.custom_notes or template is None:
+            return self.custom_notes
+        return template.format(title=self.book_title)
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.transaction_type} - {self.book_id} (archived)"
+
+class TransactionRollup(models.Model):
+    """Per-user totals for archived transactions of one type"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_rollups')
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    count = models.PositiveIntegerField(default=0)
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'transaction_type'], name='unique_transaction_rollup')
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.transaction_type}: {self.count}"
+
+class OutboxMessage(models.Model):
+    """Email queued in the same transaction as the event that caused it"""
+    KINDS = [
+        ('hold_ready', 'Hold ready for pickup'),
+        ('due_soon', 'Due date reminder'),
+        ('overdue', 'Overdue reminder'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='outbox_messages')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, default=timezone.now, help_text="Empty once delivery is abandoned")
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        indexes = [
+            # Worker scan of undelivered messages that are due
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(sent_at__isnull=True),
+                name='outbox_pending_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} for user {self.user_id}"
+
+class BookForecast(models.Model):
+    """When a copy of a book with none on the shelf is expected back for a new reservation"""
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    expected_at = models.DateTimeField(null=True, blank=True, help_text="Empty while a copy is on the shelf")
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.book_id}: {self.expected_at}"
+
+class FineLedgerEntry(models.Model):
+    """Append-only change to what a member owes: accruals add, payments and waivers subtract"""
+    KINDS = [
+        ('accrual', 'Fine accrued'),
+        ('payment', 'Payment'),
+        ('waiver', 'Waiver'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='fine_entries')
+    checkout = models.ForeignKey(BookCheckout, on_delete=models.SET_NULL, null=True, blank=True, related_name='fine_entries')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Signed change to the balance")
+    created_at = models.DateTimeField(default=timezone.now)
+    note = models.CharField(max_length=255, blank=True)
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    class Meta:
+        verbose_name_plural = "Fine ledger entries"
+        indexes = [
+            # A member's statement, newest first
+            models.Index(fields=['user', '-created_at'], name='fine_entry_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.amount}"
+
+class FineBalance(models.Model):
+    """Running total of a member's ledger entries"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='fine_balance')
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.balance}"
+
+class BookActivity(models.Model):
+    """Checkouts and reservations of a book in one bucket: a day, or a whole month once compacted (dated the 1st)"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    checkouts = models.PositiveIntegerField(default=0)
+    reservations = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Book activity"
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'day'], name='unique_book_activity_day')
+        ]
+        indexes = [
+            # Windowed leaderboards: day >= ?, summed per book from the index alone
+            models.Index(fields=['day', 'book', 'checkouts', 'reservations'], name='book_activity_window_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.book_id} on {self.day}: {self.checkouts} checkouts, {self.reservations} reservations"
+
+class BookPairCount(models.Model):
+    """Cell of the co-borrowing matrix: members who borrowed both books (the diagonal: the book's borrowers)"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            # Also the index that reads one book's row
+            models.UniqueConstraint(fields=['book', 'other'], name='unique_book_pair')
+        ]
+    
+    def __str__(self):
+        return f"{self.book_id} x {self.other_id}: {self.count}"
+
+class BookRecommendation(models.Model):
+    """One of a book's top related books, by co-borrowing"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='recommendations')
+    related = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        constraints = [
+            # Related-books endpoint: WHERE book_id = ? ORDER BY rank
+            models.UniqueConstraint(fields=['book', 'rank'], name='unique_recommendation_rank')
+        ]
+    
+    def __str__(self):
+        return f"{self.book_id} #{self.rank}: {self.related_id} ({self.score:.3f})"
+
+class RecommendationState(models.Model):
+    """Single row: how far the recommendation job has read the checkout log"""
+    last_checkout_id = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
-        return f"{self.user.username} - {self.transaction_type} - {self.book.title}"
\ No newline at end of file
+        return f"Recommendations up to checkout {self.last_checkout_id}"
@@ -1,22 +1,60 @@
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from .models import BookCheckout, Reservation
+from . import outbox
+from .fines import overdue_checkouts, sweep_overdue_fines
+from .models import BookCheckout
 
-def notify_book_availability():
-    """Notify users when reserved books become available"""
-    pass
+OVERDUE_ENQUEUE_CHUNK_SIZE = 2000
 
-def check_overdue_books():
-    """Check and notify about overdue books"""
-    overdue_checkouts = BookCheckout.objects.filter(
-        is_returned=False, 
-        due_date__lt=timezone.now()
+def notify_book_availability(reservations):
+    """Queue a pickup notice for each reservation that now has a copy held"""
+    outbox.enqueue(
+        (
+            reservation.user_id,
+            'hold_ready',
+            f'"{reservation.book.title}" is ready for pickup',
+            f'A copy of "{reservation.book.title}" is being held for you until '
+            f'{reservation.expires_at:%Y-%m-%d %H:%M}.',
+        )
+        for reservation in reservations
+    )
+    return len(reservations)
+
+def due_soon_message(user_id, title, due_date):
+    return (
+        user_id,
+        'due_soon',
+        f'"{title}" is due soon',
+        f'"{title}" is due back on {due_date:%Y-%m-%d %H:%M}. Return it by then to avoid a fine.',
     )
-    
-    count = 0
-    for checkout in overdue_checkouts:
-        checkout.calculate_fine()
-        count += 1
-    
-    return count
\ No newline at end of file
+
+def overdue_message(user_id, title, due_date):
+    return (
+        user_id,
+        'overdue',
+        f'"{title}" is overdue',
+        f'"{title}" was due on {due_date:%Y-%m-%d}. Please return it to stop further fines.',
+    )
+
+def check_overdue_books():
+    """Bring fines up to date and queue the overdue notice of every overdue book not yet notified"""
+    now = timezone.now()
+    sweep_overdue_fines(now)
+    unnotified = overdue_checkouts(now).filter(overdue_notified_at__isnull=True).order_by('pk')
+    count, last_pk = 0, 0
+    while True:
+        # Queue and stamp together, skipping rows the scheduler is firing, so no loan is notified twice.
+        with transaction.atomic():
+            chunk = list(
+                unnotified.filter(pk__gt=last_pk).select_for_update(skip_locked=True, of=('self',))
+                .values_list('pk', 'user_id', 'book__title', 'due_date')[:OVERDUE_ENQUEUE_CHUNK_SIZE]
+            )
+            if not chunk:
+                return count
+            outbox.enqueue(overdue_message(user_id, title, due_date) for _, user_id, title, due_date in chunk)
+            notified = BookCheckout.objects.filter(pk__in=[row[0] for row in chunk])
+            notified.update(overdue_notified_at=now)
+            # A due-soon reminder is pointless once the overdue notice has gone out.
+            notified.filter(reminder_sent_at__isnull=True).update(reminder_sent_at=now)
+        count += len(chunk)
+        last_pk = chunk[-1][0]
@@ -0,0 +1,108 @@
+"""
+Transactional email outbox.
+
+Circulation code never talks to the mail server. It writes
+``OutboxMessage`` rows inside its own transaction, so a message exists if and
+only if the event that caused it was committed. The ``send_notifications``
+worker drains the outbox in batches: messages for the same user are merged
+into one digest, every digest in a batch goes out over a single mail
+connection, and failed digests are retried with exponential backoff.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+DRAIN_BATCH_SIZE = 500
+RETRY_BASE_DELAY = timedelta(minutes=1)
+MAX_ATTEMPTS = 6
+
+
+def enqueue(messages):
+    """Queue ``(user_id, kind, subject, body)`` tuples for delivery."""
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(user_id=user_id, kind=kind, subject=subject, body=body)
+        for user_id, kind, subject, body in messages
+    ])
+
+
+def retry_delay(attempts):
+    """Wait before the next try after ``attempts`` failed deliveries."""
+    return RETRY_BASE_DELAY * 2 ** (attempts - 1)
+
+
+def _digest(user, messages):
+    if len(messages) == 1:
+        subject, body = messages[0].subject, messages[0].body
+    else:
+        subject = f'{len(messages)} library notifications'
+        body = '\n\n'.join(f'{message.subject}\n{message.body}' for message in messages)
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+def drain(batch_size=DRAIN_BATCH_SIZE, now=None):
+    """
+    Deliver up to ``batch_size`` due messages and return how many were sent.
+
+    Rows are locked with ``SKIP LOCKED`` where supported, so several workers
+    can drain the same outbox without sending a message twice.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = list(OutboxMessage.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            sent_at__isnull=True, next_attempt_at__lte=now
+        ).select_related('user').order_by('next_attempt_at', 'pk')[:batch_size])
+        if not batch:
+            return 0
+
+        by_user = {}
+        for message in batch:
+            by_user.setdefault(message.user_id, []).append(message)
+
+        delivered, failed = [], []
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as exc:
+            failed = [(messages, exc) for messages in by_user.values()]
+        else:
+            try:
+                for messages in by_user.values():
+                    user = messages[0].user
+                    if not user.email:
+                        # Nowhere to send it; retrying will not help.
+                        delivered.extend(messages)
+                        continue
+                    try:
+                        connection.send_messages([_digest(user, messages)])
+                    except Exception as exc:
+                        failed.append((messages, exc))
+                    else:
+                        delivered.extend(messages)
+            finally:
+                connection.close()
+
+        OutboxMessage.objects.filter(pk__in=[message.pk for message in delivered]).update(sent_at=now)
+        for messages, exc in failed:
+            for message in messages:
+                message.attempts += 1
+                message.last_error = str(exc)
+                message.next_attempt_at = (
+                    now + retry_delay(message.attempts) if message.attempts < MAX_ATTEMPTS else None
+                )
+            OutboxMessage.objects.bulk_update(messages, ['attempts', 'last_error', 'next_attempt_at'])
+    return len(delivered)
+
+
+def drain_all(batch_size=DRAIN_BATCH_SIZE, now=None):
+    """Drain batches until nothing due is left; return the number sent."""
+    sent = 0
+    while True:
+        drained = drain(batch_size, now)
+        sent += drained
+        if drained < batch_size:
+            return sent
@@ -0,0 +1,169 @@
+"""
+Related books, from co-borrowing.
+
+``BookPairCount`` is the sparse co-occurrence matrix C = AᵀA of the member ×
+book borrowing matrix A: each cell counts the members who borrowed both
+books, and the diagonal counts each book's borrowers. Neighbours are ranked
+by cosine similarity, C[a, b] / sqrt(C[a, a] · C[b, b]), and each book's
+top ``RECOMMENDATION_TOP_K`` are stored in ``BookRecommendation``, which the
+related-books endpoint reads with one indexed lookup.
+
+``refresh()`` folds in the checkouts made since the last run, a batch at a
+time. Only a member's first loan of a book changes the matrix; the rows it
+touches are re-ranked, and so are the neighbours of every book whose
+diagonal moved, since their scores are normalised by it. Checkouts removed
+afterwards (deleted members) stay counted until ``rebuild()``.
+
+The run keeps the highest checkout id it has read. Ids are handed out
+before commit, so a slow transaction can commit an id below one already
+read. The mark therefore only moves past checkouts made at least
+``RECOMMENDATION_SETTLE`` ago, and a run stops at the first newer one.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import chain, takewhile
+
+from django.db import transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .models import BookCheckout, BookPairCount, BookRecommendation, RecommendationState
+
+RECOMMENDATION_TOP_K = 10
+RECOMMENDATION_BATCH_SIZE = 5000
+RECOMMENDATION_SETTLE = timedelta(minutes=5)  # Longer than any checkout transaction stays open
+_ID_CHUNK = 500  # Ids per IN (...) list, well under SQLite's parameter limit
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), _ID_CHUNK):
+        yield ids[start:start + _ID_CHUNK]
+
+
+def _first_loans(low, high):
+    """(earlier book ids, book ids first borrowed in ``(low, high]``) per member with a checkout in that range."""
+    members = BookCheckout.objects.filter(pk__gt=low, pk__lte=high).values('user_id')
+    loans = (
+        BookCheckout.objects.filter(user_id__in=members, pk__lte=high).order_by()
+        .values('user_id', 'book_id').annotate(first=Min('pk'))
+        .values_list('user_id', 'book_id', 'first')
+    )
+    borrowed = defaultdict(lambda: ([], []))
+    for user_id, book_id, first in loans:
+        borrowed[user_id][first > low].append(book_id)
+    return borrowed.values()
+
+
+def _increments(borrowed):
+    """Changes to C from each member's new books, paired with everything they borrowed before or alongside."""
+    counts = Counter()
+    for earlier, new in borrowed:
+        for i, book in enumerate(new):
+            counts[book, book] += 1
+            for other in chain(earlier, new[:i]):
+                counts[book, other] += 1
+                counts[other, book] += 1
+    return counts
+
+
+def _rows(book_ids):
+    """``{book_id: {other_id: count}}`` for ``book_ids``, diagonal included."""
+    rows = defaultdict(dict)
+    for chunk in _chunks(book_ids):
+        cells = BookPairCount.objects.filter(book_id__in=chunk).values_list('book_id', 'other_id', 'count')
+        for book_id, other_id, count in cells:
+            rows[book_id][other_id] = count
+    return rows
+
+
+def _diagonal(book_ids):
+    """``{book_id: borrowers}`` for ``book_ids``."""
+    diagonal = {}
+    for chunk in _chunks(book_ids):
+        diagonal.update(
+            BookPairCount.objects.filter(book_id__in=chunk, other_id=F('book_id')).values_list('book_id', 'count')
+        )
+    return diagonal
+
+
+def _apply(increments):
+    """Add ``increments`` to the matrix; return the updated rows of the books they touch."""
+    rows = _rows({book for book, _ in increments})
+    for (book, other), change in increments.items():
+        rows[book][other] = rows[book].get(other, 0) + change
+    BookPairCount.objects.bulk_create(
+        [BookPairCount(book_id=book, other_id=other, count=rows[book][other]) for book, other in increments],
+        update_conflicts=True, unique_fields=['book', 'other'], update_fields=['count'], batch_size=1000,
+    )
+    return rows
+
+
+def _rank(rows, top_k):
+    """The top ``top_k`` neighbours of each book in ``rows``, as unsaved ``BookRecommendation`` objects."""
+    diagonal = _diagonal(set(chain.from_iterable(rows.values())))
+    recommendations = []
+    for book_id, row in rows.items():
+        own = row.get(book_id)
+        if not own:
+            continue
+        # Ties go to the pair borrowed together more often, then to the older book.
+        scored = [
+            (count / math.sqrt(own * diagonal[other]), count, -other)
+            for other, count in row.items() if other != book_id
+        ]
+        recommendations.extend(
+            BookRecommendation(book_id=book_id, related_id=-other, rank=rank, score=score)
+            for rank, (score, _, other) in enumerate(heapq.nlargest(top_k, scored), 1)
+        )
+    return recommendations
+
+
+def _refresh_batch(low, high, top_k):
+    increments = _increments(_first_loans(low, high))
+    rows = _apply(increments)
+    moved = {book for book, other in increments if book == other}
+    neighbours = set(chain.from_iterable(rows[book] for book in moved)) - rows.keys()
+    rows.update(_rows(neighbours))
+    for chunk in _chunks(rows):
+        BookRecommendation.objects.filter(book_id__in=chunk).delete()
+    BookRecommendation.objects.bulk_create(_rank(rows, top_k), batch_size=1000)
+    return len(rows)
+
+
+def refresh(batch_size=RECOMMENDATION_BATCH_SIZE, top_k=RECOMMENDATION_TOP_K, progress=None):
+    """Fold checkouts made since the last run into the recommendations, one transaction per batch."""
+    RecommendationState.objects.get_or_create(pk=1)
+    stats = {'checkouts': 0, 'ranked': 0}
+    settled_before = timezone.now() - RECOMMENDATION_SETTLE
+    while True:
+        with transaction.atomic():
+            # Locking the state row keeps concurrent runs from reading the same batch.
+            state = RecommendationState.objects.select_for_update().get(pk=1)
+            rows = list(
+                BookCheckout.objects.filter(pk__gt=state.last_checkout_id)
+                .order_by('pk').values_list('pk', 'checkout_date')[:batch_size]
+            )
+            batch = [pk for pk, _ in takewhile(lambda row: row[1] <= settled_before, rows)]
+            if not batch:
+                return stats
+            stats['ranked'] += _refresh_batch(state.last_checkout_id, batch[-1], top_k)
+            stats['checkouts'] += len(batch)
+            state.last_checkout_id = batch[-1]
+            state.refreshed_at = timezone.now()
+            state.save()
+        if progress:
+            progress(stats)
+        if len(batch) < len(rows):
+            return stats
+
+
+def rebuild(batch_size=RECOMMENDATION_BATCH_SIZE, top_k=RECOMMENDATION_TOP_K, progress=None):
+    """Drop the matrix and recommendations and recompute them from every checkout."""
+    with transaction.atomic():
+        BookPairCount.objects.all().delete()
+        BookRecommendation.objects.all().delete()
+        RecommendationState.objects.update_or_create(pk=1, defaults={'last_checkout_id': 0, 'refreshed_at': None})
+    return refresh(batch_size, top_k, progress)
@@ -0,0 +1,119 @@
+"""
+Due-date scheduler for loan reminders and overdue notices.
+
+``DueDateScheduler`` keeps a min-heap of ``(fire_at, checkout_id, kind)``
+events for open checkouts: a ``due_soon`` reminder ``REMINDER_LEAD`` before
+the due date and an ``overdue`` notice at it. Only events up to
+``horizon`` ahead are held, loaded by a range scan of the open-loan
+due-date index, so memory does not grow with the number of loans; the
+window slides forward as time passes. Checkouts made after the last scan
+are picked up by primary key, so nothing is rescanned.
+
+Firing is idempotent. Due events are popped in batches, and each batch
+re-reads its checkouts, skips the ones returned or already notified, queues
+the messages in the outbox and stamps ``reminder_sent_at`` /
+``overdue_notified_at`` in one transaction. Rows are locked with
+``SKIP LOCKED`` where supported, so a restarted or second scheduler cannot
+send a notice twice. Delivery is left to the ``send_notifications``
+worker.
+"""
+import heapq
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import outbox
+from .models import BookCheckout
+from .notifications import due_soon_message, overdue_message
+
+REMINDER_LEAD = timedelta(days=2)
+SCHEDULER_HORIZON = timedelta(hours=6)
+SCHEDULER_BATCH_SIZE = 500
+
+_KINDS = {
+    # kind: (stamp field, offset of the event from the due date, message)
+    'due_soon': ('reminder_sent_at', -REMINDER_LEAD, due_soon_message),
+    'overdue': ('overdue_notified_at', timedelta(0), overdue_message),
+}
+
+
+class DueDateScheduler:
+    def __init__(self, horizon=SCHEDULER_HORIZON, batch_size=SCHEDULER_BATCH_SIZE):
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.events = []
+        self.horizon_end = None
+        self.last_checkout_id = 0
+
+    def _push(self, checkouts, after=None):
+        """Queue the unsent events of ``checkouts`` that fall after ``after`` and inside the horizon."""
+        for pk, due_date, reminded, notified in checkouts:
+            for kind, sent in (('due_soon', reminded), ('overdue', notified)):
+                fire_at = due_date + _KINDS[kind][1]
+                if sent is None and (after is None or fire_at > after) and fire_at <= self.horizon_end:
+                    heapq.heappush(self.events, (fire_at, pk, kind))
+
+    def _scan(self, due_date_lookups):
+        unsent = Q(reminder_sent_at__isnull=True) | Q(overdue_notified_at__isnull=True)
+        return BookCheckout.objects.filter(unsent, is_returned=False, **due_date_lookups).values_list(
+            'pk', 'due_date', 'reminder_sent_at', 'overdue_notified_at'
+        )
+
+    def refresh(self, now):
+        """Slide the horizon up to ``now + horizon`` and pick up checkouts made since the last call."""
+        end = now + self.horizon
+        if self.horizon_end is None:
+            self.last_checkout_id = BookCheckout.objects.aggregate(last=Max('pk'))['last'] or 0
+            self.horizon_end = end
+            self._push(self._scan({'due_date__lte': end + REMINDER_LEAD}))
+        elif end > self.horizon_end:
+            previous, self.horizon_end = self.horizon_end, end
+            self._push(self._scan({'due_date__gt': previous, 'due_date__lte': end + REMINDER_LEAD}), previous)
+        new = list(self._scan({}).filter(pk__gt=self.last_checkout_id).order_by('pk'))
+        if new:
+            self.last_checkout_id = new[-1][0]
+            self._push(new)
+
+    def next_deadline(self):
+        return self.events[0][0] if self.events else None
+
+    def fire_due(self, now):
+        """Queue the notices that are due at ``now``; return the count of each kind queued."""
+        fired = dict.fromkeys(_KINDS, 0)
+        while self.events and self.events[0][0] <= now:
+            batch = {kind: set() for kind in _KINDS}
+            while self.events and self.events[0][0] <= now and sum(map(len, batch.values())) < self.batch_size:
+                _, pk, kind = heapq.heappop(self.events)
+                batch[kind].add(pk)
+            for kind, pks in batch.items():
+                if pks:
+                    fired[kind] += self._fire(kind, pks, now)
+        return fired
+
+    def _fire(self, kind, pks, now):
+        field, offset, message = _KINDS[kind]
+        lookups = {'due_date__lte': now - offset, f'{field}__isnull': True}
+        if kind == 'due_soon':
+            # A loan already past due gets the overdue notice instead (e.g. on a cold start).
+            lookups['due_date__gt'] = now
+        with transaction.atomic():
+            due = list(
+                BookCheckout.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(pk__in=pks, is_returned=False, **lookups)
+                .values_list('pk', 'user_id', 'book__title', 'due_date')
+            )
+            outbox.enqueue(message(user_id, title, due_date) for _, user_id, title, due_date in due)
+            fired = BookCheckout.objects.filter(pk__in=[row[0] for row in due])
+            fired.update(**{field: now})
+            if kind == 'overdue':
+                # The overdue notice supersedes a reminder never sent, so the loan leaves later scans.
+                fired.filter(reminder_sent_at__isnull=True).update(reminder_sent_at=now)
+        return len(due)
+
+    def run_once(self, now=None):
+        """Refresh the heap and fire everything due; return the counts queued."""
+        now = now or timezone.now()
+        self.refresh(now)
+        return self.fire_due(now)
@@ -0,0 +1,124 @@
+"""
+Indexed full-text search for the book catalog.
+
+On SQLite the catalog is mirrored into an FTS5 table (``library_book_fts``)
+using the trigram tokenizer; triggers created in migration 0002 keep it in
+sync whenever a ``Book`` row is inserted, deleted or has its title, author
+or ISBN changed. On PostgreSQL a GIN index over a weighted ``simple``
+tsvector serves exact matches and ``pg_trgm`` indexes serve fuzzy ones.
+
+Both backends rank results by relevance. When the exact terms find nothing
+the search falls back to trigram similarity, so misspelled author names
+still return the intended books.
+"""
+import re
+
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+TRIGRAM_LENGTH = 3
+
+
+def _terms(query):
+    return [term for term in re.split(r'\s+', query.strip()) if term]
+
+
+def _quote(text):
+    return '"%s"' % text.replace('"', '""')
+
+
+def _trigrams(terms):
+    seen = []
+    for term in terms:
+        term = term.lower()
+        for i in range(len(term) - TRIGRAM_LENGTH + 1):
+            trigram = term[i:i + TRIGRAM_LENGTH]
+            if trigram not in seen:
+                seen.append(trigram)
+    return seen
+
+
+def book_search_vector():
+    """Weighted tsvector; must match the expression indexed in migration 0002."""
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('title', config='simple', weight='A')
+        + SearchVector('isbn', config='simple', weight='A')
+        + SearchVector('author', config='simple', weight='B')
+    )
+
+
+def _search_sqlite(queryset, terms):
+    # The trigram tokenizer cannot match anything shorter than a trigram.
+    terms = [term for term in terms if len(term) >= TRIGRAM_LENGTH]
+    if not terms:
+        return None
+
+    match = ' AND '.join(_quote(term) for term in terms)
+    results = queryset.filter(search_entry__document__match=match)
+    if not results.exists():
+        match = ' OR '.join(_quote(trigram) for trigram in _trigrams(terms))
+        results = queryset.filter(search_entry__document__match=match)
+
+    # bm25() scores are negative, lower is better.
+    return results.annotate(search_rank=-F('search_entry__rank'))
+
+
+def _search_postgres(queryset, terms):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+    from django.db.models import Q
+
+    text = ' '.join(terms)
+    vector = book_search_vector()
+    search_query = SearchQuery(text, config='simple', search_type='plain')
+    results = queryset.annotate(search_document=vector).filter(search_document=search_query)
+    if results.exists():
+        return results.annotate(search_rank=SearchRank(vector, search_query))
+
+    return queryset.filter(
+        Q(author__trigram_word_similar=text) | Q(title__trigram_word_similar=text)
+    ).annotate(search_rank=Greatest(
+        TrigramWordSimilarity(text, 'author'),
+        TrigramWordSimilarity(text, 'title'),
+    ))
+
+
+def search_books(queryset, query):
+    """
+    Filter a ``Book`` queryset to matches for ``query``, annotated with
+    ``search_rank`` (higher is more relevant).
+
+    Returns ``None`` when the index cannot serve the query, e.g. on an
+    unsupported backend or for terms shorter than a trigram on SQLite.
+    """
+    terms = _terms(query)
+    if not terms:
+        return None
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, terms)
+    if vendor == 'postgresql':
+        return _search_postgres(queryset, terms)
+    return None
+
+
+class BookSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the catalog index, ordered by relevance unless
+    the client asked for an explicit ``?ordering=``.
+
+    Place after ``OrderingFilter`` in ``filter_backends``. Falls back to the
+    regular ``LIKE`` search when the index cannot serve the query.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        results = search_books(queryset, query)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return results
+        return results.order_by('-search_rank', 'id')
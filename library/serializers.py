@@ -1,11 +1,20 @@
+from decimal import Decimal
 from rest_framework import serializers
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from django.utils.html import escape
-from .models import Book, BookCheckout, Category, Reservation, Transaction
+from .circulation import MAX_BATCH_SIZE
+from .trending import TRENDING_WINDOWS
+from .models import Book, BookCheckout, BookRecommendation, Category, FineLedgerEntry, Reservation, Transaction
 
 class CategorySerializer(serializers.ModelSerializer):
+    # Inventory rollup, annotated by the category views
+    title_count = serializers.IntegerField(read_only=True, default=0)
+    total_copies = serializers.IntegerField(read_only=True, default=0)
+    available_copies = serializers.IntegerField(read_only=True, default=0)
+    
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description']
+        fields = ['id', 'name', 'description', 'title_count', 'total_copies', 'available_copies']
     
     def validate(self, attrs):
         # Sanitize text fields
@@ -17,13 +26,18 @@ class CategorySerializer(serializers.ModelSerializer):
 class BookSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     is_available = serializers.BooleanField(read_only=True)
+    expected_available_at = serializers.DateTimeField(source='forecast.expected_at', read_only=True, default=None)
     
     class Meta:
         model = Book
         fields = ['id', 'title', 'author', 'isbn', 'published_date', 'publisher', 
                  'category', 'category_name', 'total_copies', 'available_copies', 
-                 'description', 'location', 'added_date', 'is_available']
+                 'description', 'location', 'added_date', 'is_available', 'expected_available_at']
         read_only_fields = ['added_date', 'available_copies']
+        # Model properties computed in SQL for the values() fast path
+        read_expressions = {
+            'is_available': ExpressionWrapper(Q(available_copies__gt=0), output_field=BooleanField()),
+        }
     
     def validate(self, attrs):
         # Sanitize text fields
@@ -32,17 +46,40 @@ class BookSerializer(serializers.ModelSerializer):
                 attrs[field] = escape(str(attrs[field]))
         return attrs
 
+class RelatedBookSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='related_id', read_only=True)
+    title = serializers.CharField(source='related.title', read_only=True)
+    author = serializers.CharField(source='related.author', read_only=True)
+    is_available = serializers.BooleanField(source='related.is_available', read_only=True)
+    
+    class Meta:
+        model = BookRecommendation
+        fields = ['id', 'title', 'author', 'is_available', 'rank', 'score']
+
+class TrendingRequestSerializer(serializers.Serializer):
+    window = serializers.ChoiceField(choices=list(TRENDING_WINDOWS), default='week')
+    category = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+class TrendingBookSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='book_id')
+    title = serializers.CharField()
+    author = serializers.CharField()
+    checkouts = serializers.IntegerField()
+    reservations = serializers.IntegerField()
+
 class BookCheckoutSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     is_overdue = serializers.BooleanField(read_only=True)
     days_overdue = serializers.IntegerField(read_only=True)
+    current_fine = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
         model = BookCheckout
         fields = ['id', 'user', 'book', 'book_title', 'user_username', 
                  'checkout_date', 'due_date', 'return_date', 'is_returned', 
-                 'fine_amount', 'is_overdue', 'days_overdue']
+                 'fine_amount', 'current_fine', 'is_overdue', 'days_overdue']
         read_only_fields = ['checkout_date', 'due_date', 'return_date']
 
 class ReservationSerializer(serializers.ModelSerializer):
@@ -52,8 +89,20 @@ class ReservationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reservation
         fields = ['id', 'user', 'book', 'book_title', 'user_username', 
-                 'reservation_date', 'is_active', 'notified']
-        read_only_fields = ['reservation_date']
+                 'reservation_date', 'is_active', 'notified', 'queue_position', 'expires_at']
+        read_only_fields = ['user', 'reservation_date', 'notified', 'queue_position', 'expires_at']
+    
+    def validate_book(self, value):
+        # Queue position and any held copy belong to the original book.
+        if self.instance is not None and value.pk != self.instance.book_id:
+            raise serializers.ValidationError("A reservation cannot be moved to another book")
+        return value
+
+class BookOverviewSerializer(serializers.Serializer):
+    book = BookSerializer()
+    queue_length = serializers.IntegerField(help_text="Members waiting for a copy, not counting ready holds")
+    my_checkout = BookCheckoutSerializer(allow_null=True)
+    my_reservation = ReservationSerializer(allow_null=True)
 
 class CheckoutRequestSerializer(serializers.Serializer):
     book_id = serializers.IntegerField(min_value=1)
@@ -71,6 +120,36 @@ class ReturnRequestSerializer(serializers.Serializer):
             raise serializers.ValidationError("Invalid checkout ID")
         return value
 
+class BatchCheckoutRequestSerializer(serializers.Serializer):
+    book_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=MAX_BATCH_SIZE
+    )
+
+class BatchReturnRequestSerializer(serializers.Serializer):
+    checkout_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=MAX_BATCH_SIZE
+    )
+
+class BatchCheckoutResultSerializer(serializers.Serializer):
+    book_id = serializers.IntegerField()
+    checkout = BookCheckoutSerializer(required=False)
+    error = serializers.CharField(required=False)
+
+class BatchReturnResultSerializer(serializers.Serializer):
+    checkout_id = serializers.IntegerField()
+    checkout = BookCheckoutSerializer(required=False)
+    error = serializers.CharField(required=False)
+
+class BatchCheckoutResponseSerializer(serializers.Serializer):
+    succeeded = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = BatchCheckoutResultSerializer(many=True)
+
+class BatchReturnResponseSerializer(serializers.Serializer):
+    succeeded = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = BatchReturnResultSerializer(many=True)
+
 class ReservationRequestSerializer(serializers.Serializer):
     book_id = serializers.IntegerField(min_value=1)
     
@@ -80,14 +159,40 @@ class ReservationRequestSerializer(serializers.Serializer):
         return value
 
 class TransactionSerializer(serializers.ModelSerializer):
-    book_title = serializers.CharField(source='book.title', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
         model = Transaction
         fields = ['id', 'user', 'book', 'book_title', 'user_username', 
                  'transaction_type', 'transaction_date', 'notes']
-        read_only_fields = ['transaction_date']
+        read_only_fields = ['book_title', 'transaction_date']
 
 class NotificationResponseSerializer(serializers.Serializer):
-    message = serializers.CharField()
\ No newline at end of file
+    message = serializers.CharField()
+
+class CacheStatsSerializer(serializers.Serializer):
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+    hit_rate = serializers.FloatField(allow_null=True)
+
+class FineLedgerEntrySerializer(serializers.ModelSerializer):
+    book_title = serializers.CharField(source='checkout.book.title', read_only=True, default=None)
+    
+    class Meta:
+        model = FineLedgerEntry
+        fields = ['id', 'kind', 'amount', 'created_at', 'checkout', 'book_title', 'note']
+
+class FineBalanceSerializer(serializers.Serializer):
+    balance = serializers.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = serializers.DateTimeField(allow_null=True)
+    threshold = serializers.DecimalField(max_digits=10, decimal_places=2)
+    can_borrow = serializers.BooleanField()
+
+class FineSettlementRequestSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField(min_value=1)
+    kind = serializers.ChoiceField(choices=['payment', 'waiver'])
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    note = serializers.CharField(max_length=255, required=False, default='')
+    
+    def validate_note(self, value):
+        return escape(value)
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .archive import archive_transactions, transaction_totals
+from .models import Book, Transaction, TransactionArchive, TransactionRollup
+
+
+class TransactionArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='reader')
+        self.book = Book.objects.create(
+            title='Company Law', author='Yaw Asante', isbn='9780000000301',
+            published_date=date(2016, 1, 1), total_copies=1
+        )
+        self.now = timezone.now()
+        for days_ago in range(10):
+            kind = 'checkout' if days_ago % 2 else 'return'
+            transaction = Transaction.objects.create(
+                user=self.user, book=self.book, transaction_type=kind,
+                notes=f'Book {"checked out" if kind == "checkout" else "returned"}: {self.book.title}'
+            )
+            Transaction.objects.filter(pk=transaction.pk).update(transaction_date=self.now - timedelta(days=days_ago))
+        Transaction.objects.filter(transaction_date__lt=self.now - timedelta(days=8)).update(notes='Returned damaged')
+
+    def test_archive_moves_old_rows_and_keeps_totals(self):
+        before = transaction_totals(self.user)
+        moved = archive_transactions(self.now - timedelta(days=5, hours=12), chunk_size=2)
+        self.assertEqual(moved, 4)
+        self.assertEqual(Transaction.objects.count(), 6)
+        self.assertEqual(TransactionArchive.objects.count(), 4)
+        self.assertEqual(transaction_totals(self.user), before)
+        self.assertEqual(before, {'checkout': 5, 'return': 5, 'reservation': 0})
+        self.assertEqual(
+            dict(TransactionRollup.objects.values_list('transaction_type', 'count')), {'checkout': 2, 'return': 2}
+        )
+
+        archived = TransactionArchive.objects.order_by('transaction_date')
+        self.assertEqual(archived[0].notes, 'Returned damaged')
+        self.assertEqual(archived[3].custom_notes, '')
+        self.assertEqual(archived[3].notes, 'Book returned: Company Law')
+        self.assertEqual(archive_transactions(self.now - timedelta(days=5, hours=12)), 0)
+
+    def test_history_pages_through_archived_rows_on_request(self):
+        expected = list(Transaction.objects.values_list('pk', flat=True))
+        archive_transactions(self.now - timedelta(days=5, hours=12))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        response = client.get('/library/transactions/')
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(response.data['totals']['checkout'], 5)
+
+        seen, url = [], '/library/transactions/?include_archived=true&page_size=4'
+        while url:
+            response = client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual(response.data['results'][-1]['notes'], 'Returned damaged')
+
+    def test_history_filters_apply_to_hot_and_archived_rows(self):
+        archive_transactions(self.now - timedelta(days=5, hours=12))
+        Book.objects.filter(pk=self.book.pk).update(title='Company Law (2nd ed.)')
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        since = (self.now - timedelta(days=7, hours=12)).isoformat()
+        until = (self.now - timedelta(days=2, hours=12)).isoformat()
+
+        with self.assertNumQueries(3):  # the page, hot totals and archived rollups; no Book join
+            response = client.get('/library/transactions/', {'type': 'checkout', 'since': since, 'until': until})
+        self.assertEqual([row['transaction_type'] for row in response.data['results']], ['checkout'] * 2)
+
+        response = client.get('/library/transactions/', {
+            'type': 'checkout', 'since': since, 'until': until, 'include_archived': 'true'
+        })
+        rows = response.data['results']
+        self.assertEqual(len(rows), 3)
+        # Rows keep the title the book had when the transaction happened.
+        self.assertEqual({row['book_title'] for row in rows}, {'Company Law'})
+        self.assertEqual(rows[-1]['notes'], 'Book checked out: Company Law')
+
+        self.assertEqual(client.get('/library/transactions/?type=renewal').status_code, 400)
@@ -0,0 +1,67 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .circulation import checkout
+from .holds import enqueue
+from .models import Book, Category
+
+
+class BookOverviewTest(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create(username='reader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.book = Book.objects.create(
+            title='Administrative Law', author='Esi Quaye', isbn='9780000001201', published_date=date(2017, 1, 1),
+            total_copies=1, category=Category.objects.create(name='Public Law')
+        )
+
+    def add_history(self, members):
+        """Loans and queued reservations of other books and of this one by ``members`` other members."""
+        for i in range(members):
+            member = User.objects.create(username=f'member{self.book.pk}-{members}-{i}')
+            other = Book.objects.create(title=f'Other {members}-{i}', author='Esi Quaye',
+                                        isbn=f'97800{members:04d}{i:04d}', published_date=date(2017, 1, 1),
+                                        total_copies=1)
+            checkout(member, other.id)
+            enqueue(member, self.book)
+
+    def overview(self):
+        return self.client.get(f'/library/books/{self.book.pk}/overview/')
+
+    def test_caller_state_and_queue(self):
+        lender = User.objects.create(username='lender')
+        checkout(lender, self.book.id)
+        reservation = enqueue(self.reader, self.book)
+        self.add_history(2)
+        data = self.overview().data
+        self.assertEqual(data['book']['title'], 'Administrative Law')
+        self.assertEqual(data['book']['category_name'], 'Public Law')
+        self.assertFalse(data['book']['is_available'])
+        self.assertEqual(data['queue_length'], 3)
+        self.assertIsNone(data['my_checkout'])
+        self.assertEqual(data['my_reservation']['id'], reservation.id)
+        self.assertEqual(data['my_reservation']['queue_position'], 1)
+
+        self.client.force_authenticate(lender)
+        data = self.overview().data
+        self.assertEqual(data['my_checkout']['book_title'], 'Administrative Law')
+        self.assertIsNone(data['my_reservation'])
+
+        self.client.force_authenticate(None)
+        data = self.overview().data
+        self.assertIsNone(data['my_checkout'])
+        self.assertEqual(data['queue_length'], 3)
+
+    def test_query_count_does_not_grow_with_data(self):
+        checkout(self.reader, self.book.id)
+        for members in (1, 20):
+            self.add_history(members)
+            with self.assertNumQueries(3):
+                response = self.overview()
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['queue_length'], 21)
+        self.assertEqual(self.client.get('/library/books/999999/overview/').status_code, 404)
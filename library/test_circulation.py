@@ -0,0 +1,156 @@
+import threading
+from datetime import date
+from unittest import mock
+
+from django.db import IntegrityError, OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from . import inventory
+from .circulation import CirculationError, checkout
+from .models import Book, BookCheckout, Transaction
+
+
+def make_book(copies):
+    return Book.objects.create(
+        title='Constitutional Law Principles', author='John Smith', isbn='9781234567890',
+        published_date=date(2020, 1, 15), total_copies=copies
+    )
+
+
+class CheckoutReturnTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='reader', password='reader_pass_2024')
+        self.client.force_authenticate(user=self.user)
+        self.book = make_book(copies=2)
+
+    def test_checkout_and_return_adjust_copies(self):
+        response = self.client.post('/library/checkout/', {'book_id': self.book.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 1)
+
+        response = self.client.post('/library/return/', {'checkout_id': response.data['id']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_returned'])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 2)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_duplicate_checkout_rolls_back_claimed_copy(self):
+        self.client.post('/library/checkout/', {'book_id': self.book.id})
+        response = self.client.post('/library/checkout/', {'book_id': self.book.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'You already have this book checked out')
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 1)
+
+    def test_other_integrity_errors_are_not_reported_as_duplicates(self):
+        with mock.patch.object(inventory, 'adjust_available', side_effect=IntegrityError('CHECK constraint failed')):
+            with self.assertRaises(IntegrityError):
+                checkout(self.user, self.book.id)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 2)
+
+    def test_return_errors(self):
+        other = User.objects.create_user(username='other', password='other_pass_2024')
+        loan = BookCheckout.objects.create(user=other, book=self.book)
+        response = self.client.post('/library/return/', {'checkout_id': loan.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post('/library/return/', {'checkout_id': loan.id + 100})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post('/library/checkout/', {'book_id': self.book.id + 100})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BatchCirculationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='reader', password='reader_pass_2024')
+        self.client.force_authenticate(user=self.user)
+        self.books = [
+            Book.objects.create(
+                title=f'Casebook {i}', author='Jane Doe', isbn=f'97812345{i:05d}',
+                published_date=date(2019, 6, 10), total_copies=1
+            )
+            for i in range(50)
+        ]
+
+    def test_batch_checkout_and_return_use_a_fixed_number_of_queries(self):
+        book_ids = [book.id for book in self.books]
+        with self.assertNumQueries(11):
+            response = self.client.post('/library/checkout/batch/', {'book_ids': book_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['succeeded'], 50)
+        self.assertFalse(Book.objects.filter(available_copies__gt=0).exists())
+
+        checkout_ids = [result['checkout']['id'] for result in response.data['results']]
+        with self.assertNumQueries(8):
+            response = self.client.post('/library/return/batch/', {'checkout_ids': checkout_ids}, format='json')
+        self.assertEqual(response.data['succeeded'], 50)
+        self.assertFalse(Book.objects.filter(available_copies=0).exists())
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 100)
+
+    def test_batch_reports_each_failure(self):
+        taken = self.books[1]
+        BookCheckout.objects.create(user=User.objects.create(username='other'), book=taken)
+        Book.objects.filter(pk=taken.pk).update(available_copies=0)
+        missing = self.books[-1].id + 100
+        book_ids = [self.books[0].id, taken.id, missing, self.books[0].id]
+
+        response = self.client.post('/library/checkout/batch/', {'book_ids': book_ids}, format='json')
+        self.assertEqual(response.data['succeeded'], 1)
+        self.assertEqual(
+            [result.get('error') for result in response.data['results']],
+            [None, 'No copies available', 'Book not found', 'Duplicate book in request']
+        )
+
+        checkout_id = response.data['results'][0]['checkout']['id']
+        response = self.client.post('/library/return/batch/', {'checkout_ids': [checkout_id, checkout_id]}, format='json')
+        self.assertEqual(response.data['succeeded'], 1)
+        response = self.client.post('/library/return/batch/', {'checkout_ids': [checkout_id]}, format='json')
+        self.assertEqual(response.data['results'][0]['error'], 'Book already returned')
+
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+    threads = 8
+
+    def test_last_copy_is_never_over_lent(self):
+        book = make_book(copies=1)
+        users = [
+            User.objects.create(username=f'reader{i}')
+            for i in range(self.threads)
+        ]
+        barrier = threading.Barrier(self.threads)
+        outcomes = []
+
+        def borrow(user):
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        checkout(user, book.id)
+                        outcomes.append('lent')
+                    except CirculationError:
+                        outcomes.append('refused')
+                    except OperationalError:
+                        # SQLite reports write contention as "database table is locked".
+                        continue
+                    break
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=borrow, args=(user,)) for user in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        book.refresh_from_db()
+        self.assertEqual(outcomes.count('lent'), 1)
+        self.assertEqual(outcomes.count('refused'), self.threads - 1)
+        self.assertEqual(book.available_copies, 0)
+        self.assertEqual(BookCheckout.objects.filter(book=book, is_returned=False).count(), 1)
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .archive import archive_transactions
+from .circulation import checkout, return_checkout
+from .models import Book, BookCheckout, Transaction
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='auditor', role='admin')
+        self.reader = User.objects.create(username='reader')
+        self.books = [
+            Book.objects.create(
+                title=f'Evidence {i}', author='Ama Boateng', isbn=f'978000000040{i}',
+                published_date=date(2019, 1, 1), total_copies=1
+            )
+            for i in range(3)
+        ]
+        self.loans = [checkout(self.reader, book.id) for book in self.books]
+        return_checkout(self.reader, self.loans[0].id)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_transactions_csv_with_type_filter(self):
+        content = self.get('/library/admin/exports/transactions/?type=checkout')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['book_title'] for row in rows], ['Evidence 0', 'Evidence 1', 'Evidence 2'])
+        self.assertEqual(rows[0]['user_username'], 'reader')
+        self.assertEqual(rows[0]['notes'], 'Book checked out: Evidence 0')
+
+    def test_archived_transactions_are_included_on_request(self):
+        Transaction.objects.filter(transaction_type='checkout').update(
+            transaction_date=timezone.now() - timedelta(days=30)
+        )
+        archive_transactions(timezone.now() - timedelta(days=7))
+        url = '/library/admin/exports/transactions/?format=ndjson'
+        self.assertEqual(len(self.get(url).splitlines()), 1)
+        rows = [json.loads(line) for line in self.get(url + '&include_archived=true').splitlines()]
+        self.assertEqual([row['transaction_type'] for row in rows], ['checkout'] * 3 + ['return'])
+        self.assertEqual(rows[0]['notes'], 'Book checked out: Evidence 0')
+
+    def test_checkouts_ndjson_with_date_range_and_type(self):
+        BookCheckout.objects.filter(pk=self.loans[2].pk).update(checkout_date=timezone.now() - timedelta(days=40))
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        content = self.get(f'/library/admin/exports/checkouts/?format=ndjson&type=open&since={since}')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['book'] for row in rows], [self.books[1].id])
+        self.assertFalse(rows[0]['is_returned'])
+
+    def test_users_export_filters_by_role(self):
+        rows = list(csv.DictReader(io.StringIO(self.get('/auth/admin/users/export/?type=admin'))))
+        self.assertEqual([row['username'] for row in rows], ['auditor'])
+
+    def test_bad_filters_and_non_admins_are_rejected(self):
+        self.assertEqual(self.client.get('/library/admin/exports/checkouts/?since=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/library/admin/exports/checkouts/?type=lost').status_code, 400)
+        self.client.force_authenticate(user=self.reader)
+        self.assertEqual(self.client.get('/library/admin/exports/transactions/').status_code, 403)
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from books.models import Subject, Topic
+from cases.models import Case
+from cases.serializers import CaseSerializer
+from Law_Study_AssistantAPI.fast_serializers import compile_serializer
+from .archive import archive_transactions
+from .circulation import checkout, return_checkout
+from .models import Book, BookCheckout, Category, Transaction, TransactionArchive
+from .serializers import BookCheckoutSerializer, BookSerializer, TransactionSerializer
+
+
+class FastSerializerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='reader')
+        category = Category.objects.create(name='Evidence')
+        self.books = [
+            Book.objects.create(
+                title=f'Evidence & Proof {i}', author='Ama Boateng', isbn=f'978000000050{i}',
+                published_date=date(2019, 1, 1), total_copies=1, category=category if i else None
+            )
+            for i in range(3)
+        ]
+        loans = [checkout(self.user, book.id) for book in self.books]
+        return_checkout(self.user, loans[0].id)
+        BookCheckout.objects.filter(pk=loans[1].pk).update(due_date=timezone.now() - timedelta(days=3))
+        topic = Topic.objects.create(subject=Subject.objects.create(title='Criminal Law'), title='Homicide')
+        Case.objects.create(topic=topic, title='R v Woollin', suit_number='1998-1', number_of_pages=12,
+                            summary='Oblique intent', citation=None, year=1998)
+
+    def assertSameJSON(self, serializer_class, queryset):
+        compiled = compile_serializer(serializer_class)
+        expected = JSONRenderer().render(serializer_class(list(queryset), many=True).data)
+        actual = JSONRenderer().render(compiled.represent_many(compiled.project(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_compiled_output_is_byte_identical(self):
+        now = timezone.now()
+        self.assertSameJSON(BookSerializer, Book.objects.select_related('category').order_by('pk'))
+        self.assertSameJSON(
+            BookCheckoutSerializer,
+            BookCheckout.objects.select_related('book', 'user').with_overdue_state(now).order_by('pk'),
+        )
+        self.assertSameJSON(TransactionSerializer, Transaction.objects.select_related('user').order_by('pk'))
+        self.assertSameJSON(CaseSerializer, Case.objects.order_by('pk'))
+
+    def test_archived_notes_expression_matches_property(self):
+        Transaction.objects.filter(transaction_type='return').update(notes='Returned with torn cover')
+        archive_transactions(timezone.now() + timedelta(seconds=1))
+        archived = TransactionArchive.objects.order_by('pk')
+        self.assertEqual(
+            list(archived.annotate(notes=TransactionArchive.notes_expression()).values_list('notes', flat=True)),
+            [row.notes for row in archived],
+        )
+
+    def test_list_endpoints_page_through_values_rows(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        seen, url = [], '/library/books/?page_size=2'
+        while url:
+            response = client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [book.id for book in reversed(self.books)])
+        self.assertNotIn('category_name', response.data['results'][-1])
+
+        rows = client.get('/library/my-checkouts/').data['results']
+        self.assertEqual([row['is_overdue'] for row in rows], [False, True, False])
+        self.assertEqual(rows[1]['current_fine'], '3.00')
@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .fines import sweep_overdue_fines
+from .models import Book, BookCheckout
+
+
+class OverdueFixture(TestCase):
+    """Five loans due from three days ahead to thirty days ago."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='reader')
+        self.now = timezone.now()
+        self.checkouts = []
+        for i, days_late in enumerate([-3, 0, 1, 5, 30]):
+            book = Book.objects.create(
+                title=f'Book {i}', author='Author', isbn=f'978000000000{i}',
+                published_date=date(2020, 1, 1), total_copies=1
+            )
+            checkout = BookCheckout.objects.create(user=self.user, book=book)
+            BookCheckout.objects.filter(pk=checkout.pk).update(
+                due_date=self.now - timedelta(days=days_late, hours=1)
+            )
+            self.checkouts.append(checkout)
+
+    def fines(self):
+        return list(BookCheckout.objects.order_by('pk').values_list('fine_amount', flat=True))
+
+
+class FineSweepTest(OverdueFixture):
+    def test_sweep_matches_per_row_calculation(self):
+        self.assertEqual(sweep_overdue_fines(self.now, chunk_size=2), 3)
+        self.assertEqual(self.fines(), [Decimal('0'), Decimal('0'), Decimal('1'), Decimal('5'), Decimal('30')])
+        for checkout in BookCheckout.objects.filter(due_date__lt=self.now):
+            self.assertEqual(checkout.fine_amount, checkout.days_overdue)
+
+    def test_repeat_sweep_writes_nothing_and_skips_returned(self):
+        sweep_overdue_fines(self.now)
+        self.assertEqual(sweep_overdue_fines(self.now), 0)
+        BookCheckout.objects.filter(pk=self.checkouts[-1].pk).update(is_returned=True, fine_amount=7)
+        sweep_overdue_fines(self.now + timedelta(days=2))
+        self.assertEqual(self.fines()[-1], Decimal('7'))
+
+    def test_admin_overdue_listing_does_not_write(self):
+        admin = User.objects.create(username='librarian', role='admin')
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        with self.assertNumQueries(1):
+            response = client.get('/library/admin/overdue/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 4)
+
+
+class OverdueAnnotationTest(OverdueFixture):
+    def test_annotations_match_python_properties(self):
+        annotated = BookCheckout.objects.with_overdue_state(self.now).order_by('pk')
+        for row, checkout in zip(annotated, BookCheckout.objects.order_by('pk')):
+            self.assertEqual(row.is_overdue, checkout.is_overdue)
+            self.assertEqual(row.days_overdue, checkout.days_overdue)
+            self.assertEqual(row.current_fine, checkout.days_overdue)
+
+    def test_checkout_lists_are_pure_reads(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/library/my-checkouts/')
+            client.get('/library/overdue/')
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries))
+        by_id = {row['id']: row for row in response.data['results']}
+        latest = by_id[self.checkouts[-1].pk]
+        self.assertTrue(latest['is_overdue'])
+        self.assertEqual(latest['days_overdue'], 30)
+        self.assertEqual(latest['current_fine'], '30.00')
+        self.assertEqual(latest['fine_amount'], '0.00')
@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .circulation import checkout, return_checkout
+from .forecast import RETURN_OFFSET_KEY, refresh, return_offset
+from .holds import enqueue
+from .models import LOAN_PERIOD, Book, BookCheckout, BookForecast
+
+
+class ForecastTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.members = [User.objects.create(username=f'member{i}') for i in range(4)]
+        self.book = Book.objects.create(title='Jurisprudence', author='Kojo Addo', isbn='9780000001001',
+                                        published_date=date(2018, 1, 1), total_copies=1)
+
+    def lend(self, member=0, book=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return checkout(self.members[member], (book or self.book).id)
+
+    def expected(self, book=None):
+        return BookForecast.objects.get(book=book or self.book).expected_at
+
+    def test_forecast_follows_loans_and_queue(self):
+        loan = self.lend()
+        self.assertEqual(self.expected(), loan.due_date)
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(self.members[1], self.book)
+            enqueue(self.members[2], self.book)
+        # Each waiter ahead keeps the copy for a whole loan period.
+        self.assertEqual(self.expected(), loan.due_date + 2 * LOAN_PERIOD)
+        with self.captureOnCommitCallbacks(execute=True):
+            return_checkout(self.members[0], loan.id)
+        forecast = self.expected()
+        self.assertGreater(forecast, timezone.now() + 2 * LOAN_PERIOD - timedelta(minutes=1))
+        self.assertLess(forecast, timezone.now() + 2 * LOAN_PERIOD + timedelta(minutes=1))
+
+    def test_late_returns_push_the_forecast_back(self):
+        other = Book.objects.create(title='Legal Method', author='Kojo Addo', isbn='9780000001002',
+                                    published_date=date(2018, 1, 1), total_copies=1)
+        late = self.lend(1, other)
+        BookCheckout.objects.filter(pk=late.pk).update(due_date=timezone.now() - timedelta(days=2))
+        return_checkout(self.members[1], late.id)
+        cache.delete(RETURN_OFFSET_KEY)  # The offset is recomputed daily
+        self.assertAlmostEqual(return_offset().total_seconds(), timedelta(days=2).total_seconds(), delta=60)
+        loan = self.lend()
+        self.assertAlmostEqual(self.expected(), loan.due_date + timedelta(days=2), delta=timedelta(minutes=1))
+
+    def test_available_books_have_no_forecast(self):
+        self.lend()
+        Book.objects.filter(pk=self.book.pk).update(total_copies=2, available_copies=1)
+        refresh([self.book.id])
+        self.assertIsNone(self.expected())
+
+    def test_list_reads_forecasts_without_per_row_queries(self):
+        def list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = APIClient().get('/library/books/')
+            return response, len(queries)
+
+        response, baseline = list_queries()
+        loan = self.lend()
+        for i in range(3):
+            book = Book.objects.create(title=f'Jurisprudence {i}', author='Kojo Addo', isbn=f'978000000110{i}',
+                                       published_date=date(2018, 1, 1), total_copies=1)
+            self.lend(i + 1, book)
+        response, count = list_queries()
+        self.assertEqual(count, baseline)
+        by_id = {book['id']: book for book in response.data['results']}
+        self.assertEqual(by_id[self.book.id]['expected_available_at'],
+                         loan.due_date.isoformat().replace('+00:00', 'Z'))
+        detail = APIClient().get(f'/library/books/{self.book.id}/').data
+        self.assertEqual(detail['expected_available_at'], by_id[self.book.id]['expected_available_at'])
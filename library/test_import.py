@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import tempfile
+from datetime import date
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from accounts.models import User
+from .circulation import checkout, reserve
+from .inventory import rebuild
+from .models import Book, BookForecast, Category, CategoryInventory, Reservation
+
+CSV = """isbn,title,author,published_date,publisher,category,total_copies,location
+978-0-19-876543-2,Equity and Trusts,Kofi Mensah,2018-04-01,Oxford,Equity,3,E1-002
+9780198765449,Land Law,Efua Owusu,2015,Sweet & Maxwell,Property,2,P2-010
+9780198765432,Equity and Trusts (duplicate),Kofi Mensah,2018-04-01,Oxford,Equity,9,E1-002
+12345,Bad ISBN,Nobody,2001,,,1,
+"""
+
+
+def marc(isbn, title, author, year, subject, copies):
+    return json.dumps({'leader': '00000nam a2200000 a 4500', 'fields': [
+        {'001': f'rec-{isbn}'},
+        {'020': {'ind1': ' ', 'ind2': ' ', 'subfields': [{'a': f'{isbn} (pbk.)'}]}},
+        {'100': {'ind1': '1', 'ind2': ' ', 'subfields': [{'a': f'{author},'}]}},
+        {'245': {'ind1': '1', 'ind2': '0', 'subfields': [{'a': f'{title} /'}, {'c': author}]}},
+        {'260': {'ind1': ' ', 'ind2': ' ', 'subfields': [{'b': 'Law Press,'}, {'c': f'c{year}.'}]}},
+        {'650': {'ind1': ' ', 'ind2': '0', 'subfields': [{'a': f'{subject}.'}]}},
+    ] + [{'852': {'ind1': ' ', 'ind2': ' ', 'subfields': [{'h': 'K1-001'}, {'t': str(n)}]}} for n in range(copies)]})
+
+
+class ImportBooksTest(TestCase):
+    def import_file(self, content, suffix='.csv', **options):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        out = io.StringIO()
+        call_command('import_books', handle.name, stdout=out, stderr=io.StringIO(), **options)
+        return out.getvalue()
+
+    def test_csv_import_creates_books_categories_and_inventory(self):
+        output = self.import_file(CSV)
+        self.assertIn('2 new, 0 updated, 2 new categories', output)
+        self.assertIn('skipped 1 duplicate and 1 invalid', output)
+        book = Book.objects.get(isbn='9780198765432')
+        self.assertEqual((book.title, book.available_copies, book.category.name), ('Equity and Trusts', 3, 'Equity'))
+        self.assertEqual(Book.objects.get(isbn='9780198765449').published_date, date(2015, 1, 1))
+        inventory = CategoryInventory.objects.get(category__name='Equity')
+        self.assertEqual((inventory.title_count, inventory.total_copies, inventory.available_copies), (1, 3, 3))
+        self.assertEqual(rebuild(), 0)
+
+    def test_reimport_updates_in_place_and_keeps_loans(self):
+        self.import_file(CSV)
+        book = Book.objects.get(isbn='9780198765432')
+        checkout(User.objects.create(username='reader'), book.id)
+        output = self.import_file(CSV.replace('Oxford,Equity,3', 'OUP,Trusts,5'))
+        self.assertIn('0 new, 2 updated, 1 new categories', output)
+        book.refresh_from_db()
+        self.assertEqual((book.publisher, book.category.name), ('OUP', 'Trusts'))
+        self.assertEqual((book.total_copies, book.available_copies), (5, 4))
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(rebuild(), 0)
+
+    def test_reimport_hands_added_copies_to_waiting_members_first(self):
+        self.import_file(CSV.replace('Oxford,Equity,3', 'Oxford,Equity,1'))
+        book = Book.objects.get(isbn='9780198765432')
+        checkout(User.objects.create(username='reader'), book.id)
+        waiter = User.objects.create(username='waiter')
+        reserve(waiter, book.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_file(CSV)
+        book.refresh_from_db()
+        self.assertEqual((book.total_copies, book.available_copies), (3, 1))
+        reservation = Reservation.objects.get(user=waiter)
+        self.assertTrue(reservation.notified)
+        self.assertIsNotNone(reservation.expires_at)
+        self.assertIsNone(BookForecast.objects.get(book=book).expected_at)
+        self.assertEqual(rebuild(), 0)
+
+    def test_marc_json_import(self):
+        lines = '\n'.join([
+            marc('9780198765456', 'Criminal Evidence', 'Asante, Yaw', 2020, 'Evidence', 2),
+            'not json',
+            '',
+        ])
+        output = self.import_file(lines, suffix='.jsonl', batch_size=1)
+        self.assertIn('1 new', output)
+        book = Book.objects.get(isbn='9780198765456')
+        self.assertEqual(
+            (book.title, book.author, book.publisher, book.published_date, book.total_copies, book.location),
+            ('Criminal Evidence', 'Asante, Yaw', 'Law Press', date(2020, 1, 1), 2, 'K1-001')
+        )
+        self.assertEqual(book.category.name, 'Evidence')
+
+    def test_dry_run_writes_nothing(self):
+        output = self.import_file(CSV, dry_run=True)
+        self.assertIn('Dry run: would have imported 2 books', output)
+        self.assertFalse(Book.objects.exists())
+        self.assertFalse(Category.objects.exists())
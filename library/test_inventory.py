@@ -0,0 +1,81 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .circulation import checkout, checkout_many, return_checkout, return_many
+from .holds import enqueue, release_copies
+from .inventory import rebuild
+from .models import Book, Category, CategoryInventory
+
+
+class CategoryInventoryTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='librarian', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.torts = Category.objects.create(name='Torts')
+        self.equity = Category.objects.create(name='Equity')
+        self.books = [
+            Book.objects.create(
+                title=f'Torts {i}', author='Kwame Ofori', isbn=f'978000000050{i}',
+                published_date=date(2014, 1, 1), total_copies=2, category=self.torts
+            )
+            for i in range(3)
+        ]
+
+    def inventory(self, category):
+        row = CategoryInventory.objects.get(category=category)
+        return row.title_count, row.total_copies, row.available_copies
+
+    def test_circulation_keeps_rollup_in_step(self):
+        self.assertEqual(self.inventory(self.torts), (3, 6, 6))
+        loan = checkout(self.admin, self.books[0].id)
+        results = checkout_many(self.admin, [self.books[1].id, self.books[2].id])
+        self.assertEqual(self.inventory(self.torts), (3, 6, 3))
+
+        reader = User.objects.create(username='reader')
+        checkout(reader, self.books[0].id)
+        enqueue(User.objects.create(username='waiter'), self.books[0])
+        return_checkout(self.admin, loan.id)
+        # Held for the waiter, not shelved.
+        self.assertEqual(self.inventory(self.torts), (3, 6, 2))
+        return_many(self.admin, [result['checkout'].id for result in results])
+        self.assertEqual(self.inventory(self.torts), (3, 6, 4))
+        self.assertEqual(rebuild(), 0)
+
+    def test_release_past_a_full_shelf_moves_rollup_by_copies_shelved(self):
+        checkout(self.admin, self.books[0].id)
+        release_copies([self.books[0].id, self.books[0].id, self.books[1].id])
+        self.books[0].refresh_from_db()
+        self.assertEqual(self.books[0].available_copies, 2)
+        self.assertEqual(self.inventory(self.torts), (3, 6, 6))
+        self.assertEqual(rebuild(), 0)
+
+    def test_book_edits_move_counts_between_categories(self):
+        response = self.client.patch(
+            f'/library/books/{self.books[0].id}/', {'category': self.equity.id, 'total_copies': 5}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.inventory(self.torts), (2, 4, 4))
+        self.assertEqual(self.inventory(self.equity), (1, 5, 2))
+        self.client.delete(f'/library/books/{self.books[1].id}/')
+        self.assertEqual(self.inventory(self.torts), (1, 2, 2))
+        self.assertEqual(rebuild(), 0)
+
+    def test_rebuild_fixes_drift(self):
+        Book.objects.filter(category=self.torts).update(available_copies=0)
+        CategoryInventory.objects.filter(category=self.equity).delete()
+        self.assertEqual(rebuild(), 2)
+        self.assertEqual(self.inventory(self.torts), (3, 6, 0))
+        self.assertEqual(self.inventory(self.equity), (0, 0, 0))
+
+    def test_category_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/library/categories/')
+        by_name = {row['name']: row for row in response.data['results']}
+        self.assertEqual(
+            [by_name['Torts'][field] for field in ('title_count', 'total_copies', 'available_copies')], [3, 6, 6]
+        )
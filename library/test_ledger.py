@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from . import circulation
+from .circulation import CirculationError, checkout, checkout_many, return_checkout
+from .fines import sweep_overdue_fines
+from .ledger import LedgerError, balance_of, settle
+from .models import Book, BookCheckout, FineBalance, FineLedgerEntry
+
+
+class FineLedgerTest(TestCase):
+    def setUp(self):
+        self.member = User.objects.create(username='member')
+        self.librarian = User.objects.create(username='librarian', role='admin')
+        self.books = [
+            Book.objects.create(title=f'Family Law {i}', author='Akosua Frimpong', isbn=f'978000000090{i}',
+                                published_date=date(2020, 1, 1), total_copies=2)
+            for i in range(3)
+        ]
+
+    def overdue_loan(self, book, days):
+        loan = checkout(self.member, book.id)
+        BookCheckout.objects.filter(pk=loan.pk).update(due_date=timezone.now() - timedelta(days=days, hours=1))
+        return loan
+
+    def assertBalanceMatchesLedger(self):
+        total = sum(FineLedgerEntry.objects.filter(user=self.member).values_list('amount', flat=True), Decimal(0))
+        self.assertEqual(balance_of(self.member.pk)[0], total)
+
+    def test_sweeps_and_returns_post_only_the_increase(self):
+        first = self.overdue_loan(self.books[0], 3)
+        self.overdue_loan(self.books[1], 2)
+        now = timezone.now()
+        self.assertEqual(sweep_overdue_fines(now), 2)
+        self.assertEqual(balance_of(self.member.pk)[0], Decimal('5.00'))
+        self.assertEqual(sweep_overdue_fines(now), 0)
+        sweep_overdue_fines(now + timedelta(days=1))
+        self.assertEqual(balance_of(self.member.pk)[0], Decimal('7.00'))
+        BookCheckout.objects.filter(pk=first.pk).update(due_date=timezone.now() - timedelta(days=6, hours=1))
+        return_checkout(self.member, first.id)
+        self.assertEqual(balance_of(self.member.pk)[0], Decimal('9.00'))
+        self.assertEqual(FineLedgerEntry.objects.filter(checkout=first).count(), 3)
+        self.assertBalanceMatchesLedger()
+
+    def test_sweep_between_read_and_return_is_not_charged_twice(self):
+        loan = self.overdue_loan(self.books[0], 3)
+        stale = BookCheckout.objects.select_related('book').get(pk=loan.pk)
+
+        def read_then_sweep(*args, **kwargs):
+            sweep_overdue_fines()
+            return stale
+
+        with mock.patch.object(circulation, 'get_object_or_404', read_then_sweep):
+            return_checkout(self.member, loan.id)
+        self.assertEqual(balance_of(self.member.pk)[0], Decimal('3.00'))
+        self.assertBalanceMatchesLedger()
+
+    def test_calculate_fine_on_stale_instance_posts_only_the_increase(self):
+        loan = self.overdue_loan(self.books[0], 3)
+        stale = BookCheckout.objects.get(pk=loan.pk)
+        sweep_overdue_fines()
+        self.assertEqual(stale.calculate_fine(), Decimal('3.00'))
+        self.assertEqual(balance_of(self.member.pk)[0], Decimal('3.00'))
+        self.assertEqual(FineLedgerEntry.objects.filter(checkout=loan).count(), 1)
+        self.assertBalanceMatchesLedger()
+
+    def test_settlement_reduces_balance_and_cannot_overpay(self):
+        self.overdue_loan(self.books[0], 4)
+        sweep_overdue_fines()
+        settle(self.member.pk, 'payment', Decimal('3.00'), recorded_by=self.librarian)
+        with self.assertRaises(LedgerError):
+            settle(self.member.pk, 'waiver', Decimal('1.50'))
+        settle(self.member.pk, 'waiver', Decimal('1.00'), note='First offence')
+        self.assertEqual(balance_of(self.member.pk)[0], Decimal('0.00'))
+        self.assertBalanceMatchesLedger()
+
+    @override_settings(FINE_BLOCK_THRESHOLD=Decimal('5.00'))
+    def test_checkout_blocked_above_threshold(self):
+        self.overdue_loan(self.books[0], 6)
+        sweep_overdue_fines()
+        with self.assertNumQueries(1):
+            with self.assertRaises(CirculationError) as raised:
+                checkout(self.member, self.books[1].id)
+        self.assertEqual(raised.exception.status_code, 403)
+        with self.assertRaises(CirculationError):
+            checkout_many(self.member, [self.books[1].id, self.books[2].id])
+        settle(self.member.pk, 'payment', Decimal('1.00'))
+        checkout(self.member, self.books[1].id)
+
+    def test_endpoints(self):
+        self.overdue_loan(self.books[0], 2)
+        sweep_overdue_fines()
+        client = APIClient()
+        client.force_authenticate(self.member)
+        with self.assertNumQueries(1):
+            response = client.get('/library/fines/balance/')
+        self.assertEqual(response.data['balance'], '2.00')
+        self.assertTrue(response.data['can_borrow'])
+        self.assertEqual(client.get('/library/fines/').data['results'][0]['book_title'], 'Family Law 0')
+        self.assertEqual(client.post('/library/admin/fines/settle/', {}).status_code, 403)
+
+        client.force_authenticate(self.librarian)
+        response = client.post('/library/admin/fines/settle/', {
+            'user_id': self.member.pk, 'kind': 'payment', 'amount': '2.00', 'note': 'Cash',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['amount'], '-2.00')
+        response = client.post('/library/admin/fines/settle/', {
+            'user_id': self.member.pk, 'kind': 'payment', 'amount': '2.00',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(FineBalance.objects.get(pk=self.member.pk).balance, Decimal('0.00'))
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from smtplib import SMTPException
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from .circulation import checkout, return_checkout
+from .holds import enqueue as join_queue
+from .models import Book, OutboxMessage
+from .outbox import MAX_ATTEMPTS, RETRY_BASE_DELAY, drain, enqueue
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise SMTPException('mail server unavailable')
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'reader{i}', email=f'reader{i}@example.com') for i in range(3)]
+
+    def test_return_queues_notice_without_sending(self):
+        book = Book.objects.create(
+            title='Land Law', author='Efua Owusu', isbn='9780000000201',
+            published_date=date(2017, 5, 1), total_copies=1
+        )
+        loan = checkout(self.users[0], book.id)
+        join_queue(self.users[1], book)
+        with self.captureOnCommitCallbacks(execute=True):
+            return_checkout(self.users[0], loan.id)
+        self.assertEqual(mail.outbox, [])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.user, message.kind), (self.users[1], 'hold_ready'))
+
+    @override_settings(EMAIL_BACKEND='library.test_outbox.CountingBackend')
+    def test_drain_sends_one_digest_per_user_over_one_connection(self):
+        CountingBackend.opened = 0
+        enqueue([(self.users[0].id, 'overdue', f'Book {i} is overdue', 'Please return it.') for i in range(3)])
+        enqueue([(user.id, 'overdue', 'Book 9 is overdue', 'Please return it.') for user in self.users[1:]])
+
+        self.assertEqual(drain(), 5)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        digest = next(email for email in mail.outbox if email.to == ['reader0@example.com'])
+        self.assertEqual(digest.subject, '3 library notifications')
+        self.assertIn('Book 2 is overdue', digest.body)
+        self.assertEqual(drain(), 0)
+        self.assertFalse(OutboxMessage.objects.filter(sent_at__isnull=True).exists())
+
+    @override_settings(EMAIL_BACKEND='library.test_outbox.FailingBackend')
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        enqueue([(self.users[0].id, 'overdue', 'Book is overdue', 'Please return it.')])
+        now = timezone.now()
+        self.assertEqual(drain(now=now), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.next_attempt_at, now + RETRY_BASE_DELAY)
+        self.assertEqual(message.last_error, 'mail server unavailable')
+        self.assertEqual(drain(now=now + timedelta(seconds=30)), 0)
+        self.assertEqual(OutboxMessage.objects.get().attempts, 1)
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            now += timedelta(days=1)
+            drain(now=now)
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, MAX_ATTEMPTS)
+        self.assertIsNone(message.next_attempt_at)
+        self.assertIsNone(message.sent_at)
@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import date
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .models import Book, Transaction
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        added = timezone.now()
+        # Identical sort keys exercise the id tiebreaker.
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}', author='Author', isbn=f'97800000000{i:02d}',
+                published_date=date(2020, 1, 1), total_copies=1, added_date=added
+            )
+            for i in range(25)
+        ]
+
+    def walk(self, url, params=None):
+        ids, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [row['id'] for row in response.data['results']]
+            pages += 1
+            if not response.data['next']:
+                return ids, pages, response
+            response = self.client.get(response.data['next'])
+
+    def test_walks_every_row_once_in_stable_order(self):
+        ids, pages, _ = self.walk('/library/books/', {'page_size': 7})
+        self.assertEqual(ids, sorted(book.id for book in self.books)[::-1])
+        self.assertEqual(pages, 4)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get('/library/books/', {'page_size': 10})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(first.data['previous'])
+
+    def test_page_size_is_capped_and_total_is_optional(self):
+        response = self.client.get('/library/books/', {'page_size': 1000, 'estimate_total': 'true'})
+        self.assertEqual(len(response.data['results']), 25)
+        self.assertEqual(response.data['estimated_total'], 25)
+        self.assertNotIn('estimated_total', self.client.get('/library/books/').data)
+
+    def test_function_views_are_paginated(self):
+        user = User.objects.create_user(username='reader', password='reader_pass_2024')
+        for book in self.books:
+            Transaction.objects.create(user=user, book=book, transaction_type='checkout')
+        self.client.force_authenticate(user=user)
+        ids, pages, _ = self.walk('/library/transactions/')
+        self.assertEqual(len(set(ids)), 25)
+        self.assertEqual(pages, 2)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/library/books/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_well_formed_cursor_with_bad_position_is_rejected(self):
+        added = self.books[0].added_date.isoformat()
+        for data in [{'v': added, 'id': 'abc'}, {'v': added, 'id': True}, {'v': [added], 'id': 1},
+                     {'v': 'not-a-date', 'id': 1}, ['v', 'id']]:
+            cursor = base64.urlsafe_b64encode(json.dumps(data).encode('ascii')).decode('ascii')
+            response = self.client.get('/library/books/', {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, data)
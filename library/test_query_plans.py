@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from Law_Study_AssistantAPI.query_plans import QueryPlanAssertions
+from .circulation import checkout, checkout_many, return_checkout, return_many
+from .holds import enqueue, expire_holds
+from .models import Book
+from .scheduler import DueDateScheduler
+
+
+class LibraryQueryPlanTest(QueryPlanAssertions, TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='librarian', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.books = [
+            Book.objects.create(
+                title=f'Evidence Volume {i}', author='Abena Darko', isbn=f'978000000040{i}',
+                published_date=date(2015, 1, 1), total_copies=1
+            )
+            for i in range(3)
+        ]
+
+    def test_list_endpoints_use_indexes(self):
+        checkout(self.user, self.books[0].id)
+        with self.assertNoFullScans():
+            for url in [
+                '/library/books/',
+                '/library/books/?available_only=true',
+                '/library/books/?search=evidence',
+                '/library/my-checkouts/',
+                '/library/overdue/',
+                '/library/admin/overdue/',
+                '/library/transactions/',
+                '/library/transactions/?type=checkout&since=2020-01-01',
+                '/library/reservations/',
+                f'/library/books/{self.books[0].pk}/related/',
+                f'/library/books/{self.books[0].pk}/overview/',
+                '/library/books/trending/?window=year',
+                '/library/fines/',
+                '/library/fines/balance/',
+            ]:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+
+    def test_circulation_and_hold_queue_use_indexes(self):
+        waiter = User.objects.create(username='waiter')
+        with self.assertNoFullScans():
+            loan = checkout(self.user, self.books[0].id)
+            enqueue(waiter, self.books[0])
+            return_checkout(self.user, loan.id)
+            checkout(waiter, self.books[0].id)
+            results = checkout_many(self.user, [book.id for book in self.books[1:]])
+            return_many(self.user, [result['checkout'].id for result in results])
+            expire_holds()
+
+    def test_scheduler_scans_use_indexes(self):
+        checkout(self.user, self.books[0].id)
+        scheduler = DueDateScheduler()
+        with self.assertNoFullScans():
+            scheduler.run_once()
+            checkout(self.user, self.books[1].id)
+            scheduler.run_once(timezone.now() + timedelta(days=30))
@@ -0,0 +1,103 @@
+import io
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .models import Book, BookCheckout, BookPairCount, BookRecommendation, RecommendationState
+from .recommendations import RECOMMENDATION_SETTLE, rebuild, refresh
+
+
+class RecommendationTest(TestCase):
+    def setUp(self):
+        self.members = [User.objects.create(username=f'member{i}') for i in range(4)]
+        self.books = [
+            Book.objects.create(title=title, author='Kwame Asante', isbn=f'978000000060{i}',
+                                published_date=date(2020, 1, 1), total_copies=3)
+            for i, title in enumerate(['Contract', 'Tort', 'Equity', 'Land Law', 'Evidence'])
+        ]
+
+    def borrow(self, member, *indexes, settled=True):
+        for index in indexes:
+            BookCheckout.objects.filter(user=self.members[member], book=self.books[index]).update(is_returned=True)
+            loan = BookCheckout.objects.create(user=self.members[member], book=self.books[index])
+            if settled:
+                BookCheckout.objects.filter(pk=loan.pk).update(
+                    checkout_date=timezone.now() - RECOMMENDATION_SETTLE - timedelta(minutes=1)
+                )
+
+    def snapshot(self):
+        return list(
+            BookRecommendation.objects.order_by('book_id', 'rank')
+            .values_list('book_id', 'rank', 'related_id', 'score')
+        )
+
+    def related(self, index):
+        return list(
+            BookRecommendation.objects.filter(book=self.books[index]).order_by('rank')
+            .values_list('related__title', flat=True)
+        )
+
+    def test_ranks_by_cosine_similarity(self):
+        self.borrow(0, 0, 1)
+        self.borrow(1, 0, 1, 2)
+        self.borrow(2, 0, 2)
+        self.borrow(3, 3, 0, 0)  # A second loan of the same book is not a second borrower
+        stats = refresh()
+        self.assertEqual(stats['checkouts'], 10)
+        self.assertEqual(BookPairCount.objects.get(book=self.books[0], other=self.books[0]).count, 4)
+        self.assertEqual(BookPairCount.objects.get(book=self.books[0], other=self.books[1]).count, 2)
+        # Tort and Equity tie on 2 / sqrt(4 * 2); Land Law's one shared borrower scores 1 / sqrt(4 * 1).
+        self.assertEqual(self.related(0), ['Tort', 'Equity', 'Land Law'])
+        self.assertEqual(self.related(3), ['Contract'])
+        self.assertEqual(self.related(4), [])
+        self.assertAlmostEqual(BookRecommendation.objects.get(book=self.books[3]).score, 0.5)
+
+    def test_incremental_refresh_matches_rebuild(self):
+        self.borrow(0, 0, 1)
+        self.borrow(1, 0, 2)
+        refresh(batch_size=3)
+        self.borrow(2, 1, 2, 4)
+        self.borrow(0, 3, 0)
+        self.borrow(3, 4)
+        stats = refresh(batch_size=2)
+        self.assertEqual(stats['checkouts'], 6)
+        self.assertEqual(
+            RecommendationState.objects.get().last_checkout_id, BookCheckout.objects.latest('pk').pk
+        )
+        incremental = self.snapshot()
+        rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(refresh()['checkouts'], 0)
+
+    def test_mark_waits_for_recent_checkouts_to_settle(self):
+        self.borrow(0, 0, 1)
+        self.borrow(1, 0, settled=False)  # may still be uncommitted behind a later id
+        self.borrow(2, 0, 1)
+        stats = refresh(batch_size=2)
+        self.assertEqual(stats['checkouts'], 2)
+        recent = BookCheckout.objects.get(user=self.members[1])
+        self.assertEqual(RecommendationState.objects.get().last_checkout_id, recent.pk - 1)
+
+        BookCheckout.objects.filter(pk=recent.pk).update(checkout_date=timezone.now() - RECOMMENDATION_SETTLE * 2)
+        self.assertEqual(refresh()['checkouts'], 3)
+        incremental = self.snapshot()
+        rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_related_endpoint_is_one_query(self):
+        self.borrow(0, 0, 1, 2)
+        self.borrow(1, 0, 1)
+        call_command('build_recommendations', '--top-k', '1', stdout=io.StringIO())
+        with self.assertNumQueries(1):
+            response = APIClient().get(f'/library/books/{self.books[0].pk}/related/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            [{'id': self.books[1].pk, 'title': 'Tort', 'author': 'Kwame Asante', 'is_available': True,
+              'rank': 1, 'score': 1.0}],
+        )
+        self.assertEqual(APIClient().get('/library/books/999999/related/').data, [])
@@ -0,0 +1,112 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .circulation import checkout, return_checkout
+from .holds import HOLD_PICKUP_PERIOD, expire_holds
+from .models import Book, Reservation, Transaction
+
+
+class HoldQueueTest(TestCase):
+    def setUp(self):
+        self.book = Book.objects.create(
+            title='Law of Torts', author='Ama Mensah', isbn='9780000000101',
+            published_date=date(2018, 3, 1), total_copies=1
+        )
+        self.other_book = Book.objects.create(
+            title='Equity and Trusts', author='Kofi Boateng', isbn='9780000000102',
+            published_date=date(2018, 3, 1), total_copies=1
+        )
+        self.lender = User.objects.create(username='lender')
+        self.loan = checkout(self.lender, self.book.id)
+        checkout(self.lender, self.other_book.id)
+        self.waiters = [User.objects.create(username=f'waiter{i}') for i in range(3)]
+        for user in self.waiters:
+            client = APIClient()
+            client.force_authenticate(user=user)
+            response = client.post('/library/reserve/', {'book_id': self.book.id})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def queue(self):
+        return list(Reservation.objects.filter(book=self.book, is_active=True)
+                    .order_by('queue_position').values_list('user__username', 'queue_position', 'notified'))
+
+    def test_positions_follow_arrival_order(self):
+        self.assertEqual(self.queue(), [('waiter0', 1, False), ('waiter1', 2, False), ('waiter2', 3, False)])
+        client = APIClient()
+        client.force_authenticate(user=self.waiters[1])
+        response = client.get('/library/reservations/')
+        self.assertEqual(response.data['results'][0]['queue_position'], 2)
+
+    def test_return_holds_copy_for_next_waiter_of_that_book_only(self):
+        Reservation.objects.create(user=self.waiters[0], book=self.other_book, queue_position=1)
+        return_checkout(self.lender, self.loan.id)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+        self.assertEqual(self.queue()[0], ('waiter0', 1, True))
+        self.assertFalse(Reservation.objects.get(book=self.other_book).notified)
+
+        checkout(self.waiters[0], self.book.id)
+        self.assertEqual(self.queue(), [('waiter1', 1, False), ('waiter2', 2, False)])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_expired_hold_passes_to_next_waiter(self):
+        return_checkout(self.lender, self.loan.id)
+        self.assertEqual(expire_holds(), (0, []))
+        expired, promoted = expire_holds(timezone.now() + HOLD_PICKUP_PERIOD + timedelta(minutes=1))
+        self.assertEqual(expired, 1)
+        self.assertEqual([r.user for r in promoted], [self.waiters[1]])
+        self.assertEqual(self.queue(), [('waiter1', 1, True), ('waiter2', 2, False)])
+
+    def test_reservation_list_endpoint_applies_reserve_checks(self):
+        client = APIClient()
+        client.force_authenticate(user=self.waiters[0])
+        response = client.post('/library/reservations/', {'book': self.other_book.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['queue_position'], 1)
+        self.assertTrue(Transaction.objects.filter(
+            user=self.waiters[0], book=self.other_book, transaction_type='reservation'
+        ).exists())
+
+        response = client.post('/library/reservations/', {'book': self.other_book.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'You already have a reservation for this book')
+
+        on_shelf = Book.objects.create(
+            title='Company Law', author='Yaw Darko', isbn='9780000000103',
+            published_date=date(2018, 3, 1), total_copies=1
+        )
+        response = client.post('/library/reservations/', {'book': on_shelf.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.filter(book=on_shelf).exists())
+
+    def test_reservation_cannot_be_moved_to_another_book(self):
+        return_checkout(self.lender, self.loan.id)
+        client = APIClient()
+        client.force_authenticate(user=self.waiters[0])
+        reservation = Reservation.objects.get(user=self.waiters[0])
+        response = client.patch(f'/library/reservations/{reservation.id}/', {'book': self.other_book.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        reservation.refresh_from_db()
+        self.assertEqual((reservation.book_id, reservation.notified), (self.book.id, True))
+
+        response = client.put(f'/library/reservations/{reservation.id}/', {'book': self.book.id, 'is_active': True})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cancelling_renumbers_and_last_copy_returns_to_shelf(self):
+        client = APIClient()
+        client.force_authenticate(user=self.waiters[0])
+        reservation = Reservation.objects.get(user=self.waiters[0])
+        response = client.delete(f'/library/reservations/{reservation.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.queue(), [('waiter1', 1, False), ('waiter2', 2, False)])
+
+        Reservation.objects.filter(book=self.book).update(is_active=False, queue_position=None)
+        return_checkout(self.lender, self.loan.id)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 1)
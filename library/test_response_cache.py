@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import DatabaseError
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import ChangeMarker, User
+from Law_Study_AssistantAPI import conditional
+from Law_Study_AssistantAPI.response_cache import response_key
+from .circulation import checkout
+from .models import Book, Category
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.location},
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.book = Book.objects.create(
+            title='Administrative Law', author='Esi Quaye', isbn='9780000000601',
+            published_date=date(2013, 1, 1), total_copies=1
+        )
+
+    def test_repeat_get_is_served_from_cache_by_any_worker(self):
+        self.assertEqual(self.client.get('/library/books/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get('/library/books/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['title'], 'Administrative Law')
+
+        other_worker = FileBasedCache(self.location, {})
+        request = RequestFactory().get('/library/books/')
+        request.user = User()
+        self.assertIsNotNone(other_worker.get(response_key(request, 'BookListCreateView', ['library.Book'], False)))
+
+    def test_writes_and_circulation_bump_versions(self):
+        self.client.get('/library/books/')
+        self.client.get('/library/categories/')
+        Category.objects.create(name='Public Law')
+        response = self.client.get('/library/books/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/library/categories/')['X-Cache'], 'MISS')
+
+        checkout(User.objects.create(username='reader'), self.book.id)
+        response = self.client.get('/library/books/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['available_copies'], 0)
+        self.assertEqual(self.client.get('/library/books/')['X-Cache'], 'HIT')
+
+        admin = User.objects.create(username='librarian', role='admin')
+        self.client.force_authenticate(user=admin)
+        stats = self.client.get('/library/admin/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 5))
+
+    def test_per_user_entries_are_separate(self):
+        factory = RequestFactory()
+        keys = []
+        for username in ['first', 'second']:
+            request = factory.get('/library/books/')
+            request.user = User.objects.create(username=username)
+            keys.append(response_key(request, 'View', ['library.Book'], per_user=True))
+            keys.append(response_key(request, 'View', ['library.Book'], per_user=False))
+        self.assertNotEqual(keys[0], keys[2])
+        self.assertEqual(keys[1], keys[3])
+
+
+class CommitTimeBumpTest(TransactionTestCase):
+    def setUp(self):
+        self.book = Book.objects.create(
+            title='Land Law', author='Esi Quaye', isbn='9780000000602',
+            published_date=date(2013, 1, 1), total_copies=2
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create(username='borrower'))
+
+    def test_request_touches_each_marker_once(self):
+        version = ChangeMarker.objects.get(label='library.Book').version
+        with mock.patch.object(conditional, 'touch', wraps=conditional.touch) as touch:
+            response = self.client.post('/library/checkout/', {'book_id': self.book.id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(touch.call_count, 1)
+        labels = touch.call_args.args[0]
+        self.assertEqual(len(labels), len(set(labels)))
+        self.assertEqual(ChangeMarker.objects.get(label='library.Book').version, version + 1)
+
+    def test_failed_marker_write_is_logged_not_raised(self):
+        failing = mock.patch.object(conditional, 'touch', side_effect=DatabaseError('database is locked'))
+        with failing, self.assertLogs('Law_Study_AssistantAPI.response_cache', 'ERROR'):
+            response = self.client.post('/library/checkout/', {'book_id': self.book.id})
+        self.assertEqual(response.status_code, 201)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 1)
@@ -0,0 +1,86 @@
+import io
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from .circulation import checkout, return_checkout
+from .models import Book, BookCheckout, OutboxMessage
+from .notifications import check_overdue_books
+from .scheduler import REMINDER_LEAD, DueDateScheduler
+
+
+class DueDateSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='reader', email='reader@example.com')
+        self.books = [
+            Book.objects.create(title=f'Company Law {i}', author='Adjoa Mensah', isbn=f'978000000080{i}',
+                                published_date=date(2022, 1, 1), total_copies=1)
+            for i in range(4)
+        ]
+        self.now = timezone.now()
+
+    def lend(self, book, due_in):
+        loan = checkout(self.user, book.id)
+        BookCheckout.objects.filter(pk=loan.pk).update(due_date=self.now + due_in)
+        return loan
+
+    def kinds(self):
+        return sorted(OutboxMessage.objects.values_list('kind', flat=True))
+
+    def test_fires_reminders_and_overdue_notices_once(self):
+        self.lend(self.books[0], timedelta(hours=-1))
+        self.lend(self.books[1], timedelta(days=1))
+        self.lend(self.books[2], timedelta(days=10))
+        scheduler = DueDateScheduler(horizon=timedelta(hours=6))
+        fired = scheduler.run_once(self.now)
+        # The loan already past due gets only its overdue notice.
+        self.assertEqual(fired, {'due_soon': 1, 'overdue': 1})
+        self.assertEqual(self.kinds(), ['due_soon', 'overdue'])
+        # Only the next day's deadlines are held; the ten-day loan is left in the database.
+        self.assertEqual(len(scheduler.events), 0)
+        self.assertEqual(scheduler.run_once(self.now), {'due_soon': 0, 'overdue': 0})
+        self.assertEqual(DueDateScheduler().run_once(self.now), {'due_soon': 0, 'overdue': 0})
+
+    def test_sliding_horizon_and_new_checkouts(self):
+        loan = self.lend(self.books[0], REMINDER_LEAD + timedelta(hours=10))
+        scheduler = DueDateScheduler(horizon=timedelta(hours=6))
+        self.assertEqual(scheduler.run_once(self.now), {'due_soon': 0, 'overdue': 0})
+        self.assertIsNone(scheduler.next_deadline())
+
+        self.lend(self.books[1], REMINDER_LEAD + timedelta(hours=1))  # made after the first scan
+        scheduler.refresh(self.now)
+        self.assertEqual(scheduler.next_deadline(), self.now + timedelta(hours=1))
+        self.assertEqual(scheduler.run_once(self.now + timedelta(hours=12)), {'due_soon': 2, 'overdue': 0})
+
+        return_checkout(self.user, loan.id)
+        self.assertEqual(scheduler.run_once(self.now + timedelta(days=3)), {'due_soon': 0, 'overdue': 1})
+        self.assertEqual(self.kinds(), ['due_soon', 'due_soon', 'overdue'])
+
+    def test_manual_overdue_run_counts_as_the_notice(self):
+        self.lend(self.books[0], timedelta(days=-2))
+        self.assertEqual(check_overdue_books(), 1)
+        out = io.StringIO()
+        call_command('run_scheduler', '--once', stdout=out)
+        self.assertIn('Queued 0 due-soon reminders and 0 overdue notices', out.getvalue())
+        self.assertEqual(self.kinds(), ['overdue'])
+
+    def test_cold_start_on_overdue_loan_sends_no_due_soon_reminder(self):
+        loan = self.lend(self.books[0], timedelta(days=-3))
+        self.assertEqual(DueDateScheduler().run_once(self.now), {'due_soon': 0, 'overdue': 1})
+        self.assertEqual(self.kinds(), ['overdue'])
+        loan.refresh_from_db()
+        self.assertIsNotNone(loan.reminder_sent_at)
+        scheduler = DueDateScheduler()
+        scheduler.refresh(self.now)
+        self.assertEqual(scheduler.events, [])
+
+    def test_repeated_runs_queue_one_overdue_notice_per_loan(self):
+        self.lend(self.books[0], timedelta(days=-2))
+        self.assertEqual(check_overdue_books(), 1)
+        self.assertEqual(check_overdue_books(), 0)
+        call_command('send_notifications', stdout=io.StringIO())
+        call_command('send_notifications', stdout=io.StringIO())
+        self.assertEqual(OutboxMessage.objects.filter(kind='overdue').count(), 1)
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Book
+from .search import search_books
+
+
+class CatalogSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.contract = Book.objects.create(
+            title='Contract Law Fundamentals', author='Robert Johnson', isbn='9781234567892',
+            published_date=date(2021, 3, 22), total_copies=2
+        )
+        self.tort = Book.objects.create(
+            title='Tort Law Analysis', author='Sarah Wilson', isbn='9781234567893',
+            published_date=date(2018, 11, 5), total_copies=1
+        )
+
+    def titles(self, query):
+        return [book.title for book in search_books(Book.objects.all(), query).order_by('-search_rank')]
+
+    def test_search_endpoint_ranks_by_relevance(self):
+        response = self.client.get('/library/books/', {'search': 'contract law'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book['id'] for book in response.data['results']], [self.contract.id])
+
+    def test_misspelled_author_matches(self):
+        self.assertEqual(self.titles('Jhonson')[0], 'Contract Law Fundamentals')
+
+    def test_index_follows_updates_and_deletes(self):
+        self.tort.title = 'Law of Negligence'
+        self.tort.save()
+        self.assertEqual(self.titles('negligence'), ['Law of Negligence'])
+        self.assertEqual(self.titles('Analysis'), [])
+
+        self.tort.delete()
+        self.assertEqual(self.titles('negligence'), [])
+
+    def test_short_terms_fall_back_to_like_search(self):
+        response = self.client.get('/library/books/', {'search': 'To'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book['id'] for book in response.data['results']], [self.tort.id])
@@ -0,0 +1,89 @@
+import io
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .circulation import checkout, checkout_many
+from .holds import enqueue
+from .models import Book, BookActivity, Category, Transaction
+from .trending import compact, leaderboard, rebuild, record
+
+
+class TrendingTest(TestCase):
+    def setUp(self):
+        self.members = [User.objects.create(username=f'member{i}') for i in range(3)]
+        self.criminal = Category.objects.create(name='Criminal')
+        self.books = [
+            Book.objects.create(title=f'Criminal Law {i}', author='Yaw Boateng', isbn=f'978000000070{i}',
+                                published_date=date(2021, 1, 1), total_copies=3,
+                                category=self.criminal if i < 2 else None)
+            for i in range(3)
+        ]
+        self.today = timezone.localdate()
+
+    def titles(self, *args, **kwargs):
+        return [row['title'] for row in leaderboard(*args, today=self.today, **kwargs)]
+
+    def test_circulation_counts_into_todays_bucket(self):
+        checkout(self.members[0], self.books[0].id)
+        checkout_many(self.members[1], [self.books[0].id, self.books[1].id])
+        enqueue(self.members[2], self.books[1])
+        bucket = BookActivity.objects.get(book=self.books[0], day=self.today)
+        self.assertEqual((bucket.checkouts, bucket.reservations), (2, 0))
+        bucket = BookActivity.objects.get(book=self.books[1], day=self.today)
+        self.assertEqual((bucket.checkouts, bucket.reservations), (1, 1))
+
+    def test_windows_merge_buckets(self):
+        record([self.books[2].id] * 5, 'checkouts', self.today - timedelta(days=20))
+        record([self.books[1].id] * 2, 'checkouts', self.today - timedelta(days=6))
+        record([self.books[0].id], 'checkouts', self.today)
+        record([self.books[0].id], 'reservations', self.today)
+        record([self.books[1].id], 'checkouts', self.today - timedelta(days=7))
+        self.assertEqual(self.titles('week'), ['Criminal Law 1', 'Criminal Law 0'])
+        self.assertEqual(self.titles('month'), ['Criminal Law 2', 'Criminal Law 1', 'Criminal Law 0'])
+        self.assertEqual(self.titles('month', category_id=self.criminal.id), ['Criminal Law 1', 'Criminal Law 0'])
+        self.assertEqual(self.titles('month', limit=1), ['Criminal Law 2'])
+        top = leaderboard('month', today=self.today)[1]
+        self.assertEqual((top['checkouts'], top['reservations']), (3, 0))
+
+    def test_compaction_keeps_totals_and_drops_expired_buckets(self):
+        old = self.today - timedelta(days=100)
+        for offset in range(40):
+            record([self.books[0].id], 'checkouts', old - timedelta(days=offset))
+        record([self.books[1].id], 'checkouts', self.today - timedelta(days=400))
+        record([self.books[1].id], 'checkouts', self.today - timedelta(days=3))
+        before = BookActivity.objects.filter(book=self.books[0]).count()
+        merged, dropped = compact(self.today)
+        self.assertEqual(dropped, 1)
+        self.assertEqual(merged, before - BookActivity.objects.filter(book=self.books[0]).count())
+        self.assertTrue(all(day.day == 1 for day in BookActivity.objects.filter(
+            book=self.books[0]).values_list('day', flat=True)))
+        self.assertEqual(leaderboard('year', today=self.today)[0]['checkouts'], 40)
+        self.assertEqual(compact(self.today), (0, 0))
+        self.assertEqual(self.titles('week'), ['Criminal Law 1'])
+
+    def test_rebuild_recounts_from_transactions(self):
+        checkout(self.members[0], self.books[0].id)
+        enqueue(self.members[1], self.books[0])
+        Transaction.objects.create(user=self.members[1], book=self.books[0], transaction_type='reservation')
+        BookActivity.objects.all().delete()
+        self.assertEqual(rebuild(self.today), 1)
+        bucket = BookActivity.objects.get()
+        self.assertEqual((bucket.checkouts, bucket.reservations), (1, 1))
+        out = io.StringIO()
+        call_command('compact_trending', stdout=out)
+        self.assertIn('Merged away 0', out.getvalue())
+
+    def test_trending_endpoint(self):
+        checkout(self.members[0], self.books[1].id)
+        response = APIClient().get('/library/books/trending/', {'window': 'month', 'category': self.criminal.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            'id': self.books[1].id, 'title': 'Criminal Law 1', 'author': 'Yaw Boateng',
+            'checkouts': 1, 'reservations': 0,
+        }])
+        self.assertEqual(APIClient().get('/library/books/trending/', {'window': 'decade'}).status_code, 400)
@@ -0,0 +1,110 @@
+"""
+Most-borrowed leaderboards over sliding windows.
+
+``BookActivity`` holds one bucket per book and day with its checkout and
+reservation counts. Circulation adds to today's bucket in the same
+transaction as the checkout or reservation, with an ``F()`` increment, so
+nothing ever groups the transaction log on a request. A window's
+leaderboard sums the buckets dated inside it per book and keeps the top N,
+in SQL, reading the ``(day, book, checkouts, reservations)`` index.
+
+The nightly ``compact_trending`` command merges the daily buckets older
+than ``TRENDING_DAILY_DAYS`` into one bucket per book and month, dated the
+1st, and drops buckets older than the longest window, so the table stays at
+about a month of days plus twelve months per active book. The week and month
+windows therefore count exact days and the year window whole months.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import BookActivity, Transaction, TransactionArchive
+
+TRENDING_WINDOWS = {'week': 7, 'month': 30, 'year': 365}
+TRENDING_DAILY_DAYS = 35
+TRENDING_RETENTION_DAYS = 366
+TRENDING_KINDS = {'checkout': 'checkouts', 'reservation': 'reservations'}
+
+
+def record(book_ids, kind, day=None):
+    """Count one ``kind`` (``'checkouts'`` or ``'reservations'``) per entry of ``book_ids`` on ``day``."""
+    counts = Counter(book_ids)
+    if not counts:
+        return
+    day = day or timezone.localdate()
+    # Create missing buckets first so concurrent recorders only ever increment.
+    BookActivity.objects.bulk_create(
+        [BookActivity(book_id=book_id, day=day) for book_id in counts], ignore_conflicts=True
+    )
+    grouped = defaultdict(list)
+    for book_id, count in counts.items():
+        grouped[count].append(book_id)
+    for count, ids in grouped.items():
+        BookActivity.objects.filter(day=day, book_id__in=ids).update(**{kind: F(kind) + count})
+
+
+def leaderboard(window, category_id=None, limit=10, today=None):
+    """The ``limit`` books borrowed most in ``window`` (a ``TRENDING_WINDOWS`` key), reservations breaking ties."""
+    today = today or timezone.localdate()
+    buckets = BookActivity.objects.filter(day__gt=today - timedelta(days=TRENDING_WINDOWS[window]))
+    if category_id is not None:
+        buckets = buckets.filter(book__category_id=category_id)
+    return list(
+        buckets.values('book_id').annotate(
+            title=F('book__title'), author=F('book__author'),
+            checkouts=Sum('checkouts'), reservations=Sum('reservations'),
+        ).order_by('-checkouts', '-reservations', 'book_id')[:limit]
+    )
+
+
+def _month_after(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def compact(today=None):
+    """Merge old daily buckets into monthly ones and drop expired ones; return (merged, dropped)."""
+    today = today or timezone.localdate()
+    cutoff = today - timedelta(days=TRENDING_DAILY_DAYS)
+    merged = 0
+    with transaction.atomic():
+        dropped, _ = BookActivity.objects.filter(
+            day__lte=today - timedelta(days=TRENDING_RETENTION_DAYS)
+        ).delete()
+        # Months with a day bucket left to merge; already merged months only have the 1st.
+        months = BookActivity.objects.filter(day__lt=cutoff).exclude(day__day=1).dates('day', 'month')
+        for month in months:
+            buckets = BookActivity.objects.filter(day__gte=month, day__lt=min(_month_after(month), cutoff))
+            totals = list(buckets.order_by().values('book_id').annotate(
+                total_checkouts=Sum('checkouts'), total_reservations=Sum('reservations')
+            ))
+            merged += buckets.delete()[0] - len(totals)
+            BookActivity.objects.bulk_create([
+                BookActivity(book_id=row['book_id'], day=month, checkouts=row['total_checkouts'],
+                             reservations=row['total_reservations'])
+                for row in totals
+            ], batch_size=1000)
+    return merged, dropped
+
+
+def rebuild(today=None):
+    """Recount the buckets from the transaction log, archive included, then compact; return the buckets written."""
+    today = today or timezone.localdate()
+    since = today - timedelta(days=TRENDING_RETENTION_DAYS - 1)
+    counts = defaultdict(Counter)
+    for model in (Transaction, TransactionArchive):
+        rows = model.objects.filter(
+            transaction_type__in=TRENDING_KINDS, transaction_date__date__gte=since
+        ).order_by().values('book_id', 'transaction_type', day=TruncDate('transaction_date')).annotate(n=Count('pk'))
+        for row in rows:
+            counts[row['book_id'], row['day']][TRENDING_KINDS[row['transaction_type']]] += row['n']
+    with transaction.atomic():
+        BookActivity.objects.all().delete()
+        BookActivity.objects.bulk_create([
+            BookActivity(book_id=book_id, day=day, **totals) for (book_id, day), totals in counts.items()
+        ], batch_size=1000)
+        compact(today)
+    return len(counts)
@@ -8,7 +8,10 @@ urlpatterns = [
     
     # Books CRUD
     path('books/', views.BookListCreateView.as_view(), name='book-list-create'),
+    path('books/trending/', views.trending_books, name='book-trending'),
     path('books/<int:pk>/', views.BookDetailView.as_view(), name='book-detail'),
+    path('books/<int:pk>/overview/', views.book_overview, name='book-overview'),
+    path('books/<int:pk>/related/', views.related_books, name='book-related'),
     
     # Reservations
     path('reservations/', views.ReservationListCreateView.as_view(), name='reservation-list-create'),
@@ -18,13 +21,23 @@ urlpatterns = [
     # Checkout/Return
     path('checkout/', views.checkout_book, name='checkout-book'),
     path('return/', views.return_book, name='return-book'),
+    path('checkout/batch/', views.batch_checkout_books, name='batch-checkout-books'),
+    path('return/batch/', views.batch_return_books, name='batch-return-books'),
     path('my-checkouts/', views.user_checkouts, name='user-checkouts'),
     path('overdue/', views.overdue_books, name='overdue-books'),
     
     # Transactions
     path('transactions/', views.user_transactions, name='user-transactions'),
     
+    # Fines
+    path('fines/', views.fine_ledger, name='fine-ledger'),
+    path('fines/balance/', views.fine_balance, name='fine-balance'),
+    
     # Admin endpoints
     path('admin/overdue/', views.all_overdue_books, name='admin-overdue'),
     path('admin/notifications/', views.send_overdue_notifications, name='send-notifications'),
+    path('admin/fines/settle/', views.settle_fines, name='settle-fines'),
+    path('admin/cache-stats/', views.cache_stats, name='cache-stats'),
+    path('admin/exports/transactions/', views.export_transactions, name='export-transactions'),
+    path('admin/exports/checkouts/', views.export_checkouts, name='export-checkouts'),
 ]
\ No newline at end of file
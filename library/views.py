@@ -1,42 +1,73 @@
 from rest_framework import generics, status, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db import transaction
+from django.db.models import Count, F, Q
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 # from django_filters.rest_framework import DjangoFilterBackend  # Uncomment after installing django-filter
-from .models import Book, BookCheckout, Category, Reservation, Transaction
+from .models import Book, BookCheckout, BookRecommendation, Category, FineLedgerEntry, Reservation, Transaction, TransactionArchive
 from .serializers import (
-    BookSerializer, BookCheckoutSerializer, CategorySerializer, ReservationSerializer,
+    BookSerializer, BookCheckoutSerializer, BookOverviewSerializer, CategorySerializer, RelatedBookSerializer, ReservationSerializer,
+    TrendingBookSerializer, TrendingRequestSerializer,
+    FineBalanceSerializer, FineLedgerEntrySerializer, FineSettlementRequestSerializer,
     CheckoutRequestSerializer, ReturnRequestSerializer, ReservationRequestSerializer,
-    TransactionSerializer, NotificationResponseSerializer
+    TransactionSerializer, NotificationResponseSerializer, CacheStatsSerializer,
+    BatchCheckoutRequestSerializer, BatchReturnRequestSerializer,
+    BatchCheckoutResponseSerializer, BatchReturnResponseSerializer
 )
+from . import circulation, holds, ledger, trending
+from .circulation import CirculationError
+from .archive import transaction_totals
+from .exports import (
+    CHECKOUT_COLUMNS, CHECKOUT_TYPES, TRANSACTION_COLUMNS, TRANSACTION_TYPES,
+    checkout_rows, checkout_type_lookups, transaction_rows
+)
+from .fines import overdue_checkouts
+from .search import BookSearchFilter
 from accounts.permissions import IsAdminUser, IsAdminOrReadOnly
+from Law_Study_AssistantAPI.archive import include_archived
+from Law_Study_AssistantAPI.conditional import ConditionalGetMixin
+from Law_Study_AssistantAPI.exports import EXPORT_RENDERERS, stream_export
+from Law_Study_AssistantAPI.fast_serializers import FastListMixin
+from Law_Study_AssistantAPI.filters import history_filters
+from Law_Study_AssistantAPI.pagination import KeysetPagination, paginated_response
+from Law_Study_AssistantAPI import response_cache
+from Law_Study_AssistantAPI.response_cache import CachedListMixin
 
-class BookPagination(PageNumberPagination):
+class BookPagination(KeysetPagination):
     page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
 
-class CategoryListCreateView(generics.ListCreateAPIView):
-    queryset = Category.objects.all()
+def categories_with_inventory():
+    """Categories annotated with their inventory rollup, joined on its primary key"""
+    return Category.objects.annotate(
+        title_count=F('inventory__title_count'),
+        total_copies=F('inventory__total_copies'),
+        available_copies=F('inventory__available_copies'),
+    )
+
+class CategoryListCreateView(CachedListMixin, generics.ListCreateAPIView):
+    cache_models = ['library.Category']
+    queryset = categories_with_inventory()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
 
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Category.objects.all()
+    queryset = categories_with_inventory()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
 
-class BookListCreateView(generics.ListCreateAPIView):
-    queryset = Book.objects.select_related('category').all()
+class BookListCreateView(CachedListMixin, FastListMixin, generics.ListCreateAPIView):
+    cache_models = ['library.Book']
+    queryset = Book.objects.select_related('category', 'forecast').all()
     serializer_class = BookSerializer
     permission_classes = []  # Temporarily disabled for testing
     pagination_class = BookPagination
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, BookSearchFilter]
     search_fields = ['title', 'author', 'isbn']
     ordering_fields = ['title', 'author', 'added_date']
     ordering = ['-added_date']
@@ -44,23 +75,85 @@ class BookListCreateView(generics.ListCreateAPIView):
 
     
     def get_queryset(self):
-        queryset = Book.objects.select_related('category').all()
+        queryset = Book.objects.select_related('category', 'forecast').all()
         available_only = self.request.query_params.get('available_only', '')
         if available_only.lower() == 'true':
             queryset = queryset.filter(available_copies__gt=0)
         return queryset
 
-class BookDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Book.objects.all()
+class BookDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    etag_models = ['library.Book']
+    queryset = Book.objects.select_related('category', 'forecast')
     serializer_class = BookSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+@extend_schema(responses=BookOverviewSerializer)
+@api_view(['GET'])
+@permission_classes([IsAdminOrReadOnly])
+def book_overview(request, pk):
+    """
+    Everything the book page needs in one response: the book, its queue
+    length, and the caller's open checkout and active reservation of it.
+
+    Three queries however much circulation history there is: the book with
+    its category, forecast and queue length, then the caller's checkout and
+    reservation through their unique indexes (skipped when anonymous).
+    """
+    waiting = Q(reservations__is_active=True, reservations__notified=False)
+    book = get_object_or_404(
+        Book.objects.select_related('category', 'forecast').annotate(queue_length=Count('reservations', filter=waiting)),
+        pk=pk,
+    )
+    my_checkout = my_reservation = None
+    if request.user.is_authenticated:
+        my_checkout = BookCheckout.objects.filter(user=request.user, book=book, is_returned=False).first()
+        my_reservation = Reservation.objects.filter(user=request.user, book=book, is_active=True).first()
+        for record in (my_checkout, my_reservation):
+            if record is not None:
+                record.user, record.book = request.user, book
+    return Response(BookOverviewSerializer({
+        'book': book,
+        'queue_length': book.queue_length,
+        'my_checkout': my_checkout,
+        'my_reservation': my_reservation,
+    }).data)
+
+@extend_schema(parameters=[TrendingRequestSerializer], responses=TrendingBookSerializer(many=True))
+@api_view(['GET'])
+@permission_classes([IsAdminOrReadOnly])
+def trending_books(request):
+    """Most borrowed books this ``?window=week|month|year``, optionally in one ``?category=``"""
+    params = TrendingRequestSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    books = trending.leaderboard(
+        params.validated_data['window'], params.validated_data.get('category'), params.validated_data['limit']
+    )
+    return Response(TrendingBookSerializer(books, many=True).data)
+
+@extend_schema(responses=RelatedBookSerializer(many=True))
+@api_view(['GET'])
+@permission_classes([IsAdminOrReadOnly])
+def related_books(request, pk):
+    """Books most often borrowed by the same members, as of the last build_recommendations run"""
+    # One lookup on (book, rank); a book without recommendations, or no such book, gives [].
+    recommendations = BookRecommendation.objects.filter(book_id=pk).select_related('related').order_by('rank')
+    return Response(RelatedBookSerializer(recommendations, many=True).data)
+
 class ReservationListCreateView(generics.ListCreateAPIView):
     serializer_class = ReservationSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user, is_active=True)
+        return Reservation.objects.filter(user=self.request.user, is_active=True).select_related('book', 'user')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservation = circulation.reserve(request.user, serializer.validated_data['book'].pk)
+        except CirculationError as e:
+            return Response({'error': e.message}, status=e.status_code)
+        return Response(self.get_serializer(reservation).data, status=status.HTTP_201_CREATED)
 
 class ReservationDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ReservationSerializer
@@ -69,6 +162,16 @@ class ReservationDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Reservation.objects.filter(user=self.request.user)
 
+    def perform_update(self, serializer):
+        # Deactivating a reservation is a cancellation: leave the queue properly.
+        if serializer.validated_data.pop('is_active', True) is False:
+            holds.cancel(serializer.instance)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        holds.cancel(instance)
+        instance.delete()
+
 @extend_schema(request=CheckoutRequestSerializer, responses=BookCheckoutSerializer)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -77,42 +180,10 @@ def checkout_book(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    book_id = serializer.validated_data['book_id']
-    book = get_object_or_404(Book, id=book_id)
-    
-    # Check if book is available
-    if book.available_copies <= 0:
-        return Response({'error': 'No copies available'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
-    
-    # Check if user already has this book checked out
-    existing_checkout = BookCheckout.objects.filter(
-        user=request.user, book=book, is_returned=False
-    ).exists()
-    
-    if existing_checkout:
-        return Response({'error': 'You already have this book checked out'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
-    
-    with transaction.atomic():
-        # Create checkout record
-        checkout = BookCheckout.objects.create(user=request.user, book=book)
-        # Reduce available copies
-        book.available_copies -= 1
-        book.save()
-        
-        # Create transaction record
-        Transaction.objects.create(
-            user=request.user,
-            book=book,
-            transaction_type='checkout',
-            notes=f'Book checked out: {book.title}'
-        )
-        
-        # Cancel any active reservation for this book by this user
-        Reservation.objects.filter(
-            user=request.user, book=book, is_active=True
-        ).update(is_active=False)
+    try:
+        checkout = circulation.checkout(request.user, serializer.validated_data['book_id'])
+    except CirculationError as e:
+        return Response({'error': e.message}, status=e.status_code)
     
     return Response(BookCheckoutSerializer(checkout).data, status=status.HTTP_201_CREATED)
 
@@ -124,54 +195,61 @@ def return_book(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    checkout_id = serializer.validated_data['checkout_id']
-    checkout = get_object_or_404(BookCheckout, id=checkout_id)
+    try:
+        checkout = circulation.return_checkout(request.user, serializer.validated_data['checkout_id'])
+    except CirculationError as e:
+        return Response({'error': e.message}, status=e.status_code)
     
-    if checkout.user != request.user:
-        return Response({'error': 'You can only return your own books'}, 
-                       status=status.HTTP_403_FORBIDDEN)
+    return Response(BookCheckoutSerializer(checkout).data, status=status.HTTP_200_OK)
+
+def _batch_response(results):
+    failed = sum(1 for result in results if 'error' in result)
+    return Response({
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'results': results,
+    })
+
+@extend_schema(request=BatchCheckoutRequestSerializer, responses=BatchCheckoutResponseSerializer)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_checkout_books(request):
+    """Check out several books for the caller in one transaction"""
+    serializer = BatchCheckoutRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    if checkout.is_returned:
-        return Response({'error': 'Book already returned'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
+    try:
+        results = circulation.checkout_many(request.user, serializer.validated_data['book_ids'])
+    except CirculationError as e:
+        return Response({'error': e.message}, status=e.status_code)
     
-    with transaction.atomic():
-        # Calculate fine if overdue
-        checkout.calculate_fine()
-        
-        # Mark as returned
-        checkout.is_returned = True
-        checkout.return_date = timezone.now()
-        checkout.save()
-        
-        # Increase available copies
-        checkout.book.available_copies += 1
-        checkout.book.save()
-        
-        # Create transaction record
-        Transaction.objects.create(
-            user=request.user,
-            book=checkout.book,
-            transaction_type='return',
-            notes=f'Book returned: {checkout.book.title}'
-        )
-        
-        # Notify users with reservations
-        try:
-            from .notifications import notify_book_availability
-            notify_book_availability()
-        except ImportError:
-            pass
+    for result in results:
+        if 'checkout' in result:
+            result['checkout'] = BookCheckoutSerializer(result['checkout']).data
+    return _batch_response(results)
+
+@extend_schema(request=BatchReturnRequestSerializer, responses=BatchReturnResponseSerializer)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_return_books(request):
+    """Return several of the caller's checkouts in one transaction"""
+    serializer = BatchReturnRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(BookCheckoutSerializer(checkout).data, status=status.HTTP_200_OK)
+    results = circulation.return_many(request.user, serializer.validated_data['checkout_ids'])
+    for result in results:
+        if 'checkout' in result:
+            result['checkout'] = BookCheckoutSerializer(result['checkout']).data
+    return _batch_response(results)
 
 @extend_schema(responses=BookCheckoutSerializer(many=True))
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_checkouts(request):
-    checkouts = BookCheckout.objects.filter(user=request.user).select_related('book')
-    serializer = BookCheckoutSerializer(checkouts, many=True)
-    return Response(serializer.data)
+    checkouts = BookCheckout.objects.filter(user=request.user).select_related('book', 'user').with_overdue_state()
+    return paginated_response(request, checkouts.order_by('-checkout_date'), BookCheckoutSerializer, fast=True)
 
 @extend_schema(request=ReservationRequestSerializer, responses=ReservationSerializer)
 @api_view(['POST'])
@@ -181,33 +259,10 @@ def reserve_book(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    book_id = serializer.validated_data['book_id']
-    book = get_object_or_404(Book, id=book_id)
-    
-    # Check if book is available
-    if book.available_copies > 0:
-        return Response({'error': 'Book is currently available for checkout'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
-    
-    # Check if user already has a reservation for this book
-    existing_reservation = Reservation.objects.filter(
-        user=request.user, book=book, is_active=True
-    ).exists()
-    
-    if existing_reservation:
-        return Response({'error': 'You already have a reservation for this book'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
-    
-    with transaction.atomic():
-        reservation = Reservation.objects.create(user=request.user, book=book)
-        
-        # Create transaction record
-        Transaction.objects.create(
-            user=request.user,
-            book=book,
-            transaction_type='reservation',
-            notes=f'Book reserved: {book.title}'
-        )
+    try:
+        reservation = circulation.reserve(request.user, serializer.validated_data['book_id'])
+    except CirculationError as e:
+        return Response({'error': e.message}, status=e.status_code)
     
     return Response(ReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
 
@@ -215,42 +270,120 @@ def reserve_book(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def overdue_books(request):
-    overdue_checkouts = BookCheckout.objects.filter(
-        user=request.user, is_returned=False, due_date__lt=timezone.now()
-    ).select_related('book')
-    serializer = BookCheckoutSerializer(overdue_checkouts, many=True)
-    return Response(serializer.data)
+    now = timezone.now()
+    overdue = overdue_checkouts(now).filter(user=request.user).select_related('book', 'user').with_overdue_state(now)
+    return paginated_response(request, overdue.order_by('due_date'), BookCheckoutSerializer, fast=True)
 
 @extend_schema(responses=TransactionSerializer(many=True))
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_transactions(request):
-    """Get user's transaction history"""
-    transactions = Transaction.objects.filter(user=request.user).select_related('book')
-    serializer = TransactionSerializer(transactions, many=True)
-    return Response(serializer.data)
+    """
+    Get user's transaction history, newest first.
+
+    Filters: ``?since=`` / ``?until=`` on the transaction date and ``?type=``;
+    ``?include_archived=true`` adds archived rows.
+    """
+    filters = history_filters(request, 'transaction_date', 'transaction_type', TRANSACTION_TYPES)
+    transactions = Transaction.objects.filter(user=request.user, **filters)
+    archived = []
+    if include_archived(request):
+        archived.append(TransactionArchive.objects.filter(user=request.user, **filters).annotate(
+            notes=TransactionArchive.notes_expression()
+        ))
+    response = paginated_response(request, transactions, TransactionSerializer, *archived, fast=True)
+    response.data['totals'] = transaction_totals(request.user)
+    return response
 
 @extend_schema(responses=BookCheckoutSerializer(many=True))
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def all_overdue_books(request):
-    """Admin view of all overdue books"""
-    overdue_checkouts = BookCheckout.objects.filter(
-        is_returned=False, due_date__lt=timezone.now()
-    ).select_related('book', 'user')
-    
-    # Update fines
-    for checkout in overdue_checkouts:
-        checkout.calculate_fine()
-    
-    serializer = BookCheckoutSerializer(overdue_checkouts, many=True)
-    return Response(serializer.data)
+    """Admin view of all overdue books (read-only; fines are computed at read time)"""
+    now = timezone.now()
+    overdue = overdue_checkouts(now).select_related('book', 'user').with_overdue_state(now)
+    return paginated_response(request, overdue.order_by('due_date'), BookCheckoutSerializer, fast=True)
 
 @extend_schema(responses=NotificationResponseSerializer)
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def send_overdue_notifications(request):
-    """Admin endpoint to send overdue notifications"""
+    """Admin endpoint to queue overdue notifications for the send_notifications worker"""
     from .notifications import check_overdue_books
     count = check_overdue_books()
-    return Response({'message': f'Sent {count} overdue notifications'})
\ No newline at end of file
+    return Response({'message': f'Queued {count} overdue notifications'})
+
+@extend_schema(responses=FineBalanceSerializer)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def fine_balance(request):
+    """The caller's posted fine balance and whether it blocks new checkouts"""
+    balance, updated_at = ledger.balance_of(request.user.pk)
+    return Response(FineBalanceSerializer({
+        'balance': balance,
+        'updated_at': updated_at,
+        'threshold': settings.FINE_BLOCK_THRESHOLD,
+        'can_borrow': not ledger.is_blocked(balance),
+    }).data)
+
+@extend_schema(responses=FineLedgerEntrySerializer(many=True))
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def fine_ledger(request):
+    """The caller's fine ledger, newest first"""
+    entries = FineLedgerEntry.objects.filter(user=request.user).select_related('checkout__book').order_by('-created_at')
+    return paginated_response(request, entries, FineLedgerEntrySerializer)
+
+@extend_schema(request=FineSettlementRequestSerializer, responses=FineLedgerEntrySerializer)
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def settle_fines(request):
+    """Record a payment or waiver against a member's fine balance"""
+    serializer = FineSettlementRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    member = get_object_or_404(get_user_model(), pk=data['user_id'])
+    try:
+        entry = ledger.settle(member.pk, data['kind'], data['amount'], data['note'], request.user)
+    except ledger.LedgerError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(FineLedgerEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+@extend_schema(responses=CacheStatsSerializer)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Admin view of the shared response cache hit and miss counters"""
+    return Response(response_cache.stats())
+
+@extend_schema(responses=OpenApiTypes.STR)
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
+@permission_classes([IsAdminUser])
+def export_transactions(request):
+    """
+    Admin export of all transactions as CSV or NDJSON (``?format=``).
+
+    Filters: ``?since=`` / ``?until=`` on the transaction date, ``?type=`` and
+    ``?include_archived=true``.
+    """
+    filters = history_filters(request, 'transaction_date', 'transaction_type', TRANSACTION_TYPES)
+    rows = transaction_rows(filters, include_archived(request))
+    return stream_export(request, 'transactions', TRANSACTION_COLUMNS, rows)
+
+@extend_schema(responses=OpenApiTypes.STR)
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
+@permission_classes([IsAdminUser])
+def export_checkouts(request):
+    """
+    Admin export of all checkouts as CSV or NDJSON (``?format=``).
+
+    Filters: ``?since=`` / ``?until=`` on the checkout date and
+    ``?type=open|returned|overdue``.
+    """
+    filters = history_filters(request, 'checkout_date', checkout_type_lookups(), CHECKOUT_TYPES)
+    return stream_export(request, 'checkouts', CHECKOUT_COLUMNS, checkout_rows(filters))